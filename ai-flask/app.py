@@ -1,18 +1,26 @@
 # app.py
 # Flask API untuk sistem deteksi kecelakaan
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file, Response
 from flask_cors import CORS
 import os
+import functools
+import hmac
 import logging
 import signal
 import sys
 from datetime import datetime
 import threading
 import time
+import requests
 
 from yolo_detect import get_detector
-from cctv_config import CCTVConfig, FLASK_CONFIG
+from cctv_config import (
+    get_cctv_config, FLASK_CONFIG, SHARDING_CONFIG, ADMIN_CONFIG, DETECTION_STORE_CONFIG,
+    INCIDENT_JOURNAL_CONFIG
+)
+from logging_setup import setup_logging, set_level, get_logging_stats
+from profiler import SamplingProfiler, dump_stacks
 
 # Inisialisasi Flask app
 app = Flask(__name__)
@@ -21,19 +29,13 @@ app = Flask(__name__)
 CORS(app, origins=FLASK_CONFIG['cors_origins'], supports_credentials=True)
 
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('flask_api.log'),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Global variables
 detector = None
 cctv_config = None
+sampling_profiler = SamplingProfiler()
 
 def init_system():
     """
@@ -45,7 +47,7 @@ def init_system():
     
     try:
         # Initialize CCTV config
-        cctv_config = CCTVConfig()
+        cctv_config = get_cctv_config()
         
         # Initialize detector
         detector = get_detector()
@@ -78,6 +80,58 @@ def signal_handler(sig, frame):
 signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 
+def forward_to_owner(cctv_id, action, method='POST'):
+    """
+    Mode sharding: teruskan request kontrol kamera ke node pemiliknya.
+    Mengembalikan None jika node ini pemilik kamera (request diproses lokal).
+    """
+    shard_manager = detector.shard_manager if detector else None
+    if not shard_manager or shard_manager.owns(cctv_id):
+        return None
+    
+    # Cegah loop forward saat membership sedang berubah
+    if request.headers.get('X-Shard-Forwarded'):
+        return jsonify({
+            'status': 'error',
+            'message': f'Camera {cctv_id} ownership is being rebalanced, retry later'
+        }), 409
+    
+    owner_url = shard_manager.owner_address(cctv_id)
+    try:
+        response = requests.request(
+            method,
+            f"{owner_url}/{action}/{cctv_id}",
+            params=request.args,
+            headers={'X-Shard-Forwarded': shard_manager.node_id},
+            timeout=SHARDING_CONFIG['forward_timeout']
+        )
+        payload = response.json()
+        payload['routed_to'] = owner_url
+        return jsonify(payload), response.status_code
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Error forwarding {action} for {cctv_id} to {owner_url}: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Owner node {owner_url} unreachable'
+        }), 502
+
+def require_admin(view):
+    """
+    Batasi endpoint ke admin: header token harus sama dengan ADMIN_TOKEN.
+    Jika ADMIN_TOKEN tidak di-set, endpoint admin nonaktif.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = ADMIN_CONFIG['token']
+        provided = request.headers.get(ADMIN_CONFIG['header'], '')
+        if not token or not hmac.compare_digest(provided.encode(), token.encode()):
+            return jsonify({
+                'status': 'error',
+                'message': 'Admin token required'
+            }), 403
+        return view(*args, **kwargs)
+    return wrapper
+
 # ====== API ENDPOINTS ======
 
 @app.route('/', methods=['GET'])
@@ -112,7 +166,7 @@ def get_status():
             'data': {
                 'system_status': status,
                 'available_cameras': list(cameras.keys()),
-                'active_cameras': [cid for cid, config in cameras.items() if config.get('status') == 'active'],
+                'active_cameras': cctv_config.get_active_cameras(),
                 'timestamp': datetime.now().isoformat()
             }
         })
@@ -128,19 +182,27 @@ def get_status():
 def get_cameras():
     """
     Endpoint untuk mendapatkan daftar kamera
+    Filter opsional (memakai index registry): ?status=&priority=&area=
     """
     try:
-        cameras = cctv_config.get_all_cameras()
+        registry = cctv_config.registry
+        camera_ids = registry.query(
+            status=request.args.get('status'),
+            priority=request.args.get('priority'),
+            area=request.args.get('area')
+        )
         
         # Format response
         camera_list = []
-        for cctv_id, config in cameras.items():
+        for cctv_id in camera_ids:
+            config = registry.get(cctv_id)
             camera_info = {
                 'id': cctv_id,
                 'name': config.get('name', 'Unknown'),
                 'status': config.get('status', 'inactive'),
                 'priority': config.get('priority', 'low'),
                 'location': config.get('location', {}),
+                'area': config.get('area'),
                 'is_detection_running': detector.running_detections.get(cctv_id, False) if detector else False
             }
             camera_list.append(camera_info)
@@ -150,7 +212,8 @@ def get_cameras():
             'data': {
                 'cameras': camera_list,
                 'total': len(camera_list),
-                'active': len([c for c in camera_list if c['status'] == 'active'])
+                'active': len([c for c in camera_list if c['status'] == 'active']),
+                'registry': registry.get_stats()
             }
         })
         
@@ -161,6 +224,78 @@ def get_cameras():
             'message': str(e)
         }), 500
 
+@app.route('/cameras/nearby', methods=['GET'])
+def get_nearby_cameras():
+    """
+    Endpoint untuk kamera dalam radius (meter) dari suatu titik: ?lat=&lng=&radius=&status=
+    """
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    radius = request.args.get('radius', default=500, type=float)
+    if lat is None or lng is None or radius <= 0:
+        return jsonify({
+            'status': 'error',
+            'message': 'lat, lng and a positive radius (meters) are required'
+        }), 400
+    
+    try:
+        registry = cctv_config.registry
+        cameras = []
+        for match in registry.nearby(lat, lng, radius, status=request.args.get('status')):
+            config = registry.get(match['id'])
+            cameras.append({
+                **match,
+                'name': config.get('name', 'Unknown'),
+                'status': config.get('status', 'inactive'),
+                'location': config.get('location', {}),
+                'area': config.get('area'),
+                'is_detection_running': detector.running_detections.get(match['id'], False) if detector else False
+            })
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'cameras': cameras,
+                'total': len(cameras),
+                'center': {'lat': lat, 'lng': lng},
+                'radius_m': radius
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Error finding nearby cameras: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/cameras/reload', methods=['POST'])
+def reload_cameras():
+    """
+    Endpoint untuk memuat ulang registry kamera dari file sumber
+    """
+    try:
+        registry = cctv_config.registry
+        if not registry.reload():
+            return jsonify({
+                'status': 'error',
+                'message': 'Failed to reload camera registry'
+            }), 500
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Camera registry reloaded',
+            'data': registry.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error reloading cameras: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @app.route('/start/<cctv_id>', methods=['POST'])
 def start_detection(cctv_id):
     """
@@ -179,20 +314,28 @@ def start_detection(cctv_id):
                 'message': f'Camera {cctv_id} is not active or does not exist'
             }), 400
         
+        forwarded = forward_to_owner(cctv_id, 'start')
+        if forwarded:
+            return forwarded
+        
         success = detector.start_detection(cctv_id)
         
         if success:
-            logger.info(f"✅ Detection started for {cctv_id}")
+            logger.info(f"⏳ Detection start requested for {cctv_id}")
+            # Kamera dibuka di background; state bisa dipantau lewat /detection-state/<cctv_id>
             return jsonify({
                 'status': 'success',
-                'message': f'Detection started for camera {cctv_id}',
+                'message': f'Detection starting for camera {cctv_id}',
                 'cctv_id': cctv_id,
+                'state': 'pending',
+                'state_url': f'/detection-state/{cctv_id}',
                 'timestamp': datetime.now().isoformat()
-            })
+            }), 202
         else:
             return jsonify({
                 'status': 'error',
-                'message': f'Failed to start detection for camera {cctv_id}'
+                'message': f'Failed to start detection for camera {cctv_id}',
+                'state': detector.get_detection_state(cctv_id)['state']
             }), 500
     
     except Exception as e:
@@ -202,6 +345,40 @@ def start_detection(cctv_id):
             'message': str(e)
         }), 500
 
+@app.route('/detection-state/<cctv_id>', methods=['GET'])
+def get_detection_state(cctv_id):
+    """
+    Endpoint untuk memantau state start kamera (pending/running/open_failed/...).
+    Parameter ?wait=<detik> menunggu hingga pembukaan kamera selesai (long-poll).
+    """
+    try:
+        if not detector:
+            return jsonify({
+                'status': 'error',
+                'message': 'Detector not initialized'
+            }), 500
+        
+        forwarded = forward_to_owner(cctv_id, 'detection-state', method='GET')
+        if forwarded:
+            return forwarded
+        
+        wait = min(request.args.get('wait', default=0, type=float), 30.0)
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                **detector.get_detection_state(cctv_id, wait=wait),
+                'timestamp': datetime.now().isoformat()
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error getting detection state for {cctv_id}: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @app.route('/stop/<cctv_id>', methods=['POST'])
 def stop_detection(cctv_id):
     """
@@ -214,6 +391,10 @@ def stop_detection(cctv_id):
                 'message': 'Detector not initialized'
             }), 500
         
+        forwarded = forward_to_owner(cctv_id, 'stop')
+        if forwarded:
+            return forwarded
+        
         success = detector.stop_detection(cctv_id)
         
         if success:
@@ -322,6 +503,9 @@ def get_detection_stats():
             'detection_counters': detector.detection_counters,
             'auto_rotation_status': detector.auto_rotation_running,
             'current_rotation_cameras': detector.current_rotation_cameras,
+            'cameras_per_rotation': detector.cameras_per_rotation,
+            'concurrency': detector.concurrency.get_stats() if detector.concurrency else {'enabled': False},
+            'pipeline': detector.pipeline.get_stats() if detector.pipeline else {'enabled': False},
             'timestamp': datetime.now().isoformat()
         }
         
@@ -337,6 +521,388 @@ def get_detection_stats():
             'message': str(e)
         }), 500
 
+@app.route('/cluster', methods=['GET'])
+def get_cluster_status():
+    """
+    Endpoint untuk status sharding: membership node dan kamera milik node ini
+    """
+    if not detector:
+        return jsonify({
+            'status': 'error',
+            'message': 'Detector not initialized'
+        }), 500
+    
+    if not detector.shard_manager:
+        return jsonify({
+            'status': 'success',
+            'data': {'enabled': False}
+        })
+    
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'enabled': True,
+            **detector.shard_manager.get_status(),
+            'timestamp': datetime.now().isoformat()
+        }
+    })
+
+@app.route('/stream-health', methods=['GET'])
+def get_stream_health():
+    """
+    Endpoint untuk mendapatkan status kesehatan stream per kamera
+    """
+    try:
+        if not detector:
+            return jsonify({
+                'status': 'error',
+                'message': 'Detector not initialized'
+            }), 500
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                **detector.stream_supervisor.get_health(),
+                'timestamp': datetime.now().isoformat()
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting stream health: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/logging', methods=['GET'])
+def logging_stats():
+    """Endpoint untuk statistik pipeline logging"""
+    try:
+        return jsonify({
+            'status': 'success',
+            'data': get_logging_stats()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting logging stats: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/logging', methods=['POST'])
+@require_admin
+def logging_settings():
+    """
+    Endpoint untuk mengubah level per subsistem saat runtime (admin).
+    POST body: {"levels": {"yolo_detect": "DEBUG", "stream_supervisor": "WARNING"}}
+    """
+    try:
+        levels = (request.get_json(silent=True) or {}).get('levels', {})
+        invalid = [lvl for lvl in levels.values() if not isinstance(logging.getLevelName(str(lvl).upper()), int)]
+        if invalid:
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid log level: {invalid[0]}'
+            }), 400
+        for name, level in levels.items():
+            set_level(name, level)
+        
+        return jsonify({
+            'status': 'success',
+            'data': get_logging_stats()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error updating logging settings: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+# ====== ADMIN / PROFILING ======
+
+@app.route('/admin/profile', methods=['GET'])
+@require_admin
+def admin_profile():
+    """
+    Sampling profiler semua thread selama ?seconds= (default 10), hasil collapsed stacks
+    yang bisa langsung dibuka di flamegraph.pl / speedscope
+    """
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), ADMIN_CONFIG['max_profile_seconds'])
+        interval = max(float(request.args.get('interval', 0.005)), ADMIN_CONFIG['min_profile_interval'])
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'seconds and interval must be numbers'
+        }), 400
+    
+    collapsed = sampling_profiler.profile(seconds, interval)
+    if collapsed is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Another profiling session is running'
+        }), 409
+    
+    filename = f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.collapsed"
+    return Response(collapsed, mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/admin/stacks', methods=['GET'])
+@require_admin
+def admin_stacks():
+    """
+    Stack saat ini dari setiap thread; thread deteksi diberi label cctv_id
+    """
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'threads': dump_stacks(),
+            'timestamp': datetime.now().isoformat()
+        }
+    })
+
+@app.route('/admin/stage-timing', methods=['GET', 'POST'])
+@require_admin
+def admin_stage_timing():
+    """
+    Nyalakan/matikan timing per tahap di detection loop dan baca hasilnya.
+    POST body: {"enabled": true, "reset": false}
+    """
+    if not detector:
+        return jsonify({
+            'status': 'error',
+            'message': 'Detector not initialized'
+        }), 500
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if data.get('reset'):
+            detector.stage_timings.reset()
+        if 'enabled' in data:
+            detector.stage_timings.set_enabled(bool(data['enabled']))
+    
+    return jsonify({
+        'status': 'success',
+        'data': detector.stage_timings.get_stats()
+    })
+
+@app.route('/admin/memory', methods=['GET'])
+@require_admin
+def admin_memory():
+    """
+    Akuntansi memori per kamera, tren RSS dan diff tracemalloc periodik terakhir.
+    ?diff=now|baseline mengambil snapshot baru dan membandingkannya sekarang.
+    """
+    if not detector:
+        return jsonify({
+            'status': 'error',
+            'message': 'Detector not initialized'
+        }), 500
+    
+    monitor = detector.memory_monitor
+    report = monitor.get_report()
+    diff = request.args.get('diff')
+    if diff in ('now', 'baseline'):
+        report['tracemalloc']['diff'] = monitor.snapshot_diff(since_baseline=diff == 'baseline')
+    
+    return jsonify({
+        'status': 'success',
+        'data': report
+    })
+
+@app.route('/admin/memory/tracemalloc', methods=['POST'])
+@require_admin
+def admin_memory_tracemalloc():
+    """
+    Nyalakan/matikan tracemalloc. POST body: {"enabled": true}
+    """
+    if not detector:
+        return jsonify({
+            'status': 'error',
+            'message': 'Detector not initialized'
+        }), 500
+    
+    data = request.get_json(silent=True) or {}
+    detector.memory_monitor.set_tracemalloc(bool(data.get('enabled')))
+    return jsonify({
+        'status': 'success',
+        'data': detector.memory_monitor.get_report()['tracemalloc']
+    })
+
+@app.route('/detections', methods=['GET'])
+def get_detections():
+    """
+    Endpoint untuk riwayat deteksi di memori: filter kamera, kelas (dipisah koma) dan
+    rentang waktu (unix timestamp). Dengan ?rollup=minute|hour hasilnya berupa agregat per bucket.
+    """
+    try:
+        if not detector:
+            return jsonify({
+                'status': 'error',
+                'message': 'Detector not initialized'
+            }), 500
+        
+        if not detector.detection_store:
+            return jsonify({
+                'status': 'error',
+                'message': 'Detection store is disabled'
+            }), 404
+        
+        started = time.perf_counter()
+        classes = [c.strip() for c in request.args.get('class', '').split(',') if c.strip()] or None
+        filters = {
+            'cctv_id': request.args.get('cctv_id'),
+            'classes': classes,
+            'start': request.args.get('start', type=float),
+            'end': request.args.get('end', type=float),
+        }
+        
+        resolution = request.args.get('rollup')
+        if resolution:
+            if resolution not in ('minute', 'hour'):
+                return jsonify({
+                    'status': 'error',
+                    'message': "rollup must be 'minute' or 'hour'"
+                }), 400
+            data = {'rollup': resolution, 'buckets': detector.detection_store.rollup(resolution=resolution, **filters)}
+        else:
+            data = detector.detection_store.query(
+                min_confidence=request.args.get('min_confidence', type=float),
+                limit=min(request.args.get('limit', default=100, type=int), DETECTION_STORE_CONFIG['max_query_limit']),
+                **filters
+            )
+        
+        data['query_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return jsonify({
+            'status': 'success',
+            'data': data
+        })
+        
+    except Exception as e:
+        logger.error(f"Error querying detections: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/incidents', methods=['GET'])
+def get_incidents():
+    """
+    Endpoint untuk query jurnal insiden lokal (tanpa Laravel): filter kamera, tipe,
+    rentang waktu (unix timestamp) dan status sinkronisasi
+    """
+    try:
+        if not detector:
+            return jsonify({
+                'status': 'error',
+                'message': 'Detector not initialized'
+            }), 500
+        
+        if not detector.incident_journal:
+            return jsonify({
+                'status': 'error',
+                'message': 'Incident journal is disabled'
+            }), 404
+        
+        incidents = detector.incident_journal.query(
+            cctv_id=request.args.get('cctv_id'),
+            incident_type=request.args.get('type'),
+            start=request.args.get('start', type=float),
+            end=request.args.get('end', type=float),
+            sync_state=request.args.get('sync_state'),
+            limit=min(request.args.get('limit', default=100, type=int), INCIDENT_JOURNAL_CONFIG['max_query_limit'])
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'incidents': incidents,
+                'total': len(incidents)
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Error querying incident journal: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/incidents/replay', methods=['POST'])
+@require_admin
+def replay_incidents():
+    """
+    Endpoint admin untuk langsung me-replay insiden yang belum tersinkron ke Laravel
+    """
+    if not detector or not detector.journal_replayer:
+        return jsonify({
+            'status': 'error',
+            'message': 'Incident journal is disabled'
+        }), 404
+    
+    detector.journal_replayer.trigger()
+    return jsonify({
+        'status': 'success',
+        'data': detector.journal_replayer.get_stats()
+    })
+
+@app.route('/screenshots', methods=['GET'])
+def get_screenshots():
+    """
+    Endpoint untuk mencari screenshot berdasarkan kamera dan rentang waktu (unix timestamp)
+    """
+    try:
+        if not detector:
+            return jsonify({
+                'status': 'error',
+                'message': 'Detector not initialized'
+            }), 500
+        
+        screenshots = detector.screenshot_store.query(
+            cctv_id=request.args.get('cctv_id'),
+            start=request.args.get('start', type=float),
+            end=request.args.get('end', type=float),
+            limit=min(request.args.get('limit', default=100, type=int), 1000)
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'screenshots': screenshots,
+                'total': len(screenshots),
+                'store': detector.screenshot_store.get_stats()
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Error querying screenshots: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/screenshots/<digest>', methods=['GET'])
+def get_screenshot_file(digest):
+    """
+    Endpoint untuk mengambil file screenshot berdasarkan hash konten
+    """
+    if not detector:
+        return jsonify({
+            'status': 'error',
+            'message': 'Detector not initialized'
+        }), 500
+    
+    path = detector.screenshot_store.get_path(digest)
+    if path is None or not os.path.exists(path):
+        return jsonify({
+            'status': 'error',
+            'message': f'Screenshot {digest} not found'
+        }), 404
+    
+    return send_file(path, mimetype='image/jpeg')
+
 @app.route('/test-detection', methods=['POST'])
 def test_detection():
     """
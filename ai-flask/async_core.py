@@ -0,0 +1,265 @@
+# async_core.py
+# Core penjadwalan berbasis asyncio: satu event loop + timer wheel untuk tick deteksi, rotasi
+# dan reconnect, dengan executor berukuran tetap untuk decode dan inferensi
+
+import asyncio
+import logging
+import math
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from profiler import DETECTION_THREAD_PREFIX
+
+
+class TimerHandle:
+    """Timer terjadwal di TimerWheel; cancel() aman dipanggil dari thread mana pun"""
+
+    __slots__ = ('callback', 'rounds', 'cancelled')
+
+    def __init__(self, callback: Callable[[], None]):
+        self.callback = callback
+        self.rounds = 0
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: schedule dan cancel O(1) berapa pun jumlah timer.
+    Jeda lebih panjang dari satu putaran disimpan sebagai sisa putaran (rounds).
+    Hanya diakses dari thread event loop.
+    """
+
+    def __init__(self, tick_seconds: float, slots: int):
+        self.tick_seconds = tick_seconds
+        self.slots: List[List[TimerHandle]] = [[] for _ in range(slots)]
+        self.cursor = 0
+        self.pending = 0
+        self.fired = 0
+
+    def add(self, handle: TimerHandle, delay: float):
+        ticks = max(1, math.ceil(delay / self.tick_seconds))
+        handle.rounds = (ticks - 1) // len(self.slots)
+        self.slots[(self.cursor + ticks) % len(self.slots)].append(handle)
+        self.pending += 1
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> TimerHandle:
+        handle = TimerHandle(callback)
+        self.add(handle, delay)
+        return handle
+
+    def advance(self) -> List[TimerHandle]:
+        """Maju satu tick; kembalikan timer yang jatuh tempo (timer yang dibatalkan dibuang)"""
+        self.cursor = (self.cursor + 1) % len(self.slots)
+        due, remaining = [], []
+        for handle in self.slots[self.cursor]:
+            if handle.cancelled:
+                self.pending -= 1
+            elif handle.rounds == 0:
+                self.pending -= 1
+                due.append(handle)
+            else:
+                handle.rounds -= 1
+                remaining.append(handle)
+        self.slots[self.cursor] = remaining
+        self.fired += len(due)
+        return due
+
+
+class CaptureLease:
+    """
+    Capture milik satu task kamera. Operasi blocking (read/open) berjalan di executor;
+    jika task dibatalkan di tengah operasi, release ditunda sampai operasi itu selesai
+    agar capture tidak dilepas saat masih dibaca thread lain.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self._pending: Optional[Future] = None
+        self._pending_opens = False
+
+    async def call(self, executor: ThreadPoolExecutor, fn: Callable, *args, opens: bool = False):
+        """opens=True: hasil fn adalah capture baru yang harus dilepas jika tidak sempat dipakai"""
+        self._pending = executor.submit(fn, *args)
+        self._pending_opens = opens
+        result = await asyncio.wrap_future(self._pending)
+        self._pending = None
+        return result
+
+    def release(self):
+        cap, pending = self.cap, self._pending
+        self.cap = self._pending = None
+        if pending is None:
+            if cap is not None:
+                cap.release()
+            return
+
+        opens = self._pending_opens
+
+        def _release(future: Future):
+            if cap is not None:
+                cap.release()
+            if opens and not future.cancelled() and future.exception() is None and future.result() is not None:
+                future.result().release()
+
+        pending.add_done_callback(_release)
+
+
+class AsyncCore:
+    """
+    Satu event loop (di thread sendiri) menggantikan thread + sleep per kamera.
+    Setiap kamera adalah task asyncio yang bisa dibatalkan seketika; cap.read() dan
+    pembukaan stream berjalan di executor decode, inferensi di executor infer.
+    """
+
+    def __init__(self, config: Dict, logger: Optional[logging.Logger] = None,
+                 infer_initializer: Optional[Callable[[], None]] = None):
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+        self.wheel = TimerWheel(config['tick_seconds'], config['wheel_slots'])
+        self.decode_executor = ThreadPoolExecutor(config['decode_workers'], thread_name_prefix='decode')
+        self.infer_executor = ThreadPoolExecutor(config['infer_workers'], thread_name_prefix='infer',
+                                                 initializer=infer_initializer)
+
+        self.loop = asyncio.new_event_loop()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._thread = None
+        self._wheel_task = None
+        self.loop_lag_ms = 0.0
+        self.max_loop_lag_ms = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run_loop, name='async-core', daemon=True)
+        self._thread.start()
+        self.logger.info(
+            f"⚙️ Async core started: decode×{self.config['decode_workers']}, "
+            f"infer×{self.config['infer_workers']}, tick {self.config['tick_seconds'] * 1000:.0f} ms"
+        )
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self._wheel_task = self.loop.create_task(self._drive_wheel())
+        self.loop.run_forever()
+
+    def _in_loop(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    async def _drive_wheel(self):
+        tick = self.wheel.tick_seconds
+        next_tick = self.loop.time() + tick
+        while True:
+            await asyncio.sleep(max(next_tick - self.loop.time(), 0))
+            now = self.loop.time()
+            lag_ms = (now - next_tick) * 1000
+            self.loop_lag_ms = round(lag_ms, 2)
+            self.max_loop_lag_ms = max(self.max_loop_lag_ms, self.loop_lag_ms)
+
+            # Loop tertinggal beberapa tick: kejar agar timer tidak bergeser
+            while next_tick <= now:
+                for handle in self.wheel.advance():
+                    try:
+                        handle.callback()
+                    except Exception as e:
+                        self.logger.error(f"Error in timer callback: {e}")
+                next_tick += tick
+
+    # ====== Timer ======
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> TimerHandle:
+        """Jadwalkan callback (dijalankan di event loop, jangan blocking); aman dari thread mana pun"""
+        handle = TimerHandle(callback)
+        if self._in_loop():
+            self.wheel.add(handle, delay)
+        else:
+            self.loop.call_soon_threadsafe(self.wheel.add, handle, delay)
+        return handle
+
+    async def sleep(self, delay: float):
+        """asyncio.sleep lewat timer wheel; batal seketika jika task dibatalkan"""
+        future = self.loop.create_future()
+        handle = self.wheel.schedule(delay, lambda: future.done() or future.set_result(None))
+        try:
+            await future
+        finally:
+            handle.cancel()
+
+    # ====== Task kamera ======
+
+    def start_camera(self, cctv_id: str, coro_fn: Callable, *args, on_done: Optional[Callable[[], None]] = None):
+        """
+        Jalankan coro_fn(*args) sebagai task kamera. on_done dipanggil sekali saat task
+        selesai atau dibatalkan (juga jika dibatalkan sebelum sempat berjalan).
+        """
+        self.loop.call_soon_threadsafe(self._spawn, cctv_id, coro_fn, args, on_done)
+
+    def _spawn(self, cctv_id: str, coro_fn: Callable, args, on_done):
+        previous = self._tasks.pop(cctv_id, None)
+        if previous is not None:
+            previous.cancel()
+        task = self.loop.create_task(coro_fn(*args), name=f"{DETECTION_THREAD_PREFIX}{cctv_id}")
+        self._tasks[cctv_id] = task
+        task.add_done_callback(lambda t: self._finished(cctv_id, t, on_done))
+
+    def _finished(self, cctv_id: str, task: asyncio.Task, on_done):
+        if self._tasks.get(cctv_id) is task:
+            del self._tasks[cctv_id]
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error(f"Camera task {cctv_id} failed: {task.exception()}")
+        if on_done is not None:
+            try:
+                on_done()
+            except Exception as e:
+                self.logger.error(f"Error cleaning up camera task {cctv_id}: {e}")
+
+    def cancel_camera(self, cctv_id: str):
+        self.loop.call_soon_threadsafe(self._cancel, cctv_id)
+
+    def _cancel(self, cctv_id: str):
+        task = self._tasks.pop(cctv_id, None)
+        if task is not None:
+            task.cancel()
+
+    # ====== Shutdown & status ======
+
+    async def _shutdown(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._wheel_task is not None:
+            self._wheel_task.cancel()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        timeout = self.config['shutdown_timeout']
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Async core shutdown incomplete: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self.decode_executor.shutdown(wait=False, cancel_futures=True)
+        self.infer_executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict:
+        return {
+            'mode': 'asyncio',
+            'camera_tasks': len(self._tasks),
+            'timers_pending': self.wheel.pending,
+            'timers_fired': self.wheel.fired,
+            'tick_ms': self.wheel.tick_seconds * 1000,
+            'loop_lag_ms': self.loop_lag_ms,
+            'max_loop_lag_ms': self.max_loop_lag_ms,
+            'decode_workers': self.config['decode_workers'],
+            'decode_queue': self.decode_executor._work_queue.qsize(),
+            'infer_workers': self.config['infer_workers'],
+            'infer_queue': self.infer_executor._work_queue.qsize(),
+            'threads': threading.active_count(),
+        }
@@ -0,0 +1,354 @@
+# autotune.py
+# Benchmark kombinasi thread torch, thread OpenCV, worker inferensi dan batch size pada mesin ini
+# dengan video sampel lokal, lalu simpan konfigurasi terbaik untuk diterapkan YOLODetector saat start
+#
+# Penggunaan:
+#   python autotune.py                          # benchmark semua kombinasi + simpan hasil terbaik
+#   python autotune.py --trial-seconds 5 --max-trials 12
+#   python autotune.py --list                   # tampilkan kombinasi tanpa menjalankan
+
+import argparse
+import glob
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from cctv_config import AUTOTUNE_CONFIG, CONCURRENCY_CONFIG, DETECTION_CONFIG, QUANTIZATION_CONFIG
+from quantize import base_model_path, calibration_frames, quantized_model_path
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.mov', '.ts')
+SETTING_KEYS = ('torch_threads', 'opencv_threads', 'infer_workers', 'batch_size')
+
+logger = logging.getLogger(__name__)
+
+
+# ====== Penerapan (dipakai YOLODetector) ======
+
+def load_tuning(config: Dict = AUTOTUNE_CONFIG) -> Optional[Dict]:
+    """
+    Konfigurasi terbaik hasil autotune, None jika belum ada atau dibuat di mesin dengan
+    jumlah core berbeda (hasilnya tidak berlaku untuk mesin ini)
+    """
+    path = config['output_path']
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+        cpu_count = report['cpu_count']
+        best = report['best']
+        # File rusak/terpotong tidak boleh menggagalkan start detector: abaikan seluruh hasil
+        settings = {key: int(best[key]) for key in SETTING_KEYS} if best is not None else None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"⚠️ Ignoring {path}: unreadable autotune result ({e}); run `python autotune.py` again")
+        return None
+    if cpu_count != os.cpu_count():
+        logger.warning(
+            f"⚠️ Ignoring {path}: tuned on {cpu_count} cores, this machine has {os.cpu_count()}; "
+            f"run `python autotune.py` again"
+        )
+        return None
+    return settings
+
+
+def apply_thread_settings(settings: Dict):
+    """Atur pool thread intra-op torch dan pool thread internal OpenCV (berlaku untuk seluruh proses)"""
+    cv2.setNumThreads(settings['opencv_threads'])
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(settings['torch_threads'])
+
+
+def core_sets(settings: Dict, cores: Optional[List[int]] = None) -> List[List[int]]:
+    """
+    Bagi core yang boleh dipakai proses menjadi satu set per worker inferensi, masing-masing
+    torch_threads core, agar worker tidak saling berebut core
+    """
+    cores = sorted(cores if cores is not None else os.sched_getaffinity(0))
+    size = max(1, min(settings['torch_threads'], len(cores) // max(settings['infer_workers'], 1)))
+    return [cores[i * size:(i + 1) * size] for i in range(settings['infer_workers']) if (i + 1) * size <= len(cores)]
+
+
+def core_pinner(settings: Dict) -> Optional[Callable[[], None]]:
+    """
+    Initializer thread worker inferensi: setiap thread yang memanggilnya di-pin ke set core
+    berikutnya (round-robin). None jika OS tidak mendukung affinity per thread.
+
+    Batasan: torch.set_num_threads dan pool intra-op torch berlaku untuk seluruh proses,
+    bukan per worker. Thread OpenMP hanya mewarisi affinity jika dibuat setelah pin, dan
+    runtime OpenMP bisa memakai ulang thread yang sudah ada di core lain, jadi pinning ini
+    tidak menjamin komputasi torch terbagi per set core. Yang pasti ter-pin hanyalah thread
+    worker itu sendiri (pre/post-processing, decode). Untuk isolasi core yang benar
+    jalankan beberapa proses detector (`taskset` / sharding), satu set core per proses.
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        logger.warning("⚠️ Core pinning is not supported on this platform")
+        return None
+    sets = core_sets(settings)
+    if not sets:
+        return None
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def pin():
+        with lock:
+            index = next(counter) % len(sets)
+        # Linux: pid 0 berarti thread pemanggil, bukan seluruh proses
+        os.sched_setaffinity(0, sets[index])
+
+    return pin
+
+
+# ====== Benchmark ======
+
+def sample_videos(config: Dict = AUTOTUNE_CONFIG) -> List[str]:
+    return sorted(
+        path for path in glob.glob(os.path.join(config['sample_dir'], '**', '*'), recursive=True)
+        if path.lower().endswith(VIDEO_EXTENSIONS)
+    )
+
+
+def _auto_candidates(values: Optional[List[int]], cores: int, start: int = 1) -> List[int]:
+    if values is not None:
+        return values
+    candidates, value = [], start
+    while value < cores:
+        candidates.append(value)
+        value = value * 2 if value else 1
+    return candidates + [cores]
+
+
+def candidate_settings(config: Dict = AUTOTUNE_CONFIG, cores: Optional[int] = None) -> List[Dict]:
+    """
+    Kombinasi yang dibenchmark. Kombinasi dengan torch_threads × infer_workers melebihi
+    jumlah core dibuang (pasti oversubscribe) kecuali tidak ada kombinasi lain.
+    """
+    cores = cores or os.cpu_count() or 1
+    grid = [
+        {'torch_threads': torch_threads, 'opencv_threads': opencv_threads,
+         'infer_workers': infer_workers, 'batch_size': batch_size}
+        for torch_threads, opencv_threads, infer_workers, batch_size in itertools.product(
+            _auto_candidates(config['torch_threads'], cores),
+            _auto_candidates(config['opencv_threads'], cores, start=0),
+            config['infer_workers'],
+            config['batch_sizes'],
+        )
+    ]
+    fitting = [s for s in grid if s['torch_threads'] * s['infer_workers'] <= cores]
+    return fitting or grid
+
+
+def _frame_source(videos: List[str], images: List[str], stop: threading.Event) -> Iterator[np.ndarray]:
+    """Frame tanpa henti: decode video sampel (diulang), atau decode ulang gambar kalibrasi"""
+    while not stop.is_set():
+        if videos:
+            for path in videos:
+                cap = cv2.VideoCapture(path)
+                while not stop.is_set():
+                    ok, frame = cap.read()
+                    if not ok:
+                        break
+                    yield frame
+                cap.release()
+        else:
+            for path in images:
+                frame = cv2.imread(path)
+                if frame is not None:
+                    yield frame
+
+
+def _run_trial(settings: Dict, model_path: str, config: Dict, videos: List[str], images: List[str], results):
+    """Dijalankan di proses terpisah agar pengaturan thread torch/OpenCV tiap trial tidak saling memengaruhi"""
+    try:
+        apply_thread_settings(settings)
+        from ultralytics import YOLO
+
+        model = YOLO(model_path, task='detect')
+        pin = core_pinner(settings) if config['pin_cores'] else None
+        batch_size = settings['batch_size']
+        frames = queue.Queue(maxsize=batch_size * settings['infer_workers'] * 2)
+        stop = threading.Event()
+        measuring = threading.Event()
+        latencies: List[float] = []
+        processed = [0]
+        lock = threading.Lock()
+
+        def decode():
+            for frame in _frame_source(videos, images, stop):
+                while not stop.is_set():
+                    try:
+                        frames.put(frame, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+
+        def infer():
+            if pin:
+                pin()
+            while not stop.is_set():
+                try:
+                    batch = [frames.get(timeout=1.0) for _ in range(batch_size)]
+                except queue.Empty:
+                    continue
+                started = time.perf_counter()
+                model(batch, imgsz=config['imgsz'], verbose=False)
+                elapsed = time.perf_counter() - started
+                if measuring.is_set():
+                    with lock:
+                        latencies.append(elapsed * 1000)
+                        processed[0] += len(batch)
+
+        threads = [threading.Thread(target=decode, daemon=True)]
+        threads += [threading.Thread(target=infer, daemon=True) for _ in range(settings['infer_workers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(config['warmup_seconds'])
+        measuring.set()
+        started = time.perf_counter()
+        time.sleep(config['trial_seconds'])
+        measuring.clear()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in threads:
+            thread.join(5)
+
+        with lock:
+            results.put({
+                **settings,
+                'fps': round(processed[0] / elapsed, 2),
+                'batches': len(latencies),
+                'latency_ms_p50': round(float(np.percentile(latencies, 50)), 2) if latencies else None,
+                'latency_ms_p95': round(float(np.percentile(latencies, 95)), 2) if latencies else None,
+            })
+    except Exception as e:
+        results.put({**settings, 'error': str(e)})
+
+
+def run_trial(settings: Dict, model_path: str, config: Dict, videos: List[str], images: List[str]) -> Dict:
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_run_trial, args=(settings, model_path, config, videos, images, results))
+    process.start()
+    try:
+        result = results.get(timeout=config['warmup_seconds'] + config['trial_seconds'] + config['trial_timeout'])
+    except queue.Empty:
+        process.kill()
+        result = {**settings, 'error': 'trial timed out'}
+    process.join()
+    return result
+
+
+def pick_best(trials: List[Dict], latency_slo_ms: float) -> Optional[Dict]:
+    """
+    Throughput tertinggi di antara trial yang p95 latensi batch-nya memenuhi SLO;
+    jika tidak ada yang memenuhi, trial dengan p95 terendah
+    """
+    valid = [t for t in trials if 'error' not in t and t['latency_ms_p95'] is not None]
+    if not valid:
+        return None
+    within = [t for t in valid if t['latency_ms_p95'] <= latency_slo_ms]
+    if within:
+        return max(within, key=lambda t: t['fps'])
+    return min(valid, key=lambda t: t['latency_ms_p95'])
+
+
+def autotune(config: Dict = AUTOTUNE_CONFIG, max_trials: Optional[int] = None) -> Dict:
+    videos = sample_videos(config)
+    images = [] if videos else calibration_frames(QUANTIZATION_CONFIG)
+    if not videos and not images:
+        raise RuntimeError(
+            f"No sample video in {config['sample_dir']} and no calibration frames in "
+            f"{QUANTIZATION_CONFIG['calibration_dir']}"
+        )
+
+    # Model yang benar-benar dipakai detector (varian presisi rendah jika sudah dibuat)
+    model_path = quantized_model_path(base_model_path(), DETECTION_CONFIG['precision'])
+    if not os.path.exists(model_path):
+        model_path = base_model_path()
+
+    candidates = candidate_settings(config)[:max_trials]
+    latency_slo_ms = CONCURRENCY_CONFIG['latency_slo_ms']
+    logger.info(f"🔧 Autotuning {len(candidates)} combinations on {os.cpu_count()} cores "
+                f"({len(videos)} videos, {len(images)} images, model {model_path})")
+
+    trials = []
+    for i, settings in enumerate(candidates, 1):
+        result = run_trial(settings, model_path, config, videos, images)
+        trials.append(result)
+        logger.info(f"[{i}/{len(candidates)}] {result}")
+
+    # Pipeline menginferensi satu frame per kamera, jadi yang diterapkan adalah trial batch 1;
+    # hasil batch lebih besar disimpan sebagai acuan
+    unbatched = [t for t in trials if t['batch_size'] == 1]
+    best = pick_best(unbatched or trials, latency_slo_ms)
+    best_by_batch = {
+        str(batch_size): pick_best([t for t in trials if t['batch_size'] == batch_size], latency_slo_ms)
+        for batch_size in config['batch_sizes']
+    }
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cpu_count': os.cpu_count(),
+        'model_path': model_path,
+        'latency_slo_ms': latency_slo_ms,
+        'pin_cores': config['pin_cores'],
+        'best': {key: best[key] for key in SETTING_KEYS} if best else None,
+        'best_by_batch': best_by_batch,
+        'trials': trials,
+    }
+
+    os.makedirs(os.path.dirname(config['output_path']) or '.', exist_ok=True)
+    with open(config['output_path'], 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def print_report(report: Dict, output_path: str):
+    print(f"\n📊 Autotune: {report['cpu_count']} cores, model {report['model_path']}, "
+          f"SLO p95 {report['latency_slo_ms']} ms")
+    print(f"{'torch':>5} {'cv2':>4} {'workers':>7} {'batch':>5} {'fps':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for trial in sorted(report['trials'], key=lambda t: -t.get('fps', 0)):
+        prefix = (f"{trial['torch_threads']:>5} {trial['opencv_threads']:>4} "
+                  f"{trial['infer_workers']:>7} {trial['batch_size']:>5}")
+        if 'error' in trial:
+            print(f"{prefix} error: {trial['error']}")
+            continue
+        print(f"{prefix} {trial['fps']:>8} {str(trial['latency_ms_p50']):>8} {str(trial['latency_ms_p95']):>8}")
+    if report['best']:
+        print(f"🏆 Best: {report['best']}")
+    else:
+        print("❌ No trial succeeded, nothing will be applied")
+    print(f"📝 Saved to {output_path} (applied by YOLODetector at startup)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark thread/worker/batch settings on this machine')
+    parser.add_argument('--trial-seconds', type=float, default=AUTOTUNE_CONFIG['trial_seconds'],
+                        help='Measured seconds per combination')
+    parser.add_argument('--max-trials', type=int, default=None, help='Only run the first N combinations')
+    parser.add_argument('--list', action='store_true', help='List combinations without running them')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    config = {**AUTOTUNE_CONFIG, 'trial_seconds': args.trial_seconds}
+
+    if args.list:
+        for settings in candidate_settings(config)[:args.max_trials]:
+            print(settings)
+        return
+
+    print_report(autotune(config, args.max_trials), config['output_path'])
+
+
+if __name__ == '__main__':
+    main()
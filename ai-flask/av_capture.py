@@ -0,0 +1,127 @@
+# av_capture.py
+# Backend capture berbasis PyAV (libav/FFmpeg) sebagai alternatif cv2.VideoCapture:
+# jumlah thread decoder per stream, transport RTSP, downscale saat konversi di libswscale,
+# mode lewati non-keyframe, dan timestamp PTS asli
+
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    import av
+except ImportError:  # PyAV opsional, hanya dibutuhkan untuk kamera dengan decoder 'pyav'
+    av = None
+
+logger = logging.getLogger(__name__)
+
+SKIP_FRAME_MODES = ('DEFAULT', 'NONREF', 'BIDIR', 'NONINTRA', 'NONKEY', 'ALL')
+
+
+class AVCapture:
+    """
+    Pengganti cv2.VideoCapture dengan antarmuka yang dipakai detector
+    (isOpened, read, release, get). Opsi (dari PYAV_DECODER_CONFIG + 'decoder_options' kamera):
+    - threads / thread_type: thread decoder libav per stream (0 = otomatis)
+    - rtsp_transport: 'tcp' atau 'udp'
+    - width: frame langsung dikonversi ke BGR pada lebar ini (tinggi mengikuti rasio),
+      jadi frame 1080p tidak pernah dibuat penuh lalu di-resize di OpenCV
+    - skip_frame: 'NONKEY' hanya men-decode keyframe (murah untuk kamera statis)
+    Setelah read(), last_pts berisi PTS frame (detik) dan last_frame_time waktu wall-clock
+    frame tersebut (PTS dijangkarkan ke jam lokal pada frame pertama).
+    """
+
+    def __init__(self, url: str, options: Dict, connect_timeout: float, read_timeout: float):
+        self.url = url
+        self.options = options
+        self.container = None
+        self.stream = None
+        self._frames = None
+        self.last_pts: Optional[float] = None
+        self.last_frame_time: Optional[float] = None
+        self._pts_anchor: Optional[float] = None
+        self._size: Optional[Tuple[int, int]] = None
+
+        av_options = {}
+        if url.startswith('rtsp://'):
+            av_options['rtsp_transport'] = options['rtsp_transport']
+        try:
+            self.container = av.open(url, options=av_options, timeout=(connect_timeout, read_timeout))
+            self.stream = self.container.streams.video[0]
+        except (av.error.FFmpegError, IndexError, OSError) as e:
+            logger.warning(f"⚠️ PyAV could not open {url}: {e}")
+            self.release()
+            return
+
+        codec = self.stream.codec_context
+        codec.thread_count = options['threads']
+        codec.thread_type = options['thread_type']
+        if options['skip_frame'] != 'DEFAULT':
+            codec.skip_frame = options['skip_frame']
+        self._frames = self.container.decode(self.stream)
+
+    def isOpened(self) -> bool:
+        return self._frames is not None
+
+    def _output_size(self, frame) -> Tuple[int, int]:
+        if self._size is None:
+            width = self.options['width'] or frame.width
+            width = min(width, frame.width)
+            # libswscale butuh dimensi genap untuk sebagian besar format
+            height = int(round(frame.height * width / frame.width / 2)) * 2
+            self._size = (width - width % 2, height)
+        return self._size
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._frames is None:
+            return False, None
+        try:
+            frame = next(self._frames)
+        except (StopIteration, av.error.FFmpegError, OSError):
+            return False, None
+
+        width, height = self._output_size(frame)
+        image = frame.to_ndarray(width=width, height=height, format='bgr24')
+
+        if frame.time is not None:
+            # Stream reset / PTS mundur: jangkar ulang ke jam lokal
+            if self._pts_anchor is None or self.last_pts is None or frame.time < self.last_pts:
+                self._pts_anchor = time.time() - frame.time
+            self.last_pts = frame.time
+            self.last_frame_time = self._pts_anchor + frame.time
+        else:
+            self.last_frame_time = time.time()
+        return True, image
+
+    def get(self, prop: int) -> float:
+        if self.stream is None:
+            return 0.0
+        if prop == cv2.CAP_PROP_FPS:
+            rate = self.stream.average_rate
+            return float(rate) if rate else 0.0
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self._size[0] if self._size else self.stream.codec_context.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self._size[1] if self._size else self.stream.codec_context.height)
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return (self.last_pts or 0.0) * 1000
+        return 0.0
+
+    def release(self):
+        self._frames = None
+        if self.container is not None:
+            try:
+                self.container.close()
+            except Exception:
+                pass
+            self.container = None
+
+
+def open_av(url: str, options: Dict, connect_timeout: float, read_timeout: float) -> Optional[AVCapture]:
+    """Buka stream dengan PyAV; None jika gagal"""
+    if options['skip_frame'] not in SKIP_FRAME_MODES:
+        raise ValueError(f"Unknown skip_frame '{options['skip_frame']}', expected one of {SKIP_FRAME_MODES}")
+    cap = AVCapture(url, options, connect_timeout, read_timeout)
+    return cap if cap.isOpened() else None
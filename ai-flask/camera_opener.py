@@ -0,0 +1,110 @@
+# camera_opener.py
+# Membuka stream kamera secara asinkron dan paralel dengan timeout koneksi/baca
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Union
+
+import cv2
+
+from av_capture import av, open_av
+from simulator import SIM_SCHEME, open_simulated
+
+DECODER_OPENCV = 'opencv'
+DECODER_PYAV = 'pyav'
+
+
+class CameraOpener:
+    """
+    Pool untuk membuka VideoCapture di luar thread request Flask / loop rotasi.
+    Kamera yang tidak bisa dijangkau tidak lagi memblokir kamera lain.
+    """
+
+    def __init__(self, config: Dict, pyav_config: Dict, logger: Optional[logging.Logger] = None):
+        self.config = config
+        self.pyav_config = pyav_config
+        self.logger = logger or logging.getLogger(__name__)
+        self._pyav_missing_logged = False
+        self.executor = ThreadPoolExecutor(
+            max_workers=config['max_parallel_opens'],
+            thread_name_prefix='camera-open'
+        )
+
+    def open(self, url: Union[str, int], decoder: Optional[str] = None, decoder_options: Optional[Dict] = None):
+        """
+        Buka capture secara blocking dengan timeout koneksi/baca backend FFMPEG.
+        decoder 'pyav' memakai AVCapture (opsi digabung dengan pyav_config), selain itu OpenCV.
+        Mengembalikan capture yang sudah terbuka atau None.
+        """
+        if isinstance(url, str) and url.startswith(SIM_SCHEME):
+            return open_simulated(url)
+        if decoder == DECODER_PYAV and isinstance(url, str):
+            if av is not None:
+                return open_av(url, {**self.pyav_config, **(decoder_options or {})},
+                               self.config['connect_timeout'], self.config['read_timeout'])
+            if not self._pyav_missing_logged:
+                self._pyav_missing_logged = True
+                self.logger.warning("⚠️ PyAV is not installed (pip install av), falling back to OpenCV decoding")
+        if isinstance(url, str) and '://' in url:
+            # Timeout hanya didukung backend FFMPEG (stream jaringan: rtsp/http)
+            cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(self.config['connect_timeout'] * 1000),
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(self.config['read_timeout'] * 1000),
+            ])
+        else:
+            cap = cv2.VideoCapture(url)
+
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def open_async(self, cctv_id: str, url: Union[str, int],
+                   callback: Callable[[str, Optional[object]], None],
+                   decoder: Optional[str] = None, decoder_options: Optional[Dict] = None) -> Future:
+        """
+        Buka capture di background. callback(cctv_id, cap) dipanggil tepat sekali:
+        dengan capture jika berhasil, atau None jika gagal / melewati deadline.
+        """
+        result = Future()
+        lock = threading.Lock()
+        finished = []
+        deadline = self.config['connect_timeout'] + self.config['open_deadline_grace']
+
+        def finish(cap) -> bool:
+            with lock:
+                if finished:
+                    return False
+                finished.append(True)
+            try:
+                callback(cctv_id, cap)
+            finally:
+                # Future selesai setelah callback agar penunggu melihat state akhir
+                result.set_result(cap)
+            return True
+
+        def on_deadline():
+            if finish(None):
+                self.logger.warning(f"⏱️ Opening {cctv_id} exceeded {deadline:.1f}s deadline")
+
+        def worker():
+            # Deadline dihitung sejak pembukaan dimulai, bukan sejak masuk antrean pool
+            timer = threading.Timer(deadline, on_deadline)
+            timer.daemon = True
+            timer.start()
+            try:
+                cap = self.open(url, decoder, decoder_options)
+            except Exception as e:
+                self.logger.error(f"Error opening camera {cctv_id}: {e}")
+                cap = None
+            timer.cancel()
+            # Backend yang mengabaikan timeout bisa selesai setelah deadline: lepaskan capture-nya
+            if not finish(cap) and cap is not None:
+                cap.release()
+
+        self.executor.submit(worker)
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
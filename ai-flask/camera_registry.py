@@ -0,0 +1,289 @@
+# camera_registry.py
+# Registry kamera dengan index sekunder (status, prioritas, area) dan hot-reload dari file
+
+import copy
+import csv
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+from spatial import SpatialGrid, camera_location
+
+try:
+    import yaml
+except ImportError:  # PyYAML opsional, hanya dibutuhkan untuk sumber .yaml/.yml
+    yaml = None
+
+SUPPORTED_EXTENSIONS = ('.json', '.yaml', '.yml', '.csv')
+
+# Kolom CSV yang punya tipe khusus; kolom lain disimpan apa adanya
+CSV_FLOAT_COLUMNS = ('lat', 'lng')
+CSV_JSON_COLUMNS = ('roi', 'lane', 'decoder_options')
+
+
+class CameraRegistry:
+    """
+    Menyimpan konfigurasi semua kamera dan index sekunder agar query
+    (aktif, prioritas, area, lokasi) tidak perlu scan linear di setiap pemanggilan
+    """
+
+    def __init__(self, source: Optional[str], defaults: Dict[str, Dict], config: Dict,
+                 logger: Optional[logging.Logger] = None):
+        self.source = source
+        self.defaults = defaults
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.cameras: Dict[str, Dict] = {}
+        self.version = 0
+        self._indexes: Dict[str, Dict[str, Set[str]]] = {'status': {}, 'priority': {}, 'area': {}}
+        self._sorted_cache: Dict[tuple, List[str]] = {}
+        self._spatial = SpatialGrid({}, config['spatial_cell_meters'])
+        self._listeners: List[Callable[[Set[str], Set[str], Set[str]], None]] = []
+        self._source_mtimes: Dict[str, float] = {}
+        self._failed_mtimes: Optional[Dict[str, float]] = None  # Versi sumber terakhir yang gagal di-parse
+        self._lock = threading.RLock()
+        self._watch_stop = threading.Event()
+        self._watch_thread = None
+
+        self.reload()
+
+    # ====== Loading ======
+
+    def _source_files(self) -> List[str]:
+        if not self.source:
+            return []
+        if os.path.isdir(self.source):
+            return sorted(
+                os.path.join(self.source, name) for name in os.listdir(self.source)
+                if name.lower().endswith(SUPPORTED_EXTENSIONS)
+            )
+        return [self.source] if os.path.exists(self.source) else []
+
+    def _load_file(self, path: str) -> Dict[str, Dict]:
+        extension = os.path.splitext(path)[1].lower()
+        with open(path, encoding='utf-8') as f:
+            if extension == '.csv':
+                return self._parse_csv(f)
+            if extension in ('.yaml', '.yml'):
+                if yaml is None:
+                    raise RuntimeError("PyYAML is required to load YAML camera registries")
+                data = yaml.safe_load(f) or {}
+            else:
+                data = json.load(f)
+
+        # Format yang diterima: {'cameras': {...}}, {id: {...}} atau [{'id': ...}, ...]
+        if isinstance(data, dict) and 'cameras' in data:
+            data = data['cameras']
+        if isinstance(data, list):
+            return {str(item['id']): {k: v for k, v in item.items() if k != 'id'} for item in data}
+        return {str(cctv_id): camera for cctv_id, camera in data.items()}
+
+    def _parse_csv(self, f) -> Dict[str, Dict]:
+        cameras = {}
+        for row in csv.DictReader(f):
+            cctv_id = row.pop('id').strip()
+            camera = {}
+            for key, value in row.items():
+                if value is None or value == '':
+                    continue
+                if key in CSV_FLOAT_COLUMNS:
+                    continue
+                if key in CSV_JSON_COLUMNS:
+                    camera[key] = json.loads(value)
+                elif key == 'url' and value.isdigit():
+                    camera[key] = int(value)  # Index webcam lokal
+                else:
+                    camera[key] = value
+            if row.get('lat') and row.get('lng'):
+                camera['location'] = {'lat': float(row['lat']), 'lng': float(row['lng'])}
+            cameras[cctv_id] = camera
+        return cameras
+
+    def _read_source(self) -> Dict[str, Dict]:
+        files = self._source_files()
+        if not files:
+            if self.source:
+                self.logger.warning(f"⚠️ Camera registry source not found: {self.source}, using defaults")
+            return copy.deepcopy(self.defaults)
+
+        cameras = {}
+        for path in files:
+            cameras.update(self._load_file(path))
+        return cameras
+
+    def reload(self) -> bool:
+        """
+        Muat ulang registry dari sumber. Registry sendiri tidak me-restart stream;
+        listener diberi tahu kamera yang ditambah, dihapus, dan berubah.
+        """
+        mtimes = self._current_mtimes()
+        try:
+            new_cameras = self._read_source()
+        except Exception as e:
+            # Error yang sama cukup dicatat sekali per versi file sumber
+            if mtimes != self._failed_mtimes:
+                self._failed_mtimes = mtimes
+                self.logger.error(f"❌ Failed to load camera registry: {e}")
+            return False
+        self._failed_mtimes = None
+
+        with self._lock:
+            old_cameras = self.cameras
+            added = set(new_cameras) - set(old_cameras)
+            removed = set(old_cameras) - set(new_cameras)
+            changed = {cid for cid in set(new_cameras) & set(old_cameras) if new_cameras[cid] != old_cameras[cid]}
+
+            self.cameras = new_cameras
+            self._rebuild_indexes()
+            self._source_mtimes = mtimes
+            self.version += 1
+
+        if self.version > 1 and (added or removed or changed):
+            self.logger.info(
+                f"🔁 Camera registry reloaded (v{self.version}): "
+                f"+{len(added)} -{len(removed)} ~{len(changed)}, total {len(new_cameras)}"
+            )
+            for listener in list(self._listeners):
+                try:
+                    listener(added, removed, changed)
+                except Exception as e:
+                    self.logger.error(f"Error in camera registry listener: {e}")
+        return True
+
+    # ====== Indexes ======
+
+    def _rebuild_indexes(self):
+        indexes = {'status': {}, 'priority': {}, 'area': {}}
+        for cctv_id, camera in self.cameras.items():
+            for field in indexes:
+                indexes[field].setdefault(camera.get(field), set()).add(cctv_id)
+        self._indexes = indexes
+        self._sorted_cache = {}
+        self._rebuild_spatial()
+
+    def _rebuild_spatial(self):
+        points = {cctv_id: camera_location(camera) for cctv_id, camera in self.cameras.items()}
+        self._spatial = SpatialGrid(
+            {cctv_id: point for cctv_id, point in points.items() if point}, self.config['spatial_cell_meters']
+        )
+
+    def _lookup(self, **filters) -> List[str]:
+        """Irisan index untuk kombinasi filter; hasil terurut di-cache hingga registry berubah"""
+        key = tuple(sorted(filters.items()))
+        with self._lock:
+            cached = self._sorted_cache.get(key)
+            if cached is not None:
+                return list(cached)
+
+            result: Optional[Set[str]] = None
+            for field, value in filters.items():
+                ids = self._indexes[field].get(value, set())
+                result = set(ids) if result is None else result & ids
+            ordered = sorted(result if result is not None else self.cameras)
+            self._sorted_cache[key] = ordered
+            return list(ordered)
+
+    def query(self, status: Optional[str] = None, priority: Optional[str] = None,
+              area: Optional[str] = None) -> List[str]:
+        filters = {k: v for k, v in (('status', status), ('priority', priority), ('area', area)) if v is not None}
+        return self._lookup(**filters)
+
+    def nearby(self, lat: float, lng: float, radius_m: float, status: Optional[str] = None) -> List[Dict]:
+        """Kamera dalam radius (meter) dari titik, terdekat lebih dulu"""
+        spatial = self._spatial
+        results = []
+        for cctv_id, distance in spatial.nearby(lat, lng, radius_m):
+            camera = self.cameras.get(cctv_id, {})
+            if status is not None and camera.get('status') != status:
+                continue
+            results.append({'id': cctv_id, 'distance_m': round(distance, 1)})
+        return results
+
+    def neighbors(self, cctv_id: str, radius_m: float) -> Dict[str, float]:
+        """{cctv_id: jarak meter} kamera lain dalam radius dari kamera ini"""
+        spatial = self._spatial
+        point = spatial.points.get(cctv_id)
+        if point is None:
+            return {}
+        return {other: distance for other, distance in spatial.nearby(*point, radius_m) if other != cctv_id}
+
+    def get(self, cctv_id: str) -> Dict:
+        return self.cameras.get(cctv_id, {})
+
+    def get_all(self) -> Dict[str, Dict]:
+        return self.cameras
+
+    def areas(self) -> List[str]:
+        return sorted(a for a in self._indexes['area'] if a is not None)
+
+    def update_field(self, cctv_id: str, field: str, value) -> bool:
+        """Ubah satu field kamera (runtime) dan perbarui index terkait"""
+        with self._lock:
+            camera = self.cameras.get(cctv_id)
+            if camera is None:
+                return False
+            if field in self._indexes:
+                old_ids = self._indexes[field].get(camera.get(field))
+                if old_ids is not None:
+                    old_ids.discard(cctv_id)
+                self._indexes[field].setdefault(value, set()).add(cctv_id)
+                self._sorted_cache = {}
+            camera[field] = value
+            if field == 'location':
+                self._rebuild_spatial()
+            return True
+
+    def register(self, cameras: Dict[str, Dict]):
+        """Tambahkan kamera secara runtime (tidak ditulis ke sumber file)"""
+        with self._lock:
+            self.cameras = {**self.cameras, **cameras}
+            self._rebuild_indexes()
+            self.version += 1
+        for listener in list(self._listeners):
+            listener(set(cameras), set(), set())
+
+    def add_listener(self, listener: Callable[[Set[str], Set[str], Set[str]], None]):
+        self._listeners.append(listener)
+
+    # ====== Hot reload ======
+
+    def _current_mtimes(self) -> Dict[str, float]:
+        mtimes = {}
+        for path in self._source_files():
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                pass
+        return mtimes
+
+    def start_watching(self):
+        """Pantau perubahan file sumber (polling mtime) dan reload otomatis"""
+        if not self.source or self._watch_thread is not None:
+            return
+        self._watch_thread = threading.Thread(target=self._watch_loop, name='camera-registry-watch', daemon=True)
+        self._watch_thread.start()
+
+    def _watch_loop(self):
+        while not self._watch_stop.wait(self.config['reload_interval']):
+            mtimes = self._current_mtimes()
+            # File yang masih rusak (belum berubah sejak gagal di-parse) tidak dibaca ulang
+            if mtimes != self._source_mtimes and mtimes != self._failed_mtimes:
+                self.reload()
+
+    def stop_watching(self):
+        self._watch_stop.set()
+
+    def get_stats(self) -> Dict:
+        return {
+            'source': self.source or 'defaults',
+            'version': self.version,
+            'total': len(self.cameras),
+            'by_status': {str(k): len(v) for k, v in self._indexes['status'].items()},
+            'by_priority': {str(k): len(v) for k, v in self._indexes['priority'].items()},
+            'areas': len(self.areas()),
+            'located': len(self._spatial.points),
+        }
+
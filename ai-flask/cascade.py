@@ -0,0 +1,134 @@
+# cascade.py
+# Cascade dua tahap: model kecil sebagai screener, model berat hanya untuk konfirmasi kandidat
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tracker import iou_matrix
+
+# predict(model, frame, confidence_threshold) -> List[Dict] dengan key class, confidence, bbox
+PredictFn = Callable[[object, np.ndarray, float], List[Dict]]
+
+
+class ModelCascade:
+    """
+    Screener dijalankan pada setiap frame sampel; confirmer hanya pada frame/crop
+    yang ditandai sebagai kandidat insiden oleh screener
+    """
+
+    def __init__(self, screener, confirmer, config: Dict, predict: PredictFn):
+        self.screener = screener
+        self.confirmer = confirmer
+        self.config = config
+        self.predict = predict
+
+        self._lock = threading.Lock()
+        self.frames_screened = 0
+        self.frames_escalated = 0
+        self.frames_confirmed = 0
+        self.screener_time = 0.0
+        self.confirmer_time = 0.0
+
+    def run(self, frame: np.ndarray) -> List[Dict]:
+        """
+        Jalankan cascade. Deteksi screener selalu dikembalikan (dipakai tracker, riwayat
+        deteksi dan estimasi kerumunan) tetapi ditandai unconfirmed, sehingga hanya deteksi
+        confirmer yang boleh menjadi insiden (lihat incident_candidates).
+        """
+        start = time.perf_counter()
+        detections = self.predict(self.screener, frame, self.config['screener_confidence'])
+        screened_at = time.perf_counter()
+
+        region = self._escalation_region(detections, frame.shape[1], frame.shape[0])
+        confirmed = []
+        if region is not None:
+            confirmed = self._confirm(frame, region)
+        finished = time.perf_counter()
+
+        with self._lock:
+            self.frames_screened += 1
+            self.screener_time += screened_at - start
+            if region is not None:
+                self.frames_escalated += 1
+                self.confirmer_time += finished - screened_at
+                if confirmed:
+                    self.frames_confirmed += 1
+
+        for detection in detections:
+            detection['stage'] = 'screener'
+            detection['unconfirmed'] = True
+        for detection in confirmed:
+            detection['stage'] = 'confirmer'
+        return detections + confirmed
+
+    @staticmethod
+    def incident_candidates(detections: List[Dict]) -> List[Dict]:
+        """Deteksi yang boleh diklasifikasi menjadi insiden (box screener belum dikonfirmasi)"""
+        return [d for d in detections if not d.get('unconfirmed')]
+
+    def _escalation_region(self, detections: List[Dict], width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Tentukan apakah frame perlu dieskalasi dan region mana yang dikonfirmasi.
+        Kandidat: kelas di escalate_classes; jika escalate_min_iou > 0, hanya
+        pasangan kandidat yang saling bertumpukan (indikasi tabrakan).
+        """
+        candidates = [d for d in detections if d['class'] in self.config['escalate_classes']]
+        if not candidates:
+            return None
+
+        boxes = np.array([d['bbox'] for d in candidates], dtype=np.float32)
+        always = [i for i, d in enumerate(candidates) if d['class'] in self.config['escalate_always_classes']]
+        min_iou = self.config['escalate_min_iou']
+
+        if min_iou > 0:
+            ious = np.triu(iou_matrix(boxes, boxes), k=1)
+            pairs = np.nonzero(ious >= min_iou)
+            selected = sorted(set(pairs[0]) | set(pairs[1]) | set(always))
+        else:
+            selected = list(range(len(candidates)))
+
+        if not selected:
+            return None
+
+        if self.config['confirm_on'] == 'frame':
+            return 0, 0, width, height
+
+        # Crop gabungan kandidat + padding agar confirmer melihat konteks sekitar
+        x1, y1 = boxes[selected, 0].min(), boxes[selected, 1].min()
+        x2, y2 = boxes[selected, 2].max(), boxes[selected, 3].max()
+        pad_x = (x2 - x1) * self.config['crop_padding']
+        pad_y = (y2 - y1) * self.config['crop_padding']
+        return (
+            max(int(x1 - pad_x), 0),
+            max(int(y1 - pad_y), 0),
+            min(int(x2 + pad_x), width),
+            min(int(y2 + pad_y), height),
+        )
+
+    def _confirm(self, frame: np.ndarray, region: Tuple[int, int, int, int]) -> List[Dict]:
+        x1, y1, x2, y2 = region
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return []
+
+        confirmed = self.predict(self.confirmer, frame[y1:y2, x1:x2], self.config['confirmer_confidence'])
+        for detection in confirmed:
+            bx1, by1, bx2, by2 = detection['bbox']
+            detection['bbox'] = [bx1 + x1, by1 + y1, bx2 + x1, by2 + y1]
+        return confirmed
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            screened = self.frames_screened
+            escalated = self.frames_escalated
+            return {
+                'frames_screened': screened,
+                'frames_escalated': escalated,
+                'frames_confirmed': self.frames_confirmed,
+                'escalation_rate': round(escalated / screened, 4) if screened else 0.0,
+                'confirmation_rate': round(self.frames_confirmed / escalated, 4) if escalated else 0.0,
+                'avg_screener_ms': round(self.screener_time / screened * 1000, 2) if screened else 0.0,
+                'avg_confirmer_ms': round(self.confirmer_time / escalated * 1000, 2) if escalated else 0.0,
+            }
@@ -0,0 +1,190 @@
+# clip_buffer.py
+# Ring buffer frame pra-insiden per kamera (JPEG terkompresi) dan ekspor klip di background
+
+import heapq
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FrameRingBuffer:
+    """
+    Menyimpan N detik terakhir frame satu kamera sebagai JPEG, dibatasi anggaran byte
+    """
+
+    def __init__(self, max_seconds: float, max_bytes: int):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.frames = deque()  # (timestamp, jpeg_bytes)
+        self.total_bytes = 0
+        self.last_push = 0.0
+        self.lock = threading.Lock()
+
+    def push(self, timestamp: float, jpeg_bytes: bytes):
+        with self.lock:
+            self.frames.append((timestamp, jpeg_bytes))
+            self.total_bytes += len(jpeg_bytes)
+            self.last_push = timestamp
+
+            # Buang frame lama berdasarkan umur lalu berdasarkan anggaran memori
+            while self.frames and (timestamp - self.frames[0][0] > self.max_seconds
+                                   or self.total_bytes > self.max_bytes):
+                _, old = self.frames.popleft()
+                self.total_bytes -= len(old)
+
+    def window(self, start: float, end: float) -> List[Tuple[float, bytes]]:
+        with self.lock:
+            return [(ts, data) for ts, data in self.frames if start <= ts <= end]
+
+
+class ClipBufferManager:
+    """
+    Ring buffer per kamera + worker yang merakit klip pra/pasca insiden
+    """
+
+    def __init__(self, clip_path: str, config: Dict, logger: Optional[logging.Logger] = None):
+        self.clip_path = clip_path
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+        self.buffers: Dict[str, FrameRingBuffer] = {}
+        self.clips_exported = 0
+        self.clips_failed = 0
+
+        self._lock = threading.Lock()
+        self._jobs = []  # heap (due_time, seq, job)
+        self._seq = 0
+        self._pending_cameras: Dict[str, int] = {}
+        self._discarded = set()
+        self._wakeup = threading.Condition(self._lock)
+        self._running = True
+
+        os.makedirs(clip_path, exist_ok=True)
+        self._worker = threading.Thread(target=self._export_loop, name='clip-exporter', daemon=True)
+        self._worker.start()
+
+    def push(self, cctv_id: str, frame: np.ndarray, timestamp: float):
+        """
+        Tambahkan frame ke buffer kamera (di-sample sesuai buffer_fps dan di-downscale)
+        """
+        buffer = self.buffers.get(cctv_id)
+        if buffer is None:
+            with self._lock:
+                self._discarded.discard(cctv_id)
+                buffer = self.buffers.setdefault(cctv_id, FrameRingBuffer(
+                    self.config['buffer_seconds'], self.config['max_bytes_per_camera']
+                ))
+
+        if timestamp - buffer.last_push < 1.0 / self.config['buffer_fps']:
+            return
+
+        height, width = frame.shape[:2]
+        max_width = self.config['max_width']
+        if width > max_width:
+            frame = cv2.resize(frame, (max_width, int(height * max_width / width)), interpolation=cv2.INTER_AREA)
+
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.config['jpeg_quality']])
+        if ok:
+            buffer.push(timestamp, encoded.tobytes())
+
+    def request_clip(self, cctv_id: str, event_time: Optional[float] = None) -> Optional[str]:
+        """
+        Jadwalkan ekspor klip di sekitar event_time. Path klip dikembalikan langsung
+        agar bisa dilampirkan ke insiden; file selesai ditulis setelah post_seconds.
+        """
+        if cctv_id not in self.buffers:
+            return None
+
+        event_time = event_time or time.time()
+        filename = f"{cctv_id}_{int(event_time * 1000)}_{uuid.uuid4().hex[:8]}.mp4"
+        due = event_time + self.config['post_seconds']
+        with self._lock:
+            self._seq += 1
+            heapq.heappush(self._jobs, (due, self._seq, (cctv_id, event_time, filename)))
+            self._pending_cameras[cctv_id] = self._pending_cameras.get(cctv_id, 0) + 1
+            self._wakeup.notify()
+        return filename
+
+    def discard(self, cctv_id: str):
+        """Lepas buffer kamera yang berhenti (ditunda jika masih ada klip yang menunggu)"""
+        with self._lock:
+            if self._pending_cameras.get(cctv_id):
+                self._discarded.add(cctv_id)
+            else:
+                self.buffers.pop(cctv_id, None)
+
+    def _export_loop(self):
+        while True:
+            with self._lock:
+                while self._running and (not self._jobs or self._jobs[0][0] > time.time()):
+                    timeout = self._jobs[0][0] - time.time() if self._jobs else None
+                    self._wakeup.wait(timeout)
+                if not self._running:
+                    return
+                _, _, job = heapq.heappop(self._jobs)
+
+            cctv_id, event_time, filename = job
+            try:
+                self._export(cctv_id, event_time, filename)
+            except Exception as e:
+                self.clips_failed += 1
+                self.logger.error(f"Error exporting clip {filename}: {e}")
+            finally:
+                with self._lock:
+                    self._pending_cameras[cctv_id] -= 1
+                    if not self._pending_cameras[cctv_id]:
+                        del self._pending_cameras[cctv_id]
+                        if cctv_id in self._discarded:
+                            self._discarded.discard(cctv_id)
+                            self.buffers.pop(cctv_id, None)
+
+    def _export(self, cctv_id: str, event_time: float, filename: str):
+        buffer = self.buffers.get(cctv_id)
+        frames = buffer.window(event_time - self.config['pre_seconds'],
+                               event_time + self.config['post_seconds']) if buffer else []
+        if not frames:
+            self.clips_failed += 1
+            self.logger.warning(f"⚠️ No buffered frames for clip {filename}")
+            return
+
+        first = cv2.imdecode(np.frombuffer(frames[0][1], dtype=np.uint8), cv2.IMREAD_COLOR)
+        height, width = first.shape[:2]
+        path = os.path.join(self.clip_path, filename)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), self.config['buffer_fps'], (width, height))
+        try:
+            for _, data in frames:
+                image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if image.shape[:2] != (height, width):
+                    image = cv2.resize(image, (width, height))
+                writer.write(image)
+        finally:
+            writer.release()
+
+        self.clips_exported += 1
+        self.logger.info(f"🎬 Clip exported: {filename} ({len(frames)} frames)")
+
+    def get_stats(self) -> Dict:
+        buffers = dict(self.buffers)
+        per_camera = {cctv_id: buffer.total_bytes for cctv_id, buffer in buffers.items()}
+        return {
+            'memory_bytes': sum(per_camera.values()),
+            'memory_budget_bytes': self.config['max_bytes_per_camera'] * len(buffers),
+            'max_bytes_per_camera': self.config['max_bytes_per_camera'],
+            'per_camera_bytes': per_camera,
+            'buffered_frames': {cctv_id: len(buffer.frames) for cctv_id, buffer in buffers.items()},
+            'pending_clips': len(self._jobs),
+            'clips_exported': self.clips_exported,
+            'clips_failed': self.clips_failed,
+        }
+
+    def close(self):
+        with self._lock:
+            self._running = False
+            self._wakeup.notify()
+        self._worker.join(timeout=5)
@@ -0,0 +1,166 @@
+# concurrency.py
+# Penyesuaian otomatis jumlah kamera yang dimonitor bersamaan berdasarkan headroom terukur:
+# latensi inferensi, utilisasi CPU proses, dan lag antrean frame
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+SCALE_UP = 'scale_up'
+SCALE_DOWN = 'scale_down'
+HOLD = 'hold'
+
+
+class CpuSampler:
+    """Utilisasi CPU proses (0-1 dari seluruh core) antar dua pemanggilan sample()"""
+
+    def __init__(self):
+        self.cores = os.cpu_count() or 1
+        self._last_cpu = time.process_time()
+        self._last_wall = time.monotonic()
+
+    def sample(self) -> float:
+        cpu, wall = time.process_time(), time.monotonic()
+        elapsed = wall - self._last_wall
+        utilisation = (cpu - self._last_cpu) / (elapsed * self.cores) if elapsed > 0 else 0.0
+        self._last_cpu, self._last_wall = cpu, wall
+        return min(max(utilisation, 0.0), 1.0)
+
+
+class ConcurrencyTuner:
+    """
+    Thread periodik yang menaikkan atau menurunkan target jumlah kamera aktif agar p95
+    latensi inferensi tetap di bawah latency_slo_ms:
+    - turun (multiplikatif, decrease_factor) jika SLO latensi / lag antrean terlampaui
+      atau CPU di atas cpu_high
+    - naik satu kamera jika p95 di bawah scale_up_headroom × SLO dan CPU di bawah cpu_low
+    - selain itu tahan; target selalu di antara min_cameras dan max_cameras
+
+    on_change(old, new) dipanggil setiap kali target berubah. extra_lag() opsional
+    mengembalikan lag lain dalam ms (mis. lag event loop) yang ikut dibandingkan dengan SLO lag.
+    """
+
+    def __init__(self, config: Dict, on_change: Callable[[int, int], None],
+                 extra_lag: Optional[Callable[[], float]] = None, logger: Optional[logging.Logger] = None):
+        self.config = config
+        self.on_change = on_change
+        self.extra_lag = extra_lag
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.target = min(max(config['initial_cameras'], config['min_cameras']), config['max_cameras'])
+        self._latency = deque(maxlen=config['window_size'])    # detik per inferensi
+        self._queue_lag = deque(maxlen=config['window_size'])  # detik dari capture hingga infer
+        self._cpu = CpuSampler()
+        self.decisions = deque(maxlen=config['decision_history'])
+        self.last_signals: Dict = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ====== Sampel ======
+
+    def observe_latency(self, seconds: float):
+        self._latency.append(seconds)
+
+    def observe_queue_lag(self, seconds: float):
+        self._queue_lag.append(seconds)
+
+    # ====== Loop ======
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._tune_loop, name='concurrency-tuner', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _tune_loop(self):
+        while not self._stop.wait(self.config['adjust_interval']):
+            try:
+                self.evaluate()
+            except Exception as e:
+                self.logger.error(f"Error in concurrency tuner: {e}")
+
+    def _signals(self) -> Dict:
+        latency = np.array(self._latency, dtype=np.float64)
+        queue_lag = np.array(self._queue_lag, dtype=np.float64)
+        # Sampel dibuang setiap evaluasi agar keputusan berikutnya hanya melihat target yang baru
+        self._latency.clear()
+        self._queue_lag.clear()
+        lag_ms = float(np.percentile(queue_lag, 95) * 1000) if len(queue_lag) else 0.0
+        if self.extra_lag:
+            lag_ms = max(lag_ms, self.extra_lag())
+        return {
+            'samples': len(latency),
+            'latency_p50_ms': round(float(np.percentile(latency, 50) * 1000), 2) if len(latency) else None,
+            'latency_p95_ms': round(float(np.percentile(latency, 95) * 1000), 2) if len(latency) else None,
+            'queue_lag_p95_ms': round(lag_ms, 2),
+            'cpu': round(self._cpu.sample(), 3),
+        }
+
+    def evaluate(self) -> Dict:
+        """Satu keputusan dari sampel sejak evaluasi terakhir"""
+        config = self.config
+        signals = self._signals()
+        p95 = signals['latency_p95_ms']
+
+        with self._lock:
+            old = self.target
+            if p95 is not None and p95 > config['latency_slo_ms']:
+                action, reason = SCALE_DOWN, f"p95 latency {p95:.0f} ms > SLO {config['latency_slo_ms']} ms"
+            elif signals['queue_lag_p95_ms'] > config['queue_lag_slo_ms']:
+                action, reason = SCALE_DOWN, (f"queue lag {signals['queue_lag_p95_ms']:.0f} ms "
+                                              f"> {config['queue_lag_slo_ms']} ms")
+            elif signals['cpu'] > config['cpu_high']:
+                action, reason = SCALE_DOWN, f"CPU {signals['cpu']:.0%} > {config['cpu_high']:.0%}"
+            elif signals['samples'] < config['min_samples']:
+                action, reason = HOLD, f"only {signals['samples']} latency samples"
+            elif p95 < config['latency_slo_ms'] * config['scale_up_headroom'] and signals['cpu'] < config['cpu_low']:
+                action, reason = SCALE_UP, f"p95 latency {p95:.0f} ms and CPU {signals['cpu']:.0%} leave headroom"
+            else:
+                action, reason = HOLD, 'within SLO'
+
+            if action == SCALE_DOWN:
+                new = max(config['min_cameras'], min(int(old * config['decrease_factor']), old - 1))
+            elif action == SCALE_UP:
+                new = min(config['max_cameras'], old + 1)
+            else:
+                new = old
+            if new == old and action != HOLD:
+                reason += f" (already at {'min' if action == SCALE_DOWN else 'max'} {old})"
+                action = HOLD
+            self.target = new
+
+            decision = {'at': time.time(), 'action': action, 'from': old, 'to': new, 'reason': reason, **signals}
+            self.decisions.append(decision)
+            self.last_signals = signals
+
+        if new != old:
+            self.logger.info(f"🎛️ Concurrency {old} → {new} cameras: {reason}", extra={'concurrency_target': new})
+            self.on_change(old, new)
+        else:
+            self.logger.debug(f"🎛️ Concurrency holds at {old} cameras: {reason}")
+        return decision
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            decisions = list(self.decisions)
+            signals = dict(self.last_signals)
+        return {
+            'target': self.target,
+            'min_cameras': self.config['min_cameras'],
+            'max_cameras': self.config['max_cameras'],
+            'latency_slo_ms': self.config['latency_slo_ms'],
+            'queue_lag_slo_ms': self.config['queue_lag_slo_ms'],
+            'cpu_cores': self._cpu.cores,
+            'last_signals': signals,
+            'recent_decisions': decisions[-10:],
+            'changes': [d for d in decisions if d['action'] != HOLD][-10:],
+        }
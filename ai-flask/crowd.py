@@ -0,0 +1,138 @@
+# crowd.py
+# Estimasi kepadatan kerumunan per frame: jumlah orang dan grid kepadatan kasar dihitung
+# vektorial dari semua box 'person', satu insiden 'crowd' hanya jika padat secara berkelanjutan
+
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+PERSON_CLASS = 'person'
+
+
+class CrowdEstimator:
+    """
+    Titik kaki (tengah bawah bbox) setiap orang dipetakan ke grid grid_rows × grid_cols.
+    Frame dianggap padat jika di dalam area yang dipantau (default seluruh frame) ada
+    minimal min_people orang DAN sel terpadat berisi minimal cell_density_threshold orang.
+    Insiden dinaikkan sekali setelah padat selama sustain_seconds, lalu tidak lagi sampai
+    kepadatan turun dan cooldown_seconds berlalu.
+    """
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self._state: Dict[str, Dict] = {}  # cctv_id -> {'above_since', 'raised_at', 'last'}
+        self._lock = threading.Lock()
+        self.incidents_raised = 0
+
+    def area_mask(self, area: Optional[Sequence[float]]) -> np.ndarray:
+        """Mask sel grid yang pusatnya berada di area [x1, y1, x2, y2] (koordinat ternormalisasi 0-1)"""
+        rows, cols = self.config['grid_rows'], self.config['grid_cols']
+        if not area:
+            return np.ones((rows, cols), dtype=bool)
+        x1, y1, x2, y2 = area
+        centers_y = (np.arange(rows) + 0.5) / rows
+        centers_x = (np.arange(cols) + 0.5) / cols
+        return ((centers_y >= y1) & (centers_y <= y2))[:, np.newaxis] & ((centers_x >= x1) & (centers_x <= x2))
+
+    def estimate(self, detections: List[Dict], frame_shape: Tuple[int, ...],
+                 area: Optional[Sequence[float]] = None) -> Dict:
+        """Jumlah orang, grid kepadatan, dan box gabungan orang di dalam area (satu pass NumPy)"""
+        rows, cols = self.config['grid_rows'], self.config['grid_cols']
+        min_confidence = self.config['min_confidence']
+        people = [d for d in detections if d['class'] == PERSON_CLASS and d['confidence'] >= min_confidence]
+        if not people:
+            return {'count': 0, 'peak_cell': 0, 'grid': np.zeros((rows, cols), dtype=np.int32), 'bbox': None,
+                    'confidence': 0.0}
+
+        height, width = frame_shape[:2]
+        boxes = np.array([d['bbox'] for d in people], dtype=np.float32)
+        confidences = np.array([d['confidence'] for d in people], dtype=np.float32)
+
+        foot_x = (boxes[:, 0] + boxes[:, 2]) / 2
+        foot_y = boxes[:, 3]
+        cell_cols = np.clip((foot_x / width * cols).astype(np.int32), 0, cols - 1)
+        cell_rows = np.clip((foot_y / height * rows).astype(np.int32), 0, rows - 1)
+
+        inside = self.area_mask(area)[cell_rows, cell_cols]
+        grid = np.bincount(
+            cell_rows[inside] * cols + cell_cols[inside], minlength=rows * cols
+        ).reshape(rows, cols).astype(np.int32)
+
+        count = int(inside.sum())
+        bbox = None
+        if count:
+            selected = boxes[inside]
+            bbox = [int(selected[:, 0].min()), int(selected[:, 1].min()),
+                    int(selected[:, 2].max()), int(selected[:, 3].max())]
+        return {
+            'count': count,
+            'peak_cell': int(grid.max()),
+            'grid': grid,
+            'bbox': bbox,
+            'confidence': float(confidences[inside].mean()) if count else 0.0,
+        }
+
+    def update(self, cctv_id: str, detections: List[Dict], frame_shape: Tuple[int, ...], now: float,
+               area: Optional[Sequence[float]] = None) -> Optional[Dict]:
+        """
+        Perbarui state kamera dengan deteksi satu frame. Mengembalikan detection 'crowd'
+        (format sama dengan deteksi model) jika insiden harus dinaikkan.
+        """
+        estimate = self.estimate(detections, frame_shape, area)
+        dense = (estimate['count'] >= self.config['min_people']
+                 and estimate['peak_cell'] >= self.config['cell_density_threshold'])
+
+        with self._lock:
+            state = self._state.setdefault(cctv_id, {'above_since': None, 'raised_at': None, 'last': None})
+            state['last'] = {'count': estimate['count'], 'peak_cell': estimate['peak_cell'], 'dense': dense, 'at': now}
+
+            if not dense:
+                state['above_since'] = None
+                return None
+            if state['above_since'] is None:
+                state['above_since'] = now
+
+            sustained = now - state['above_since'] >= self.config['sustain_seconds']
+            raised_at = state['raised_at']
+            # Satu insiden per episode kepadatan; episode baru perlu cooldown dari insiden sebelumnya
+            in_episode = raised_at is not None and raised_at >= state['above_since']
+            cooling = raised_at is not None and now - raised_at < self.config['cooldown_seconds']
+            if not sustained or in_episode or cooling:
+                return None
+
+            state['raised_at'] = now
+            self.incidents_raised += 1
+
+        return {
+            'class': 'crowd',
+            'incident_type': 'crowd',
+            'confidence': estimate['confidence'],
+            'bbox': estimate['bbox'],
+            'people_count': estimate['count'],
+            'peak_cell_count': estimate['peak_cell'],
+            'density_grid': estimate['grid'].tolist(),
+        }
+
+    def discard(self, cctv_id: str):
+        with self._lock:
+            self._state.pop(cctv_id, None)
+
+    def prune(self, active: set) -> int:
+        with self._lock:
+            stale = [cctv_id for cctv_id in self._state if cctv_id not in active]
+            for cctv_id in stale:
+                del self._state[cctv_id]
+        return len(stale)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            cameras = {cctv_id: dict(state['last'] or {}, above_since=state['above_since'])
+                       for cctv_id, state in self._state.items()}
+        return {
+            'min_people': self.config['min_people'],
+            'cell_density_threshold': self.config['cell_density_threshold'],
+            'sustain_seconds': self.config['sustain_seconds'],
+            'incidents_raised': self.incidents_raised,
+            'cameras': cameras,
+        }
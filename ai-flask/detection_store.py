@@ -0,0 +1,303 @@
+# detection_store.py
+# Penyimpanan time-series deteksi di memori: ring buffer NumPy structured array per kamera
+# dengan anggaran memori tetap, plus rollup per menit dan per jam yang dihitung saat insert
+
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# 30 byte per deteksi (packed): timestamp, id kelas, confidence, bbox x1,y1,x2,y2
+DETECTION_DTYPE = np.dtype([
+    ('ts', 'f8'),
+    ('class_id', 'u2'),
+    ('confidence', 'f4'),
+    ('bbox', 'i4', (4,)),
+])
+
+RESOLUTIONS = {'minute': 60, 'hour': 3600}
+OTHER_CLASS = '_other'  # Kelas di luar max_classes digabung ke sini
+
+
+class Rollup:
+    """
+    Jumlah deteksi dan total confidence per kelas per bucket waktu, disimpan di ring
+    berukuran tetap (bucket lama ditimpa saat slot dipakai ulang)
+    """
+
+    def __init__(self, bucket_seconds: int, slots: int, max_classes: int):
+        self.bucket_seconds = bucket_seconds
+        self.keys = np.full(slots, -1, dtype=np.int64)  # Nomor bucket (ts // bucket_seconds) per slot
+        self.counts = np.zeros((slots, max_classes), dtype=np.uint32)
+        self.confidence = np.zeros((slots, max_classes), dtype=np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.counts.nbytes + self.confidence.nbytes
+
+    def add(self, ts: float, class_ids: np.ndarray, confidences: np.ndarray):
+        key = int(ts // self.bucket_seconds)
+        slot = key % len(self.keys)
+        if self.keys[slot] != key:
+            if self.keys[slot] > key:
+                return  # Data terlambat untuk bucket yang sudah ditimpa
+            self.keys[slot] = key
+            self.counts[slot] = 0
+            self.confidence[slot] = 0
+        np.add.at(self.counts[slot], class_ids, 1)
+        np.add.at(self.confidence[slot], class_ids, confidences)
+
+    def select(self, start_key: int, end_key: int):
+        mask = (self.keys >= start_key) & (self.keys <= end_key)
+        return self.keys[mask], self.counts[mask], self.confidence[mask]
+
+
+class CameraSeries:
+    """
+    Ring buffer deteksi satu kamera + rollup menit/jam
+    """
+
+    def __init__(self, capacity: int, config: Dict):
+        self.records = np.zeros(capacity, dtype=DETECTION_DTYPE)
+        self.head = 0
+        self.size = 0
+        self.total = 0
+        self.last_write = 0.0
+        self.rollups = {
+            'minute': Rollup(RESOLUTIONS['minute'], config['minute_slots'], config['max_classes']),
+            'hour': Rollup(RESOLUTIONS['hour'], config['hour_slots'], config['max_classes']),
+        }
+        self.lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self.records.nbytes + sum(rollup.nbytes for rollup in self.rollups.values())
+
+    def append(self, ts: float, class_ids: np.ndarray, confidences: np.ndarray, bboxes: np.ndarray):
+        capacity = len(self.records)
+        count = len(class_ids)
+        with self.lock:
+            index = (self.head + np.arange(count)) % capacity
+            self.records['ts'][index] = ts
+            self.records['class_id'][index] = class_ids
+            self.records['confidence'][index] = confidences
+            self.records['bbox'][index] = bboxes
+            self.head = (self.head + count) % capacity
+            self.size = min(self.size + count, capacity)
+            self.total += count
+            self.last_write = ts
+            for rollup in self.rollups.values():
+                rollup.add(ts, class_ids, confidences)
+
+    def select(self, start: Optional[float], end: Optional[float], class_ids: Optional[np.ndarray],
+               min_confidence: Optional[float]) -> np.ndarray:
+        with self.lock:
+            records = self.records[:self.size]
+            mask = np.ones(len(records), dtype=bool)
+            if start is not None:
+                mask &= records['ts'] >= start
+            if end is not None:
+                mask &= records['ts'] <= end
+            if class_ids is not None:
+                mask &= np.isin(records['class_id'], class_ids)
+            if min_confidence is not None:
+                mask &= records['confidence'] >= min_confidence
+            return records[mask]  # Boolean indexing sudah menghasilkan salinan
+
+
+class DetectionStore:
+    """
+    Menyimpan setiap deteksi model per kamera untuk query "apa yang dilihat kamera X
+    dalam satu jam terakhir" tanpa lewat Laravel. Memori total dibatasi
+    memory_budget_bytes: kapasitas ring per kamera dihitung dari anggaran dan max_cameras,
+    dan kamera yang paling lama tidak menulis di-evict jika jumlah kamera melebihi batas.
+    """
+
+    def __init__(self, config: Dict, logger: Optional[logging.Logger] = None):
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+
+        rollup_bytes = CameraSeries(1, config).nbytes
+        per_camera = config['memory_budget_bytes'] // config['max_cameras']
+        self.capacity = (per_camera - rollup_bytes) // DETECTION_DTYPE.itemsize
+        if self.capacity <= 0:
+            raise ValueError(
+                f"Detection store budget too small: {per_camera} bytes per camera, rollups need {rollup_bytes}"
+            )
+
+        self._series: Dict[str, CameraSeries] = {}
+        self._class_ids: Dict[str, int] = {}
+        self._class_names: List[str] = []
+        self._lock = threading.Lock()
+        self.evicted_cameras = 0
+
+    # ====== Kelas ======
+
+    def _class_id(self, name: str) -> int:
+        class_id = self._class_ids.get(name)
+        if class_id is not None:
+            return class_id
+        with self._lock:
+            if name not in self._class_ids:
+                if len(self._class_names) < self.config['max_classes'] - 1:
+                    self._class_ids[name] = len(self._class_names)
+                    self._class_names.append(name)
+                else:
+                    if OTHER_CLASS not in self._class_ids:
+                        self._class_ids[OTHER_CLASS] = len(self._class_names)
+                        self._class_names.append(OTHER_CLASS)
+                    return self._class_ids[OTHER_CLASS]
+            return self._class_ids[name]
+
+    def _lookup_classes(self, classes: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        if not classes:
+            return None
+        return np.array([self._class_ids[name] for name in classes if name in self._class_ids], dtype=np.uint16)
+
+    # ====== Tulis ======
+
+    def _get_series(self, cctv_id: str) -> CameraSeries:
+        series = self._series.get(cctv_id)
+        if series is not None:
+            return series
+        with self._lock:
+            if cctv_id not in self._series:
+                if len(self._series) >= self.config['max_cameras']:
+                    oldest = min(self._series, key=lambda key: self._series[key].last_write)
+                    del self._series[oldest]
+                    self.evicted_cameras += 1
+                    self.logger.info(f"🗃️ Detection store full, evicted history of {oldest}")
+                self._series[cctv_id] = CameraSeries(self.capacity, self.config)
+            return self._series[cctv_id]
+
+    def record(self, cctv_id: str, detections: List[Dict], ts: Optional[float] = None):
+        """Simpan semua deteksi satu frame (dipanggil per keyframe inferensi)"""
+        if not detections:
+            return
+        self._get_series(cctv_id).append(
+            time.time() if ts is None else ts,
+            np.array([self._class_id(d['class']) for d in detections], dtype=np.uint16),
+            np.array([d['confidence'] for d in detections], dtype=np.float32),
+            np.array([d['bbox'] for d in detections], dtype=np.int32).reshape(-1, 4),
+        )
+
+    # ====== Query ======
+
+    def query(self, cctv_id: Optional[str] = None, classes: Optional[List[str]] = None,
+              start: Optional[float] = None, end: Optional[float] = None,
+              min_confidence: Optional[float] = None, limit: int = 1000) -> Dict:
+        """Deteksi mentah terbaru lebih dulu, difilter kamera, kelas, rentang waktu dan confidence"""
+        class_ids = self._lookup_classes(classes)
+        if class_ids is not None and not len(class_ids):
+            return {'total': 0, 'detections': []}
+
+        cameras = [cctv_id] if cctv_id else list(self._series)
+        selected = []
+        for camera in cameras:
+            series = self._series.get(camera)
+            if series is None:
+                continue
+            records = series.select(start, end, class_ids, min_confidence)
+            if len(records):
+                selected.append((camera, records))
+
+        total = sum(len(records) for _, records in selected)
+        if not total:
+            return {'total': 0, 'detections': []}
+
+        records = np.concatenate([records for _, records in selected])
+        owners = np.concatenate([np.full(len(records), i, dtype=np.int32) for i, (_, records) in enumerate(selected)])
+        # argsort parsial: hanya `limit` deteksi terbaru yang perlu diurutkan
+        if total > limit:
+            newest = np.argpartition(-records['ts'], limit - 1)[:limit]
+        else:
+            newest = np.arange(total)
+        newest = newest[np.argsort(-records['ts'][newest], kind='stable')]
+
+        names = self._class_names
+        return {
+            'total': total,
+            'detections': [
+                {
+                    'cctv_id': selected[owners[i]][0],
+                    'timestamp': float(records['ts'][i]),
+                    'class': names[records['class_id'][i]],
+                    'confidence': round(float(records['confidence'][i]), 4),
+                    'bbox': records['bbox'][i].tolist(),
+                }
+                for i in newest
+            ],
+        }
+
+    def rollup(self, cctv_id: Optional[str] = None, resolution: str = 'minute',
+               classes: Optional[List[str]] = None, start: Optional[float] = None,
+               end: Optional[float] = None) -> List[Dict]:
+        """Jumlah deteksi dan rata-rata confidence per kelas per bucket (gabungan kamera jika cctv_id kosong)"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}', expected one of {sorted(RESOLUTIONS)}")
+        bucket_seconds = RESOLUTIONS[resolution]
+        start_key = int(start // bucket_seconds) if start is not None else 0
+        end_key = int(end // bucket_seconds) if end is not None else np.iinfo(np.int64).max
+
+        keys, counts, confidence = [], [], []
+        for camera in ([cctv_id] if cctv_id else list(self._series)):
+            series = self._series.get(camera)
+            if series is None:
+                continue
+            with series.lock:
+                k, c, s = series.rollups[resolution].select(start_key, end_key)
+            keys.append(k)
+            counts.append(c)
+            confidence.append(s)
+        if not keys or not sum(len(k) for k in keys):
+            return []
+
+        # Gabungkan bucket yang sama dari beberapa kamera: urutkan lalu reduceat per kunci
+        all_keys = np.concatenate(keys)
+        order = np.argsort(all_keys, kind='stable')
+        sorted_keys = all_keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        total_counts = np.add.reduceat(np.concatenate(counts).astype(np.uint64)[order], starts, axis=0)
+        total_confidence = np.add.reduceat(np.concatenate(confidence).astype(np.float64)[order], starts, axis=0)
+
+        class_ids = self._lookup_classes(classes)
+        columns = class_ids if class_ids is not None else np.arange(len(self._class_names))
+        total_counts = total_counts[:, columns]
+        total_confidence = total_confidence[:, columns]
+        names = [self._class_names[c] for c in columns]
+
+        buckets = []
+        for row in np.flatnonzero(total_counts.sum(axis=1)):
+            present = np.flatnonzero(total_counts[row])
+            counts_row = total_counts[row, present].tolist()
+            confidence_row = total_confidence[row, present].tolist()
+            buckets.append({
+                'start': int(sorted_keys[starts[row]]) * bucket_seconds,
+                'total': sum(counts_row),
+                'counts': {names[c]: n for c, n in zip(present, counts_row)},
+                'avg_confidence': {
+                    names[c]: round(conf / n, 4) for c, n, conf in zip(present, counts_row, confidence_row)
+                },
+            })
+        return buckets
+
+    # ====== Status ======
+
+    def bytes_by_camera(self) -> Dict[str, int]:
+        return {cctv_id: series.nbytes for cctv_id, series in list(self._series.items())}
+
+    def get_stats(self) -> Dict:
+        series = list(self._series.items())
+        return {
+            'cameras': len(series),
+            'max_cameras': self.config['max_cameras'],
+            'capacity_per_camera': self.capacity,
+            'records': sum(s.size for _, s in series),
+            'records_total': sum(s.total for _, s in series),
+            'memory_bytes': sum(s.nbytes for _, s in series),
+            'memory_budget_bytes': self.config['memory_budget_bytes'],
+            'classes': len(self._class_names),
+            'evicted_cameras': self.evicted_cameras,
+        }
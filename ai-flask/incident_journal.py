@@ -0,0 +1,362 @@
+# incident_journal.py
+# Jurnal insiden lokal di SQLite (WAL): setiap insiden dicatat beserta metadata deteksi dan
+# path screenshot, status sinkronisasi ke Laravel dilacak, dan insiden yang gagal dikirim di-replay
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+# Status sinkronisasi ke Laravel
+SYNC_PENDING = 'pending'      # Belum ada hasil pengiriman
+SYNC_SYNCED = 'synced'
+SYNC_FAILED = 'failed'        # Gagal, akan di-replay
+SYNC_ABANDONED = 'abandoned'  # Melewati max_replay_attempts (misal screenshot sudah dihapus)
+SYNC_STATES = (SYNC_PENDING, SYNC_SYNCED, SYNC_FAILED, SYNC_ABANDONED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    id TEXT PRIMARY KEY,
+    cctv_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    confidence REAL,
+    detected_at REAL NOT NULL,
+    screenshot TEXT,
+    clip_path TEXT,
+    metadata TEXT,
+    sync_state TEXT NOT NULL DEFAULT 'pending',
+    sync_attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    synced_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_incidents_camera_time ON incidents (cctv_id, detected_at);
+CREATE INDEX IF NOT EXISTS idx_incidents_type_time ON incidents (type, detected_at);
+CREATE INDEX IF NOT EXISTS idx_incidents_time ON incidents (detected_at);
+CREATE INDEX IF NOT EXISTS idx_incidents_unsynced ON incidents (detected_at) WHERE sync_state IN ('pending', 'failed');
+"""
+
+INSERT_SQL = (
+    "INSERT OR IGNORE INTO incidents "
+    "(id, cctv_id, type, confidence, detected_at, screenshot, clip_path, metadata) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SYNC_SQL = (
+    "UPDATE incidents SET sync_state = CASE WHEN ? = 'failed' AND sync_attempts + 1 >= ? THEN 'abandoned' ELSE ? END, "
+    "sync_attempts = sync_attempts + 1, last_error = ?, synced_at = ? WHERE id = ?"
+)
+
+
+class IncidentJournal:
+    """
+    Semua tulis lewat satu thread writer yang meng-commit per batch (bukan per insiden),
+    sehingga thread deteksi/pipeline hanya memasukkan ke antrean. Query memakai koneksi
+    baca per thread; WAL membuat pembaca tidak memblokir writer.
+    """
+
+    def __init__(self, path: str, config: Dict, logger: Optional[logging.Logger] = None):
+        self.path = path
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._writer_conn = self._connect()
+        self._writer_conn.executescript(SCHEMA)
+        self._writer_conn.commit()
+
+        self._local = threading.local()
+        # Insiden yang pengiriman live-nya belum selesai (id -> waktu dicatat); bukan kandidat replay
+        self._delivering: Dict[str, float] = {}
+        self._delivering_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=config['queue_size'])
+        self._stats_lock = threading.Lock()
+        self.stats = {'commits': 0, 'rows_written': 0, 'updates_written': 0, 'dropped': 0, 'pruned': 0}
+        self._running = True
+        self._writer = threading.Thread(target=self._writer_loop, name='incident-journal', daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.config['busy_timeout'], check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # NORMAL di WAL: commit tetap atomik, fsync hanya saat checkpoint
+        conn.execute(f"PRAGMA synchronous={self.config['synchronous']}")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.execute('PRAGMA query_only=ON')
+        return conn
+
+    # ====== Tulis (non-blocking) ======
+
+    def _enqueue(self, item):
+        try:
+            self._queue.put(item, timeout=self.config['enqueue_timeout'])
+        except queue.Full:
+            with self._stats_lock:
+                self.stats['dropped'] += 1
+            self.logger.warning(f"⚠️ Incident journal queue full, dropping {item[0]}")
+
+    def record(self, cctv_id: str, incident_type: str, confidence: Optional[float], detected_at: float,
+               screenshot: Optional[str] = None, clip_path: Optional[str] = None,
+               metadata: Optional[Dict] = None) -> str:
+        """Catat insiden baru (status pending). Mengembalikan id jurnal."""
+        incident_id = uuid.uuid4().hex
+        with self._delivering_lock:
+            self._delivering[incident_id] = time.time()
+        self._enqueue(('insert', (
+            incident_id, cctv_id, incident_type, confidence, detected_at, screenshot, clip_path,
+            json.dumps(metadata, default=str) if metadata else None,
+        )))
+        return incident_id
+
+    def mark_sync(self, incident_id: str, success: bool, error: Optional[str] = None):
+        with self._delivering_lock:
+            self._delivering.pop(incident_id, None)
+        state = SYNC_SYNCED if success else SYNC_FAILED
+        self._enqueue(('sync', (
+            state, self.config['max_replay_attempts'], state,
+            None if success else (error or 'delivery failed'),
+            time.time() if success else None, incident_id,
+        )))
+
+    def _writer_loop(self):
+        last_prune = 0.0
+        while self._running or not self._queue.empty():
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.config['flush_interval']))
+                deadline = time.time() + self.config['flush_interval']
+                while len(batch) < self.config['batch_size']:
+                    batch.append(self._queue.get(timeout=max(deadline - time.time(), 0)))
+            except queue.Empty:
+                pass
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except sqlite3.Error as e:
+                    self.logger.error(f"Error writing incident journal batch ({len(batch)} items): {e}")
+
+            if time.time() - last_prune >= self.config['prune_interval']:
+                try:
+                    self._prune()
+                except sqlite3.Error as e:
+                    self.logger.error(f"Error pruning incident journal: {e}")
+                last_prune = time.time()
+
+    def _write_batch(self, batch: List):
+        # Insert selalu diantrekan sebelum update sync insiden yang sama, jadi urutan ini aman
+        inserts = [params for kind, params in batch if kind == 'insert']
+        updates = [params for kind, params in batch if kind == 'sync']
+        with self._writer_conn:
+            if inserts:
+                self._writer_conn.executemany(INSERT_SQL, inserts)
+            if updates:
+                self._writer_conn.executemany(SYNC_SQL, updates)
+        with self._stats_lock:
+            self.stats['commits'] += 1
+            self.stats['rows_written'] += len(inserts)
+            self.stats['updates_written'] += len(updates)
+
+    def _prune(self):
+        """Hapus insiden yang sudah tersinkron/ditinggalkan dan melewati masa retensi"""
+        cutoff = time.time() - self.config['retention_days'] * 86400
+        with self._writer_conn:
+            cursor = self._writer_conn.execute(
+                "DELETE FROM incidents WHERE detected_at < ? AND sync_state IN (?, ?)",
+                (cutoff, SYNC_SYNCED, SYNC_ABANDONED)
+            )
+        if cursor.rowcount:
+            with self._stats_lock:
+                self.stats['pruned'] += cursor.rowcount
+            self.logger.info(f"🧹 Pruned {cursor.rowcount} old incidents from journal")
+
+    # ====== Query ======
+
+    def query(self, cctv_id: Optional[str] = None, incident_type: Optional[str] = None,
+              start: Optional[float] = None, end: Optional[float] = None,
+              sync_state: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Insiden terbaru lebih dulu; filter kamera/tipe/waktu memakai index"""
+        clauses, params = [], []
+        for column, value in (('cctv_id', cctv_id), ('type', incident_type), ('sync_state', sync_state)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start is not None:
+            clauses.append("detected_at >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("detected_at <= ?")
+            params.append(end)
+
+        sql = "SELECT * FROM incidents"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY detected_at DESC LIMIT ?"
+        rows = self._reader().execute(sql, params + [limit]).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def delivering(self) -> set:
+        """
+        Id insiden yang pengiriman live-nya masih berjalan. Setelah delivery_timeout callback-nya
+        dianggap hilang (misal batch dibuang saat shutdown) dan insiden boleh di-replay.
+        """
+        cutoff = time.time() - self.config['delivery_timeout']
+        with self._delivering_lock:
+            for incident_id in [i for i, recorded in self._delivering.items() if recorded < cutoff]:
+                del self._delivering[incident_id]
+            return set(self._delivering)
+
+    def unsynced(self, older_than: float, limit: int, exclude: Optional[set] = None) -> List[Dict]:
+        """
+        Kandidat replay: pending yang sudah lama (hasil pengiriman hilang) atau failed, terlama dulu.
+        Insiden yang pengiriman live-nya masih berjalan tidak pernah diambil.
+        """
+        exclude = (exclude or set()) | self.delivering()
+        rows = self._reader().execute(
+            "SELECT * FROM incidents WHERE sync_state IN (?, ?) AND detected_at <= ? "
+            "ORDER BY detected_at LIMIT ?",
+            (SYNC_PENDING, SYNC_FAILED, older_than, limit + len(exclude))
+        ).fetchall()
+        return [self._row_to_dict(row) for row in rows if row['id'] not in exclude][:limit]
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict:
+        item = dict(row)
+        item['metadata'] = json.loads(item['metadata']) if item['metadata'] else {}
+        return item
+
+    def get_stats(self) -> Dict:
+        counts = dict.fromkeys(SYNC_STATES, 0)
+        try:
+            for state, count in self._reader().execute(
+                "SELECT sync_state, COUNT(*) FROM incidents GROUP BY sync_state"
+            ).fetchall():
+                counts[state] = count
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading incident journal stats: {e}")
+        with self._stats_lock:
+            stats = dict(self.stats)
+        commits = stats['commits']
+        stats.update({
+            'path': self.path,
+            'by_sync_state': counts,
+            'queue_depth': self._queue.qsize(),
+            'avg_batch_size': round((stats['rows_written'] + stats['updates_written']) / commits, 2) if commits else 0.0,
+        })
+        return stats
+
+    def close(self):
+        self._running = False
+        self._writer.join(timeout=self.config['flush_interval'] * 4)
+        self._writer_conn.close()
+
+
+class JournalReplayer:
+    """
+    Thread yang mengirim ulang insiden belum tersinkron setelah Laravel kembali.
+    Jika satu putaran replay gagal semua, interval digandakan (hingga max) agar
+    Laravel yang masih down tidak dibanjiri; satu keberhasilan mengembalikan interval.
+
+    build_payload(row) -> payload Laravel (None = tidak bisa dibangun, ditandai gagal)
+    send(payload, callback(success))
+    """
+
+    def __init__(self, journal: IncidentJournal, config: Dict,
+                 build_payload: Callable[[Dict], Optional[Dict]],
+                 send: Callable[[Dict, Callable[[bool], None]], None],
+                 logger: Optional[logging.Logger] = None):
+        self.journal = journal
+        self.config = config
+        self.build_payload = build_payload
+        self.send = send
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.interval = config['replay_interval']
+        self.replayed = 0
+        self.replay_failed = 0
+        self._in_flight = set()
+        self._completed = set()  # Hasil sudah diketahui tapi update-nya mungkin belum di-commit writer
+        self._round_ok = 0
+        self._round_failed = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._replay_loop, name='incident-replay', daemon=True)
+        self._thread.start()
+
+    def trigger(self):
+        """Replay sekarang juga (misal setelah Laravel diketahui pulih)"""
+        self.interval = self.config['replay_interval']
+        self._wake.set()
+
+    def _replay_loop(self):
+        while self._running:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._running:
+                break
+            try:
+                self._replay_round()
+            except Exception as e:
+                self.logger.error(f"Error replaying incidents: {e}")
+
+    def _replay_round(self):
+        with self._lock:
+            exclude = self._in_flight | self._completed
+            self._completed = set()
+            succeeded, failed = self._round_ok, self._round_failed
+            self._round_ok = self._round_failed = 0
+        rows = self.journal.unsynced(
+            time.time() - self.config['replay_min_age'], self.config['replay_batch_size'], exclude
+        )
+
+        # Sesuaikan interval dari hasil putaran sebelumnya
+        if succeeded or not rows:
+            self.interval = self.config['replay_interval']
+        elif failed:
+            self.interval = min(self.interval * 2, self.config['replay_max_interval'])
+        if not rows:
+            return
+
+        self.logger.info(f"🔁 Replaying {len(rows)} unsynced incidents (interval {self.interval:.0f}s)")
+        for row in rows:
+            payload = self.build_payload(row)
+            if payload is None:
+                self.journal.mark_sync(row['id'], False, 'payload unavailable')
+                continue
+            with self._lock:
+                self._in_flight.add(row['id'])
+            self.send(payload, lambda ok, incident_id=row['id']: self._on_result(incident_id, ok))
+
+    def _on_result(self, incident_id: str, success: bool):
+        self.journal.mark_sync(incident_id, success, None if success else 'replay failed')
+        with self._lock:
+            self._in_flight.discard(incident_id)
+            self._completed.add(incident_id)
+            if success:
+                self._round_ok += 1
+                self.replayed += 1
+            else:
+                self._round_failed += 1
+                self.replay_failed += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            'interval_seconds': self.interval,
+            'in_flight': len(self._in_flight),
+            'replayed': self.replayed,
+            'replay_failed': self.replay_failed,
+        }
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
@@ -0,0 +1,226 @@
+# incident_sender.py
+# Pengiriman insiden ke Laravel secara batch (coalescing) dengan body JSON terkompresi gzip
+
+import gzip
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+# callback(success) dipanggil sekali per insiden setelah hasil pengiriman diketahui
+ResultCallback = Callable[[bool], None]
+
+
+class IncidentBatcher:
+    """
+    Mengumpulkan insiden selama window singkat (atau hingga batas ukuran) lalu
+    mengirimnya sebagai satu request gzip ke endpoint batch Laravel
+    """
+
+    def __init__(self, url: str, config: Dict, api_config: Dict,
+                 fallback_send: Optional[Callable[[Dict], bool]] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.url = url
+        self.config = config
+        self.api_config = api_config
+        self.fallback_send = fallback_send
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.session = requests.Session()
+        self._queue = queue.Queue()
+        self._running = True
+        self._batch_endpoint_available = True
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'batches_sent': 0,
+            'incidents_sent': 0,
+            'incidents_failed': 0,
+            'max_batch_size': 0,
+            'bytes_uncompressed': 0,
+            'bytes_compressed': 0,
+        }
+
+        self._worker = threading.Thread(target=self._batch_loop, name='incident-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, payload: Dict, callback: Optional[ResultCallback] = None):
+        """Antrekan insiden untuk dikirim pada batch berikutnya (non-blocking)"""
+        self._queue.put((payload, callback))
+
+    def _collect_batch(self) -> List:
+        """Tunggu insiden pertama, lalu kumpulkan hingga window habis atau batas tercapai"""
+        try:
+            batch = [self._queue.get(timeout=1.0)]
+        except queue.Empty:
+            return []
+
+        deadline = time.time() + self.config['window_seconds']
+        batch_bytes = len(batch[0][0].get('image_base64', ''))
+        while len(batch) < self.config['max_batch_size'] and batch_bytes < self.config['max_batch_bytes']:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            batch_bytes += len(item[0].get('image_base64', ''))
+        return batch
+
+    def _batch_loop(self):
+        while self._running or not self._queue.empty():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            try:
+                self._send_batch(batch)
+            except Exception as e:
+                self.logger.error(f"Error sending incident batch: {e}")
+                self._finish(batch, [False] * len(batch))
+
+    def _send_batch(self, batch: List):
+        if not self._batch_endpoint_available and self.fallback_send:
+            self._finish(batch, [self.fallback_send(payload) for payload, _ in batch])
+            return
+
+        results: List[Optional[bool]] = [None] * len(batch)
+        self._send_items(batch, list(range(len(batch))), results)
+        self._finish(batch, [bool(r) for r in results])
+
+    def _send_items(self, batch: List, pending: List[int], results: List[Optional[bool]]):
+        """
+        Kirim batch[i] untuk setiap i di `pending` dan isi results[i]. Batch yang ditolak
+        utuh tanpa status per insiden (mis. 413) dibelah dua dan dikirim ulang, jadi insiden
+        hanya ditandai gagal jika server memberi status untuk insiden itu sendiri.
+        """
+        for attempt in range(self.api_config['retry_attempts']):
+            body = json.dumps({'incidents': [batch[i][0] for i in pending]}).encode('utf-8')
+            compressed = gzip.compress(body, compresslevel=self.config['compression_level'])
+
+            retry = []
+            try:
+                response = self.session.post(
+                    self.url,
+                    data=compressed,
+                    headers={
+                        'Content-Type': 'application/json',
+                        'Content-Encoding': 'gzip',
+                        'Accept': 'application/json'
+                    },
+                    timeout=self.api_config['timeout']
+                )
+                self._record_bytes(len(body), len(compressed))
+
+                if response.status_code == 404 and self.fallback_send:
+                    # Laravel belum punya endpoint batch: kirim satu per satu
+                    self.logger.warning("⚠️ Batch endpoint not available, falling back to single sends")
+                    self._batch_endpoint_available = False
+                    for i in pending:
+                        results[i] = self.fallback_send(batch[i][0])
+                    return
+
+                if response.status_code >= 500:
+                    retry = pending
+                else:
+                    item_results = self._item_results(response)
+                    unresolved = []
+                    for position, i in enumerate(pending):
+                        item = item_results.get(position)
+                        if item is None and response.status_code >= 400 and len(pending) > 1:
+                            # Batch ditolak utuh (mis. 413): belum ada status untuk insiden ini
+                            unresolved.append(i)
+                            continue
+                        item = item or {}
+                        status = item.get('status', response.status_code)
+                        if status in (200, 201):
+                            results[i] = True
+                        elif status >= 500:
+                            retry.append(i)
+                        else:
+                            # Error validasi per insiden tidak akan berhasil jika diulang
+                            self.logger.warning(f"⚠️ Incident rejected by Laravel: {item.get('error', status)}",
+                                                extra={'throttle': True})
+                            results[i] = False
+
+                    self.logger.info(
+                        f"📦 Incident batch sent: {len(pending) - len(retry) - len(unresolved)}/{len(pending)} ok, "
+                        f"{len(body)} → {len(compressed)} bytes"
+                    )
+
+                    if unresolved:
+                        half = len(unresolved) // 2
+                        self.logger.warning(
+                            f"⚠️ Incident batch rejected ({response.status_code}), "
+                            f"resending {len(unresolved)} incident(s) in smaller batches"
+                        )
+                        for part in (unresolved[:half], unresolved[half:]):
+                            if part:
+                                self._send_items(batch, part, results)
+
+            except requests.exceptions.RequestException as e:
+                self.logger.error(f"❌ Batch request error (attempt {attempt + 1}): {e}")
+                retry = pending
+            except ValueError as e:
+                self.logger.error(f"❌ Invalid batch response from Laravel: {e}")
+                retry = []
+
+            pending = retry
+            if not pending:
+                break
+            if attempt < self.api_config['retry_attempts'] - 1:
+                time.sleep(self.api_config['retry_delay'])
+
+    @staticmethod
+    def _item_results(response) -> Dict[int, Dict]:
+        """Status per insiden dari respons batch (index -> hasil); kosong jika tidak ada"""
+        try:
+            data = response.json()
+        except ValueError:
+            # Halaman error (mis. 413 dari proxy) tidak berisi JSON
+            if response.status_code >= 400:
+                return {}
+            raise
+        results = data.get('results', []) if isinstance(data, dict) else []
+        return {r.get('index'): r for r in results}
+
+    def _record_bytes(self, raw: int, compressed: int):
+        with self._stats_lock:
+            self.stats['bytes_uncompressed'] += raw
+            self.stats['bytes_compressed'] += compressed
+
+    def _finish(self, batch: List, results: List[bool]):
+        with self._stats_lock:
+            self.stats['batches_sent'] += 1
+            self.stats['max_batch_size'] = max(self.stats['max_batch_size'], len(batch))
+            self.stats['incidents_sent'] += sum(results)
+            self.stats['incidents_failed'] += len(results) - sum(results)
+
+        for (_, callback), success in zip(batch, results):
+            if callback:
+                try:
+                    callback(success)
+                except Exception as e:
+                    self.logger.error(f"Error in incident result callback: {e}")
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        batches = stats['batches_sent']
+        raw = stats['bytes_uncompressed']
+        stats.update({
+            'queue_depth': self._queue.qsize(),
+            'avg_batch_size': round((stats['incidents_sent'] + stats['incidents_failed']) / batches, 2) if batches else 0.0,
+            'bytes_saved': raw - stats['bytes_compressed'],
+            'compression_ratio': round(stats['bytes_compressed'] / raw, 4) if raw else 0.0,
+        })
+        return stats
+
+    def close(self):
+        """Kirim sisa antrean sebelum berhenti"""
+        self._running = False
+        self._worker.join(timeout=self.api_config['timeout'])
@@ -0,0 +1,185 @@
+# logging_setup.py
+# Logging asinkron: thread pemanggil hanya memasukkan record ke queue, satu listener thread
+# menulis ke file (JSON) dan console
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from cctv_config import LOGGING_CONFIG
+
+# Atribut bawaan LogRecord; atribut lain (dari extra=...) ikut ditulis sebagai field JSON
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'throttle'}
+
+_EXC_FORMATTER = logging.Formatter()
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['NonBlockingQueueHandler'] = None
+_setup_lock = threading.Lock()
+
+
+class JSONFormatter(logging.Formatter):
+    """Satu objek JSON per baris"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Batasi pesan berulang dari call site hot-path per frame: hanya record dengan
+    extra={'throttle': True} yang dibatasi, maksimal `burst` record per `window_seconds`
+    per (logger, file, baris, cctv_id) sehingga kamera lain tidak berbagi kuota.
+    Baris insiden dan lifecycle tidak pernah ditandai, jadi selalu lolos. Jumlah yang
+    dibuang dilaporkan di record berikutnya yang lolos. Level di atas `max_level`
+    (mis. ERROR) selalu lolos.
+    """
+
+    def __init__(self, window_seconds: float, burst: int, max_level: int):
+        super().__init__()
+        self.window_seconds = window_seconds
+        self.burst = burst
+        self.max_level = max_level
+        self._windows: Dict[tuple, list] = {}  # key -> [window_start, count, suppressed]
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or not getattr(record, 'throttle', False):
+            return True
+
+        key = (record.name, record.pathname, record.lineno, getattr(record, 'cctv_id', None))
+        now = record.created
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.window_seconds:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed_total += 1
+            return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang tidak pernah memblokir: jika queue penuh record dibuang dan dihitung"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Argumen digabung sekarang (objek bisa berubah sebelum listener menulis);
+        # traceback disimpan terpisah agar menjadi field 'exc' di JSON
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(config: Dict = LOGGING_CONFIG):
+    """
+    Pasang pipeline logging asinkron pada root logger (idempotent, aman dipanggil
+    dari app.py, yolo_detect.py dan main.py)
+    """
+    global _listener, _queue_handler
+
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        file_handler = logging.FileHandler(config['file'], encoding='utf-8')
+        file_handler.setFormatter(JSONFormatter() if config['json'] else logging.Formatter(config['format']))
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(JSONFormatter() if config['json_console'] else logging.Formatter(config['format']))
+
+        log_queue = queue.Queue(maxsize=config['queue_size'])
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        rate_limit = config['rate_limit']
+        if rate_limit['enabled']:
+            _queue_handler.addFilter(RateLimitFilter(
+                rate_limit['window_seconds'], rate_limit['burst'],
+                logging.getLevelName(rate_limit['max_level'])
+            ))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(config['level'])
+
+        # Level per subsistem (nama logger = nama modul)
+        for name, level in config['levels'].items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler,
+                                                   respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def set_level(name: str, level: str):
+    """Ubah level satu subsistem saat runtime"""
+    logging.getLogger(name or None).setLevel(level.upper())
+
+
+def get_logging_stats() -> Dict:
+    if _queue_handler is None:
+        return {'enabled': False}
+    rate_limiters = [f for f in _queue_handler.filters if isinstance(f, RateLimitFilter)]
+    return {
+        'queue_depth': _queue_handler.queue.qsize(),
+        'dropped': _queue_handler.dropped,
+        'rate_limited': sum(f.suppressed_total for f in rate_limiters),
+        'levels': {
+            name: logging.getLevelName(logging.getLogger(name).getEffectiveLevel())
+            for name in LOGGING_CONFIG['levels']
+        },
+    }
+
+
+def shutdown_logging():
+    """Hentikan listener setelah semua record di queue ditulis"""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
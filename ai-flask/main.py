@@ -5,7 +5,6 @@ import sys
 import os
 import argparse
 import logging
-from datetime import datetime
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -13,18 +12,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from app import app, init_system, cleanup_system
 from yolo_detect import get_detector
 from cctv_config import FLASK_CONFIG
-
-def setup_logging():
-    """Setup logging configuration"""
-    log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    logging.basicConfig(
-        level=logging.INFO,
-        format=log_format,
-        handlers=[
-            logging.FileHandler(f'detection_system_{datetime.now().strftime("%Y%m%d")}.log'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+from logging_setup import setup_logging
 
 def print_banner():
     """Print system banner"""
@@ -54,9 +42,12 @@ def show_available_endpoints():
         f"  GET  http://localhost:{FLASK_CONFIG['port']}/health",
         "",
         "📹 Camera Management:",
-        f"  GET  http://localhost:{FLASK_CONFIG['port']}/cameras",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/cameras?status=&priority=&area=",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/cameras/nearby?lat=&lng=&radius=500",
+        f"  POST http://localhost:{FLASK_CONFIG['port']}/cameras/reload",
         f"  POST http://localhost:{FLASK_CONFIG['port']}/start/<cctv_id>",
         f"  POST http://localhost:{FLASK_CONFIG['port']}/stop/<cctv_id>",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/detection-state/<cctv_id>?wait=5",
         "",
         "🔄 Auto Rotation:",
         f"  POST http://localhost:{FLASK_CONFIG['port']}/start-auto-rotation",
@@ -64,6 +55,23 @@ def show_available_endpoints():
         "",
         "📊 Statistics:",
         f"  GET  http://localhost:{FLASK_CONFIG['port']}/detection-stats",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/stream-health",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/cluster",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/screenshots?cctv_id=&start=&end=",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/detections?cctv_id=&class=&start=&end=&rollup=minute",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/incidents?cctv_id=&type=&sync_state=failed",
+        f"  POST http://localhost:{FLASK_CONFIG['port']}/incidents/replay",
+        "",
+        "📝 Logging:",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/logging",
+        f"  POST http://localhost:{FLASK_CONFIG['port']}/logging  (admin, header X-Admin-Token)",
+        "",
+        "🛠️  Admin (header X-Admin-Token):",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/admin/profile?seconds=10",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/admin/stacks",
+        f"  POST http://localhost:{FLASK_CONFIG['port']}/admin/stage-timing",
+        f"  GET  http://localhost:{FLASK_CONFIG['port']}/admin/memory?diff=now",
+        f"  POST http://localhost:{FLASK_CONFIG['port']}/admin/memory/tracemalloc",
         "",
         "🧪 Testing:",
         f"  POST http://localhost:{FLASK_CONFIG['port']}/test-detection",
@@ -0,0 +1,225 @@
+# memory_monitor.py
+# Akuntansi memori per kamera, alert anggaran, pruning state kamera nonaktif, dan diff tracemalloc
+
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Modul resource hanya ada di Unix
+    resource = None
+
+try:
+    import psutil
+except ImportError:  # psutil opsional, fallback RSS untuk platform tanpa /proc (macOS, Windows)
+    psutil = None
+
+# Sumber memori: fungsi tanpa argumen yang mengembalikan {cctv_id: bytes}
+MemorySource = Callable[[], Dict[str, int]]
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss_bytes() -> int:
+    """
+    RSS proses saat ini (Linux: /proc/self/statm, lainnya: psutil jika terpasang,
+    lalu peak RSS dari getrusage di Unix, selain itu 0)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return 0
+
+
+class MemoryMonitor:
+    """
+    Thread periodik yang menjumlahkan memori per kamera dari beberapa sumber
+    (clip buffer, frame terakhir, tracker, mask ROI), mencatat tren RSS,
+    memberi alert saat anggaran per kamera terlampaui, dan menjalankan pruner
+    """
+
+    def __init__(self, config: Dict, logger: Optional[logging.Logger] = None):
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._sources: Dict[str, MemorySource] = {}
+        self._pruners: List[Callable[[], int]] = []
+        self.per_camera: Dict[str, Dict[str, int]] = {}
+        self.over_budget: Dict[str, int] = {}
+        self.alerts_total = 0
+        self.pruned_total = 0
+        self.rss_history = deque(maxlen=config['rss_history_size'])  # (timestamp, rss_bytes)
+
+        self._tracemalloc_baseline = None
+        self._tracemalloc_previous = None
+        self._tracemalloc_last_diff: List[Dict] = []
+        self._tracemalloc_last_run = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        if config['tracemalloc_enabled']:
+            self.set_tracemalloc(True)
+
+    def add_source(self, name: str, source: MemorySource):
+        self._sources[name] = source
+
+    def add_pruner(self, pruner: Callable[[], int]):
+        """pruner() membuang state kamera nonaktif dan mengembalikan jumlah entri yang dibuang"""
+        self._pruners.append(pruner)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._monitor_loop, name='memory-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _monitor_loop(self):
+        while not self._stop.wait(self.config['check_interval']):
+            try:
+                self.check()
+            except Exception as e:
+                self.logger.error(f"Error in memory monitor: {e}")
+
+    def check(self):
+        """Satu siklus: pruning, akuntansi per kamera, alert anggaran, dan diff tracemalloc"""
+        pruned = 0
+        for pruner in self._pruners:
+            pruned += pruner()
+        if pruned:
+            self.pruned_total += pruned
+            self.logger.info(f"🧹 Pruned state of {pruned} inactive camera entries")
+
+        self.rss_history.append((time.time(), current_rss_bytes()))
+        self._account()
+
+        if tracemalloc.is_tracing() and time.time() - self._tracemalloc_last_run >= self.config['tracemalloc_interval']:
+            self._tracemalloc_last_diff = self.snapshot_diff()
+
+    def _account(self):
+        per_camera: Dict[str, Dict[str, int]] = {}
+        for name, source in self._sources.items():
+            try:
+                usage = source()
+            except Exception as e:
+                self.logger.error(f"Error reading memory source {name}: {e}")
+                continue
+            for cctv_id, size in usage.items():
+                per_camera.setdefault(cctv_id, {})[name] = int(size)
+
+        budget = self.config['camera_budget_bytes']
+        over_budget = {}
+        for cctv_id, usage in per_camera.items():
+            total = usage['total'] = sum(usage.values())
+            if total > budget:
+                over_budget[cctv_id] = total
+                if cctv_id not in self.over_budget:
+                    # Hanya log saat kamera baru melewati anggaran, bukan setiap siklus
+                    self.alerts_total += 1
+                    self.logger.warning(
+                        f"⚠️ Camera {cctv_id} memory {total / 1e6:.1f} MB exceeds budget "
+                        f"{budget / 1e6:.1f} MB: {usage}",
+                        extra={'cctv_id': cctv_id, 'memory_bytes': total}
+                    )
+
+        for cctv_id in set(self.over_budget) - set(over_budget):
+            self.logger.info(f"✅ Camera {cctv_id} memory back within budget")
+
+        with self._lock:
+            self.per_camera = per_camera
+            self.over_budget = over_budget
+
+    # ====== tracemalloc ======
+
+    def set_tracemalloc(self, enabled: bool):
+        """Nyalakan/matikan tracemalloc (ada overhead CPU/memori saat aktif)"""
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(self.config['tracemalloc_frames'])
+            self._tracemalloc_baseline = tracemalloc.take_snapshot()
+            self._tracemalloc_previous = self._tracemalloc_baseline
+            self._tracemalloc_last_run = time.time()
+            self.logger.info("🔬 tracemalloc started")
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._tracemalloc_baseline = self._tracemalloc_previous = None
+            self._tracemalloc_last_diff = []
+            self.logger.info("🔬 tracemalloc stopped")
+
+    def snapshot_diff(self, since_baseline: bool = False, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Ambil snapshot dan bandingkan dengan snapshot periodik sebelumnya
+        (atau baseline saat tracemalloc dinyalakan). Diurutkan dari pertumbuhan terbesar.
+        """
+        if not tracemalloc.is_tracing():
+            return []
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        reference = self._tracemalloc_baseline if since_baseline else self._tracemalloc_previous
+        stats = snapshot.compare_to(reference, 'traceback')
+        if not since_baseline:
+            self._tracemalloc_previous = snapshot
+            self._tracemalloc_last_run = time.time()
+
+        return [
+            {
+                'size_diff_kb': round(stat.size_diff / 1024, 1),
+                'size_kb': round(stat.size / 1024, 1),
+                'count_diff': stat.count_diff,
+                'traceback': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            }
+            for stat in stats[:limit or self.config['tracemalloc_top']]
+        ]
+
+    # ====== Laporan ======
+
+    def _rss_growth_mb_per_hour(self) -> Optional[float]:
+        if len(self.rss_history) < 2:
+            return None
+        (t0, rss0), (t1, rss1) = self.rss_history[0], self.rss_history[-1]
+        if t1 - t0 <= 0:
+            return None
+        return round((rss1 - rss0) / 1e6 / ((t1 - t0) / 3600), 2)
+
+    def get_report(self) -> Dict:
+        with self._lock:
+            per_camera = dict(self.per_camera)
+            over_budget = dict(self.over_budget)
+        return {
+            'rss_mb': round(current_rss_bytes() / 1e6, 1),
+            'rss_growth_mb_per_hour': self._rss_growth_mb_per_hour(),
+            'camera_budget_bytes': self.config['camera_budget_bytes'],
+            'per_camera': per_camera,
+            'over_budget': over_budget,
+            'alerts_total': self.alerts_total,
+            'pruned_total': self.pruned_total,
+            'tracemalloc': {
+                'enabled': tracemalloc.is_tracing(),
+                'traced_mb': round(tracemalloc.get_traced_memory()[0] / 1e6, 1) if tracemalloc.is_tracing() else None,
+                'last_diff': self._tracemalloc_last_diff,
+            },
+        }
+
+    def get_summary(self) -> Dict:
+        return {
+            'rss_mb': round(current_rss_bytes() / 1e6, 1),
+            'rss_growth_mb_per_hour': self._rss_growth_mb_per_hour(),
+            'cameras_over_budget': sorted(self.over_budget),
+            'pruned_total': self.pruned_total,
+        }
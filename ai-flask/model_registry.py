@@ -0,0 +1,196 @@
+# model_registry.py
+# Beberapa model khusus (accident, fire, flood, ...) dengan cadence per kamera dan anggaran
+# komputasi per inferensi; semua model memakai satu frame yang sudah di-decode dan di-preprocess
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+DEFAULT_MODEL = 'default'  # Model utama detector (self.model / cascade), selalu terdaftar
+LETTERBOX_COLOR = 114
+
+
+class SharedFrame:
+    """
+    Frame yang di-letterbox sekali ke imgsz × imgsz lalu dikonversi sekali ke tensor
+    BCHW float 0-1. Ultralytics melewati resize/normalisasi untuk input tensor, jadi
+    N model pada frame yang sama hanya membayar satu kali preprocessing.
+    """
+
+    def __init__(self, frame: np.ndarray, imgsz: int):
+        self.frame = frame
+        self.imgsz = imgsz
+        height, width = frame.shape[:2]
+        self.scale = min(imgsz / height, imgsz / width)
+        new_w, new_h = int(round(width * self.scale)), int(round(height * self.scale))
+        self.pad_x = (imgsz - new_w) // 2
+        self.pad_y = (imgsz - new_h) // 2
+        self._letterboxed = None
+        self._tensor = None
+        self._lock = threading.Lock()
+
+    def letterboxed(self) -> np.ndarray:
+        if self._letterboxed is None:
+            height, width = self.frame.shape[:2]
+            new_w, new_h = int(round(width * self.scale)), int(round(height * self.scale))
+            canvas = np.full((self.imgsz, self.imgsz, 3), LETTERBOX_COLOR, dtype=np.uint8)
+            resized = cv2.resize(self.frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+            canvas[self.pad_y:self.pad_y + new_h, self.pad_x:self.pad_x + new_w] = resized
+            self._letterboxed = canvas
+        return self._letterboxed
+
+    def tensor(self):
+        """Tensor 1×3×imgsz×imgsz RGB 0-1 (dibuat sekali, dipakai semua model)"""
+        with self._lock:
+            if self._tensor is None:
+                import torch  # Dependensi ultralytics; diimpor saat model pertama dijalankan
+                rgb = np.ascontiguousarray(self.letterboxed()[:, :, ::-1].transpose(2, 0, 1))
+                self._tensor = torch.from_numpy(rgb).unsqueeze(0).float().div_(255.0)
+            return self._tensor
+
+    def to_frame_coords(self, detections: List[Dict]) -> List[Dict]:
+        """Box dari ruang letterbox ke koordinat frame asli (in-place)"""
+        height, width = self.frame.shape[:2]
+        for detection in detections:
+            x1, y1, x2, y2 = detection['bbox']
+            detection['bbox'] = [
+                int(min(max((x1 - self.pad_x) / self.scale, 0), width)),
+                int(min(max((y1 - self.pad_y) / self.scale, 0), height)),
+                int(min(max((x2 - self.pad_x) / self.scale, 0), width)),
+                int(min(max((y2 - self.pad_y) / self.scale, 0), height)),
+            ]
+        return detections
+
+
+class ModelRegistry:
+    """
+    Daftar model khusus dari config['models']: {nama: {path, interval, priority, confidence, classes}}.
+    Model yang file-nya belum ada dilewati (dengan warning) agar detector tetap jalan dengan
+    model utama saja. Entri DEFAULT_MODEL selalu ada dan menunjuk ke model utama detector.
+
+    loader(path) -> model
+    """
+
+    def __init__(self, config: Dict, loader: Callable[[str], object], logger: Optional[logging.Logger] = None):
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+        self.specs: Dict[str, Dict] = {}
+        self.models: Dict[str, object] = {}
+        self.cost_ms: Dict[str, float] = {}  # EMA durasi per model, dipakai scheduler untuk anggaran
+        self.runs: Dict[str, int] = {}
+        self.deferred: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        for name, spec in config['models'].items():
+            if name != DEFAULT_MODEL:
+                try:
+                    self.models[name] = loader(spec['path'])
+                except Exception as e:
+                    self.logger.warning(f"⚠️ Model '{name}' not loaded ({spec['path']}): {e}")
+                    continue
+                self.logger.info(f"✅ Model '{name}' loaded: {spec['path']} (every {spec['interval']}s)")
+            self.specs[name] = spec
+            self.runs[name] = 0
+            self.deferred[name] = 0
+
+        if DEFAULT_MODEL not in self.specs:
+            self.specs[DEFAULT_MODEL] = {'interval': 0, 'priority': 0, 'confidence': None, 'classes': None}
+            self.runs[DEFAULT_MODEL] = 0
+            self.deferred[DEFAULT_MODEL] = 0
+
+    def record_run(self, name: str, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            previous = self.cost_ms.get(name)
+            self.cost_ms[name] = ms if previous is None else previous + self.config['cost_smoothing'] * (ms - previous)
+            self.runs[name] += 1
+
+    def record_deferred(self, names: List[str]):
+        with self._lock:
+            for name in names:
+                self.deferred[name] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'imgsz': self.config['imgsz'],
+                'budget_ms': self.config['budget_ms'],
+                'models': {
+                    name: {
+                        'path': spec.get('path'),
+                        'interval': spec['interval'],
+                        'priority': spec['priority'],
+                        'runs': self.runs[name],
+                        'deferred': self.deferred[name],
+                        'avg_ms': round(self.cost_ms[name], 2) if name in self.cost_ms else None,
+                    }
+                    for name, spec in self.specs.items()
+                },
+            }
+
+
+class ModelScheduler:
+    """
+    Memilih model yang dijalankan pada satu tick inferensi kamera. Model due jika sudah
+    lewat interval-nya sejak terakhir jalan di kamera itu (kamera bisa override via
+    'model_intervals': {nama: detik | None untuk menonaktifkan}). Model due diurutkan
+    berdasarkan priority lalu seberapa lama terlambat, dan diambil selama estimasi biaya
+    masih muat di budget_ms. DEFAULT_MODEL (jika due) selalu diambil pertama dan tidak
+    pernah ditunda; di antara model khusus, yang tertunda lebih dari satu interval penuh
+    didahulukan agar model prioritas rendah tidak kelaparan.
+    """
+
+    def __init__(self, registry: ModelRegistry):
+        self.registry = registry
+        self._last_run: Dict[str, Dict[str, float]] = {}  # cctv_id -> model -> waktu terakhir jalan
+        self._lock = threading.Lock()
+
+    def select(self, cctv_id: Optional[str], now: float,
+               overrides: Optional[Dict[str, Optional[float]]] = None) -> List[str]:
+        specs = self.registry.specs
+        if cctv_id is None:
+            return sorted(specs, key=lambda name: specs[name]['priority'])
+
+        overrides = overrides or {}
+        with self._lock:
+            last_run = self._last_run.setdefault(cctv_id, {})
+            due: List[Tuple[bool, int, float, str]] = []
+            for name, spec in specs.items():
+                interval = overrides.get(name, spec['interval'])
+                if interval is None:
+                    continue
+                # Kamera baru: semua model langsung due, belum dianggap terlambat
+                overdue = now - last_run.setdefault(name, now - interval) - interval
+                if overdue >= 0:
+                    starving = interval > 0 and overdue >= interval
+                    due.append((name != DEFAULT_MODEL, not starving, spec['priority'], -overdue, name))
+            due.sort()
+
+            budget = self.registry.config['budget_ms']
+            selected, deferred, spent = [], [], 0.0
+            for *_, name in due:
+                cost = self.registry.cost_ms.get(name, 0.0)
+                if name != DEFAULT_MODEL and selected and spent + cost > budget:
+                    deferred.append(name)
+                    continue
+                selected.append(name)
+                spent += cost
+                last_run[name] = now
+
+        if deferred:
+            self.registry.record_deferred(deferred)
+        return selected
+
+    def discard(self, cctv_id: str):
+        with self._lock:
+            self._last_run.pop(cctv_id, None)
+
+    def prune(self, active: set) -> int:
+        with self._lock:
+            stale = [cctv_id for cctv_id in self._last_run if cctv_id not in active]
+            for cctv_id in stale:
+                del self._last_run[cctv_id]
+        return len(stale)
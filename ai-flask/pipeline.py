@@ -0,0 +1,260 @@
+# pipeline.py
+# Pipeline bertahap decode → infer → encode → deliver dengan queue terbatas dan kebijakan drop
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'  # Tidak pernah drop: produsen menunggu (backpressure ke tahap sebelumnya)
+
+
+class KeyedFrameQueue:
+    """
+    Queue frame bersama untuk semua kamera dengan kebijakan drop-oldest per kamera.
+    Frame satu kamera diproses berurutan dan tidak pernah paralel (penting untuk tracker),
+    sedangkan kamera berbeda bisa diproses oleh worker berbeda.
+    """
+
+    def __init__(self, max_per_key: int):
+        self.max_per_key = max_per_key
+        self._items: Dict[Hashable, deque] = {}
+        self._ready = deque()        # Key yang punya frame dan tidak sedang diproses
+        self._in_flight = set()
+        self._cond = threading.Condition()
+        self.enqueued = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, key: Hashable, item):
+        with self._cond:
+            items = self._items.setdefault(key, deque())
+            items.append(item)
+            self.enqueued += 1
+            if len(items) > self.max_per_key:
+                items.popleft()
+                self.dropped += 1
+            if key not in self._in_flight and key not in self._ready:
+                self._ready.append(key)
+                self._cond.notify()
+            self.max_depth = max(self.max_depth, self.depth())
+
+    def get(self, timeout: float) -> Optional[Tuple[Hashable, object]]:
+        """Ambil frame tertua dari kamera berikutnya; kamera ditandai in-flight hingga done()"""
+        with self._cond:
+            if not self._ready and not self._cond.wait_for(lambda: self._ready, timeout):
+                return None
+            key = self._ready.popleft()
+            self._in_flight.add(key)
+            return key, self._items[key].popleft()
+
+    def done(self, key: Hashable):
+        with self._cond:
+            self._in_flight.discard(key)
+            if self._items.get(key):
+                self._ready.append(key)
+                self._cond.notify()
+            elif key in self._items:
+                del self._items[key]
+
+    def discard(self, key: Hashable) -> int:
+        """Buang frame yang masih antre untuk satu kamera (kamera dihentikan)"""
+        with self._cond:
+            items = self._items.get(key)
+            count = len(items) if items else 0
+            if items:
+                items.clear()
+            if key in self._ready:
+                self._ready.remove(key)
+            if key not in self._in_flight:
+                self._items.pop(key, None)
+            return count
+
+    def depth(self) -> int:
+        return sum(len(items) for items in self._items.values())
+
+
+class Stage:
+    """
+    Satu tahap pipeline: sejumlah worker bersama yang mengambil item dari queue tahap ini
+    """
+
+    def __init__(self, name: str, handler: Callable, workers: int, capacity: int,
+                 policy: str, logger: logging.Logger, keyed: bool = False,
+                 initializer: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.handler = handler
+        self.initializer = initializer  # Dipanggil sekali di awal tiap thread worker (mis. pin core)
+        self.workers = workers
+        self.policy = policy
+        self.logger = logger
+        self.keyed = keyed
+        self.queue = KeyedFrameQueue(capacity) if keyed else queue.Queue(maxsize=capacity)
+
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._enqueued = 0
+        self._blocked_seconds = 0.0
+        self._max_depth = 0
+        self._stats_lock = threading.Lock()
+        self._running = True
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"pipeline-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item, key: Optional[Hashable] = None):
+        if self.keyed:
+            self.queue.put(key, item)
+            return
+
+        # Queue non-keyed selalu BLOCK: insiden tidak boleh hilang
+        started = time.perf_counter()
+        while self._running:
+            try:
+                self.queue.put(item, timeout=1.0)
+                break
+            except queue.Full:
+                self.logger.warning(f"⚠️ Pipeline stage {self.name} full, waiting (backpressure)",
+                                    extra={'throttle': True})
+        with self._stats_lock:
+            self._enqueued += 1
+            self._blocked_seconds += time.perf_counter() - started
+            self._max_depth = max(self._max_depth, self.queue.qsize())
+
+    def _worker(self):
+        if self.initializer:
+            try:
+                self.initializer()
+            except Exception as e:
+                self.logger.warning(f"⚠️ Pipeline stage {self.name} worker initializer failed: {e}")
+        while self._running or self._pending():
+            if self.keyed:
+                entry = self.queue.get(timeout=0.5)
+                if entry is None:
+                    continue
+                key, item = entry
+            else:
+                try:
+                    item = self.queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                key = None
+
+            started = time.perf_counter()
+            try:
+                if self.keyed:
+                    self.handler(key, item)
+                else:
+                    self.handler(item)
+            except Exception as e:
+                self.errors += 1
+                self.logger.error(f"Error in pipeline stage {self.name}: {e}")
+            finally:
+                with self._stats_lock:
+                    self.processed += 1
+                    self.busy_seconds += time.perf_counter() - started
+                if self.keyed:
+                    self.queue.done(key)
+                else:
+                    self.queue.task_done()
+
+    def _pending(self) -> bool:
+        # Saat berhenti, frame yang tersisa boleh dibuang; insiden tetap dihabiskan
+        return not self.keyed and not self.queue.empty()
+
+    def stop(self, timeout: float):
+        self._running = False
+        deadline = time.time() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - time.time(), 0))
+
+    def get_stats(self) -> Dict:
+        if self.keyed:
+            depth, enqueued, dropped = self.queue.depth(), self.queue.enqueued, self.queue.dropped
+            max_depth = self.queue.max_depth
+        else:
+            depth, enqueued, dropped, max_depth = self.queue.qsize(), self._enqueued, 0, self._max_depth
+        return {
+            'workers': self.workers,
+            'policy': self.policy,
+            'depth': depth,
+            'max_depth': max_depth,
+            'enqueued': enqueued,
+            'dropped': dropped,
+            'processed': self.processed,
+            'errors': self.errors,
+            'avg_ms': round(self.busy_seconds / self.processed * 1000, 2) if self.processed else 0.0,
+            'blocked_seconds': round(self._blocked_seconds, 3),
+        }
+
+
+class DetectionPipeline:
+    """
+    Tahap decode tetap di thread per kamera (VideoCapture.read blocking) dan hanya
+    memasukkan frame ke pipeline; infer, encode dan deliver dikerjakan worker bersama.
+
+    infer(cctv_id, frame_item) -> list item insiden untuk encode
+    encode(incident_item) -> payload untuk deliver (None = dibatalkan)
+    deliver(payload)
+    """
+
+    def __init__(self, config: Dict, infer: Callable, encode: Callable, deliver: Callable,
+                 logger: Optional[logging.Logger] = None, infer_initializer: Optional[Callable[[], None]] = None):
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+        self.frames_submitted = 0
+
+        self.deliver_stage = Stage('deliver', deliver, config['deliver_workers'],
+                                   config['incident_queue_size'], BLOCK, self.logger)
+        self.encode_stage = Stage('encode', lambda item: self._encode(encode, item), config['encode_workers'],
+                                  config['incident_queue_size'], BLOCK, self.logger)
+        self.infer_stage = Stage('infer', lambda key, item: self._infer(infer, key, item), config['infer_workers'],
+                                 config['frames_per_camera'], DROP_OLDEST, self.logger, keyed=True,
+                                 initializer=infer_initializer)
+        self._stages = (self.infer_stage, self.encode_stage, self.deliver_stage)
+
+    def start(self):
+        for stage in self._stages:
+            stage.start()
+        self.logger.info(
+            f"🧵 Pipeline started: infer×{self.infer_stage.workers}, "
+            f"encode×{self.encode_stage.workers}, deliver×{self.deliver_stage.workers}"
+        )
+
+    def submit_frame(self, cctv_id: str, frame_item):
+        """Dipanggil thread decode; tidak pernah memblokir (frame tertua kamera ini dibuang)"""
+        self.frames_submitted += 1
+        self.infer_stage.put(frame_item, key=cctv_id)
+
+    def _infer(self, infer: Callable, cctv_id: str, frame_item):
+        for incident in infer(cctv_id, frame_item):
+            self.encode_stage.put(incident)
+
+    def _encode(self, encode: Callable, incident_item):
+        payload = encode(incident_item)
+        if payload is not None:
+            self.deliver_stage.put(payload)
+
+    def discard(self, cctv_id: str):
+        self.infer_stage.queue.discard(cctv_id)
+
+    def stop(self):
+        # Hentikan dari hulu ke hilir agar insiden yang sudah terbentuk tetap terkirim
+        for stage in self._stages:
+            stage.stop(self.config['shutdown_timeout'])
+
+    def get_stats(self) -> Dict:
+        return {
+            'decode': {'frames_submitted': self.frames_submitted},
+            'infer': self.infer_stage.get_stats(),
+            'encode': self.encode_stage.get_stats(),
+            'deliver': self.deliver_stage.get_stats(),
+        }
@@ -0,0 +1,182 @@
+# profiler.py
+# Profiling on-demand untuk detector yang sedang berjalan: sampling profiler, dump stack thread,
+# dan timing per tahap di detection loop
+
+import functools
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Thread deteksi diberi nama 'detect-<cctv_id>' agar stack bisa dikaitkan ke kamera
+DETECTION_THREAD_PREFIX = 'detect-'
+
+# Kamera yang sedang dikerjakan thread bersama (executor AsyncCore, worker pipeline): ident -> cctv_id.
+# Bukan thread-local karena profiler membaca stack thread lain dari thread-nya sendiri.
+_thread_cameras: Dict[int, str] = {}
+
+
+@contextmanager
+def camera_scope(cctv_id: str):
+    """Tandai thread saat ini sedang mengerjakan kamera `cctv_id` selama blok berjalan"""
+    ident = threading.get_ident()
+    previous = _thread_cameras.get(ident)
+    _thread_cameras[ident] = cctv_id
+    try:
+        yield
+    finally:
+        if previous is None:
+            _thread_cameras.pop(ident, None)
+        else:
+            _thread_cameras[ident] = previous
+
+
+def camera_scoped(method):
+    """Decorator untuk method (self, cctv_id, ...) yang berjalan di thread bersama"""
+    @functools.wraps(method)
+    def wrapper(self, cctv_id, *args, **kwargs):
+        with camera_scope(cctv_id):
+            return method(self, cctv_id, *args, **kwargs)
+    return wrapper
+
+
+def _camera_of(thread_name: str, ident: Optional[int] = None) -> Optional[str]:
+    cctv_id = _thread_cameras.get(ident)
+    if cctv_id is not None:
+        return cctv_id
+    if thread_name.startswith(DETECTION_THREAD_PREFIX):
+        return thread_name[len(DETECTION_THREAD_PREFIX):]
+    return None
+
+
+def _thread_label(thread_name: str, ident: int) -> str:
+    """Nama thread untuk collapsed stack; thread bersama diberi akhiran kamera yang sedang dikerjakan"""
+    cctv_id = _thread_cameras.get(ident)
+    if cctv_id is None or thread_name.startswith(DETECTION_THREAD_PREFIX):
+        return thread_name
+    return f"{thread_name}[{cctv_id}]"
+
+
+def _thread_names() -> Dict[int, str]:
+    return {thread.ident: thread.name for thread in threading.enumerate()}
+
+
+class SamplingProfiler:
+    """
+    Sampling profiler untuk semua thread: stack setiap thread dibaca via sys._current_frames()
+    tiap `interval` detik. Tidak ada overhead saat tidak sedang merekam.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, seconds: float, interval: float) -> Optional[str]:
+        """
+        Rekam selama `seconds` dan kembalikan collapsed stacks (format flamegraph.pl /
+        speedscope): 'thread;fungsi_luar;...;fungsi_dalam jumlah' per baris.
+        None jika profiling lain sedang berjalan.
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            own_ident = threading.get_ident()
+            stacks = Counter()
+            names = _thread_names()
+            deadline = time.perf_counter() + seconds
+
+            while time.perf_counter() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_ident:
+                        continue
+                    if ident not in names:
+                        names = _thread_names()
+                    stacks[self._collapse(_thread_label(names.get(ident, f"thread-{ident}"), ident), frame)] += 1
+                time.sleep(interval)
+
+            return '\n'.join(f"{stack} {count}" for stack, count in stacks.most_common()) + '\n'
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+            frame = frame.f_back
+        parts.append(thread_name.replace(';', ':').replace(' ', '_'))
+        return ';'.join(reversed(parts))
+
+
+def dump_stacks() -> List[Dict]:
+    """Stack saat ini dari setiap thread, dengan label kamera untuk thread deteksi"""
+    threads = {thread.ident: thread for thread in threading.enumerate()}
+    dump = []
+    for ident, frame in sys._current_frames().items():
+        thread = threads.get(ident)
+        name = thread.name if thread else f"thread-{ident}"
+        dump.append({
+            'thread': name,
+            'ident': ident,
+            'daemon': thread.daemon if thread else None,
+            'cctv_id': _camera_of(name, ident),
+            'stack': [line.rstrip('\n') for line in traceback.format_stack(frame)],
+        })
+    return sorted(dump, key=lambda item: item['thread'])
+
+
+class StageTimings:
+    """
+    Akumulasi durasi per tahap per kamera. Detection loop hanya membaca `enabled`
+    sekali per iterasi, jadi biaya saat dimatikan praktis nol.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.enabled_since = None
+        self._stats: Dict[str, Dict[str, List[float]]] = {}  # cctv_id -> stage -> [count, total, max]
+        self._lock = threading.Lock()
+
+    def set_enabled(self, enabled: bool):
+        if enabled and not self.enabled:
+            self.enabled_since = time.time()
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+        self.enabled_since = time.time() if self.enabled else None
+
+    def record(self, cctv_id: str, stage: str, seconds: float):
+        with self._lock:
+            stat = self._stats.setdefault(cctv_id, {}).setdefault(stage, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            cameras = {
+                cctv_id: {
+                    stage: {
+                        'count': count,
+                        'avg_ms': round(total / count * 1000, 3),
+                        'max_ms': round(peak * 1000, 3),
+                        'total_s': round(total, 3),
+                    }
+                    for stage, (count, total, peak) in stages.items()
+                }
+                for cctv_id, stages in self._stats.items()
+            }
+        return {
+            'enabled': self.enabled,
+            'enabled_since': self.enabled_since,
+            'cameras': cameras,
+        }
@@ -0,0 +1,338 @@
+# quantize.py
+# Membuat model presisi rendah (INT8 / FP16) untuk inferensi CPU dan laporan perbandingan dengan FP32
+#
+# Penggunaan:
+#   python quantize.py --precision int8            # kalibrasi + buat model + laporan
+#   python quantize.py --precision fp16 --report-only
+
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from cctv_config import DETECTION_CONFIG, QUANTIZATION_CONFIG, SCREENSHOT_PATH
+
+try:
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    )
+except ImportError:  # onnxruntime opsional, hanya dibutuhkan untuk INT8
+    CalibrationDataReader = object
+    quantize_static = None
+
+try:
+    import resource
+except ImportError:  # Modul resource hanya ada di Unix; di Windows peak RSS tidak diukur
+    resource = None
+
+PRECISIONS = ('fp32', 'fp16', 'int8')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+logger = logging.getLogger(__name__)
+
+
+def base_model_path() -> str:
+    """Bobot FP32 yang dipakai detector (sama dengan logika YOLODetector.load_model)"""
+    model_path = DETECTION_CONFIG['model_path']
+    if model_path and model_path != 'accident.pt':
+        return model_path
+    return 'yolov8n.pt'
+
+
+def quantized_model_path(weights: str, precision: str, config: Dict = QUANTIZATION_CONFIG) -> str:
+    """Lokasi artefak model untuk presisi tertentu (fp32 = bobot aslinya)"""
+    if precision == 'fp32':
+        return weights
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    if precision == 'int8':
+        return os.path.join(config['output_dir'], f"{stem}_int8.onnx")
+    if precision == 'fp16':
+        # Ultralytics mengenali direktori berakhiran _openvino_model sebagai model OpenVINO
+        return os.path.join(config['output_dir'], f"{stem}_fp16_openvino_model")
+    raise ValueError(f"Unknown precision: {precision}")
+
+
+def calibration_frames(config: Dict = QUANTIZATION_CONFIG) -> List[str]:
+    """
+    Frame sampel lokal untuk kalibrasi dan benchmark. Jika direktori kalibrasi kosong,
+    gunakan screenshot insiden yang sudah tersimpan (frame asli dari kamera).
+    """
+    for root in (config['calibration_dir'], SCREENSHOT_PATH):
+        files = sorted(
+            path for path in glob.glob(os.path.join(root, '**', '*'), recursive=True)
+            if path.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if files:
+            return files[:config['calibration_samples']]
+    return []
+
+
+def letterbox(frame: np.ndarray, size: int) -> np.ndarray:
+    """Preprocessing YOLOv8: resize proporsional + padding abu-abu, RGB, NCHW float 0-1"""
+    height, width = frame.shape[:2]
+    scale = min(size / height, size / width)
+    resized = cv2.resize(frame, (int(round(width * scale)), int(round(height * scale))),
+                         interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top = (size - resized.shape[0]) // 2
+    left = (size - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1)[np.newaxis].astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor)
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """Memberi onnxruntime satu frame kalibrasi per pemanggilan"""
+
+    def __init__(self, input_name: str, frames: List[str], imgsz: int):
+        self.input_name = input_name
+        self.frames = iter(frames)
+        self.imgsz = imgsz
+
+    def get_next(self) -> Optional[Dict]:
+        for path in self.frames:
+            frame = cv2.imread(path)
+            if frame is not None:
+                return {self.input_name: letterbox(frame, self.imgsz)}
+        return None
+
+
+def build_int8(weights: str, config: Dict = QUANTIZATION_CONFIG) -> str:
+    """Export ke ONNX lalu kuantisasi statis (QDQ) dengan kalibrasi frame lokal"""
+    if quantize_static is None:
+        raise RuntimeError("onnxruntime is required for INT8 quantization")
+
+    import onnx
+    from ultralytics import YOLO
+
+    frames = calibration_frames(config)
+    if not frames:
+        raise RuntimeError(
+            f"No calibration frames found in {config['calibration_dir']} or {SCREENSHOT_PATH}"
+        )
+
+    os.makedirs(config['output_dir'], exist_ok=True)
+    fp32_onnx = YOLO(weights).export(format='onnx', imgsz=config['imgsz'], simplify=True, dynamic=False)
+
+    model = onnx.load(fp32_onnx)
+    input_name = model.graph.input[0].name
+    # Detect head (box decoding / DFL) tetap FP32: kuantisasi bagian ini merusak presisi koordinat
+    excluded = [
+        node.name for node in model.graph.node
+        if any(node.name.startswith(prefix) for prefix in config['int8_exclude_prefixes'])
+    ]
+
+    output = quantized_model_path(weights, 'int8', config)
+    logger.info(f"🔧 Calibrating INT8 model on {len(frames)} frames ({len(excluded)} nodes kept FP32)")
+    quantize_static(
+        fp32_onnx, output,
+        FrameCalibrationReader(input_name, frames, config['imgsz']),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QUInt8,
+        nodes_to_exclude=excluded,
+    )
+
+    # Metadata ultralytics (names, imgsz, stride) dibutuhkan saat model di-load kembali
+    quantized = onnx.load(output)
+    source_meta = {p.key: p.value for p in onnx.load(fp32_onnx).metadata_props}
+    for key, value in source_meta.items():
+        prop = quantized.metadata_props.add()
+        prop.key, prop.value = key, value
+    onnx.save(quantized, output)
+    return output
+
+
+def cpu_supports_fp16() -> bool:
+    try:
+        from openvino.runtime import Core
+        return 'FP16' in Core().get_property('CPU', 'OPTIMIZATION_CAPABILITIES')
+    except Exception:
+        return False
+
+
+def build_fp16(weights: str, config: Dict = QUANTIZATION_CONFIG) -> str:
+    """Export ke OpenVINO dengan bobot FP16"""
+    import shutil
+    from ultralytics import YOLO
+
+    if not cpu_supports_fp16():
+        logger.warning("⚠️ CPU has no native FP16 support: weights are stored FP16 but computed in FP32")
+
+    os.makedirs(config['output_dir'], exist_ok=True)
+    exported = YOLO(weights).export(format='openvino', imgsz=config['imgsz'], half=True)
+    output = quantized_model_path(weights, 'fp16', config)
+    if os.path.exists(output):
+        shutil.rmtree(output)
+    shutil.move(exported, output)
+    return output
+
+
+def build(precision: str, weights: Optional[str] = None, config: Dict = QUANTIZATION_CONFIG) -> str:
+    weights = weights or base_model_path()
+    if precision == 'int8':
+        return build_int8(weights, config)
+    if precision == 'fp16':
+        return build_fp16(weights, config)
+    return weights
+
+
+# ====== Laporan ======
+
+def _path_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _peak_rss_kb() -> int:
+    """Peak RSS proses dalam KB (ru_maxrss di Linux dalam KB, di macOS dalam byte)"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _evaluate_variant(model_path: str, config: Dict, frames: List[str], results):
+    """Dijalankan di proses terpisah agar peak RSS tiap varian terukur sendiri-sendiri"""
+    try:
+        from ultralytics import YOLO
+
+        baseline_kb = _peak_rss_kb()
+        model = YOLO(model_path, task='detect')
+        images = [img for img in (cv2.imread(path) for path in frames[:config['benchmark_frames']]) if img is not None]
+
+        for image in images[:3]:  # Warm-up
+            model(image, imgsz=config['imgsz'], verbose=False)
+
+        latencies = []
+        for image in images:
+            start = time.perf_counter()
+            model(image, imgsz=config['imgsz'], verbose=False)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        result = {
+            'model_path': model_path,
+            'size_mb': round(_path_size(model_path) / 1e6, 2),
+            'frames': len(latencies),
+            'latency_ms_mean': round(float(np.mean(latencies)), 2) if latencies else None,
+            'latency_ms_p50': round(float(np.percentile(latencies, 50)), 2) if latencies else None,
+            'latency_ms_p95': round(float(np.percentile(latencies, 95)), 2) if latencies else None,
+            'peak_rss_mb': round((_peak_rss_kb() - baseline_kb) / 1024, 1) if resource else None,
+        }
+
+        # mAP hanya jika ada dataset berlabel lokal (format YAML dataset ultralytics)
+        if config['eval_data'] and os.path.exists(config['eval_data']):
+            metrics = model.val(data=config['eval_data'], imgsz=config['imgsz'], batch=1,
+                                device='cpu', plots=False, verbose=False)
+            result['map50'] = round(float(metrics.box.map50), 4)
+            result['map50_95'] = round(float(metrics.box.map), 4)
+
+        results.put(result)
+    except Exception as e:
+        results.put({'model_path': model_path, 'error': str(e)})
+
+
+def evaluate(model_path: str, config: Dict, frames: List[str]) -> Dict:
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_evaluate_variant, args=(model_path, config, frames, results))
+    process.start()
+    deadline = time.time() + config['eval_timeout']
+    result = None
+    # Tunggu per potongan pendek: proses yang crash (OOM, segfault di runtime native)
+    # tidak pernah mengisi queue, jadi berhenti begitu proses sudah mati
+    while result is None:
+        try:
+            result = results.get(timeout=min(1.0, max(deadline - time.time(), 0)))
+        except queue.Empty:
+            if not process.is_alive():
+                try:
+                    result = results.get(timeout=1.0)  # Hasil yang dikirim tepat sebelum proses keluar
+                except queue.Empty:
+                    result = {'model_path': model_path,
+                              'error': f"evaluation process exited with code {process.exitcode}"}
+            elif time.time() >= deadline:
+                result = {'model_path': model_path, 'error': f"evaluation timed out after {config['eval_timeout']}s"}
+                process.terminate()
+    process.join()
+    return result
+
+
+def build_report(precision: str, weights: Optional[str] = None, config: Dict = QUANTIZATION_CONFIG) -> Dict:
+    """Bandingkan FP32 dengan varian presisi rendah: mAP, latency, memori dan ukuran"""
+    weights = weights or base_model_path()
+    frames = calibration_frames(config)
+    variants = {name: quantized_model_path(weights, name, config) for name in ('fp32', precision)}
+
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'weights': weights,
+        'precision': precision,
+        'benchmark_frames': min(len(frames), config['benchmark_frames']),
+        'eval_data': config['eval_data'] if os.path.exists(config['eval_data'] or '') else None,
+        'variants': {name: evaluate(path, config, frames) for name, path in variants.items()},
+    }
+
+    fp32, low = report['variants']['fp32'], report['variants'][precision]
+    if precision != 'fp32' and fp32.get('latency_ms_mean') and low.get('latency_ms_mean'):
+        report['speedup'] = round(fp32['latency_ms_mean'] / low['latency_ms_mean'], 2)
+        if 'map50_95' in fp32 and 'map50_95' in low:
+            report['map50_95_delta'] = round(low['map50_95'] - fp32['map50_95'], 4)
+
+    os.makedirs(config['output_dir'], exist_ok=True)
+    path = os.path.join(config['output_dir'], f"quantization_report_{precision}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    report['report_path'] = path
+    return report
+
+
+def print_report(report: Dict):
+    print(f"\n📊 Quantization report: {report['weights']} ({report['benchmark_frames']} frames)")
+    print(f"{'variant':<8} {'size MB':>8} {'mean ms':>9} {'p95 ms':>8} {'RSS MB':>8} {'mAP50':>7} {'mAP50-95':>9}")
+    for name, result in report['variants'].items():
+        if 'error' in result:
+            print(f"{name:<8} error: {result['error']}")
+            continue
+        print(f"{name:<8} {result['size_mb']:>8} {str(result['latency_ms_mean']):>9} "
+              f"{str(result['latency_ms_p95']):>8} {str(result['peak_rss_mb']):>8} "
+              f"{str(result.get('map50', '-')):>7} {str(result.get('map50_95', '-')):>9}")
+    if 'speedup' in report:
+        print(f"⚡ Speedup vs FP32: {report['speedup']}x")
+    if 'map50_95_delta' in report:
+        print(f"🎯 mAP50-95 change vs FP32: {report['map50_95_delta']:+}")
+    print(f"📝 Saved to {report['report_path']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and benchmark reduced-precision YOLO models')
+    parser.add_argument('--precision', choices=PRECISIONS[1:], default=DETECTION_CONFIG['precision']
+                        if DETECTION_CONFIG['precision'] != 'fp32' else 'int8',
+                        help='Target precision (default: DETECTION_CONFIG precision or int8)')
+    parser.add_argument('--weights', default=None, help='FP32 weights (default: detector model)')
+    parser.add_argument('--report-only', action='store_true', help='Skip building, only compare existing models')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if not args.report_only:
+        output = build(args.precision, args.weights)
+        print(f"✅ {args.precision.upper()} model written to {output}")
+
+    print_report(build_report(args.precision, args.weights))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# roi.py
+# Region of interest (ROI) per kamera: crop inferensi dan filter deteksi di luar poligon
+
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+class ROIMask:
+    """
+    Mask poligon ROI untuk satu resolusi frame
+    """
+
+    def __init__(self, polygon: Sequence[Sequence[float]], width: int, height: int):
+        self.width = width
+        self.height = height
+
+        # Poligon disimpan ternormalisasi (0-1) agar tidak tergantung resolusi stream
+        points = np.array(
+            [[round(x * (width - 1)), round(y * (height - 1))] for x, y in polygon],
+            dtype=np.int32
+        )
+        self.mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(self.mask, [points], 1)
+
+        x, y, w, h = cv2.boundingRect(points)
+        self.crop_box = (x, y, min(x + w, width), min(y + h, height))
+
+    @property
+    def crop_ratio(self) -> float:
+        """Proporsi piksel frame yang benar-benar diproses model"""
+        x1, y1, x2, y2 = self.crop_box
+        return ((x2 - x1) * (y2 - y1)) / float(self.width * self.height)
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """Crop frame ke bounding box ROI (view, tanpa copy)"""
+        x1, y1, x2, y2 = self.crop_box
+        return frame[y1:y2, x1:x2]
+
+    def to_frame_coords(self, detections: List[Dict]) -> List[Dict]:
+        """Geser bbox hasil inferensi crop ke koordinat frame penuh"""
+        x1, y1, _, _ = self.crop_box
+        for detection in detections:
+            bx1, by1, bx2, by2 = detection['bbox']
+            detection['bbox'] = [bx1 + x1, by1 + y1, bx2 + x1, by2 + y1]
+        return detections
+
+    def contains(self, x: float, y: float) -> bool:
+        """Titik (koordinat frame) ada di dalam poligon"""
+        col = min(max(int(x), 0), self.width - 1)
+        row = min(max(int(y), 0), self.height - 1)
+        return bool(self.mask[row, col])
+
+    def filter_detections(self, detections: List[Dict], anchor: str = 'bottom_center') -> List[Dict]:
+        """
+        Buang deteksi yang titik jangkarnya di luar poligon.
+        'bottom_center' cocok untuk kendaraan/orang (titik kontak dengan jalan).
+        """
+        if not detections:
+            return detections
+
+        boxes = np.array([d['bbox'] for d in detections], dtype=np.int32)
+        xs = (boxes[:, 0] + boxes[:, 2]) // 2
+        if anchor == 'center':
+            ys = (boxes[:, 1] + boxes[:, 3]) // 2
+        else:
+            ys = boxes[:, 3] - 1
+
+        xs = np.clip(xs, 0, self.width - 1)
+        ys = np.clip(ys, 0, self.height - 1)
+        inside = self.mask[ys, xs].astype(bool)
+
+        return [d for d, keep in zip(detections, inside) if keep]
+
+
+class ROIMaskCache:
+    """
+    Cache mask ROI per (kamera, resolusi) agar poligon tidak di-rasterisasi ulang setiap frame
+    """
+
+    def __init__(self):
+        self._masks: Dict[Tuple, ROIMask] = {}
+        self._lock = threading.Lock()
+
+    def get(self, cctv_id: str, polygon: Sequence[Sequence[float]], width: int, height: int) -> ROIMask:
+        # Poligon ikut menjadi key agar perubahan konfigurasi langsung berlaku
+        key = (cctv_id, width, height, tuple(tuple(p) for p in polygon))
+        mask = self._masks.get(key)
+        if mask is None:
+            with self._lock:
+                mask = self._masks.get(key)
+                if mask is None:
+                    mask = ROIMask(polygon, width, height)
+                    self._masks[key] = mask
+        return mask
+
+    def invalidate(self, cctv_id: str):
+        """Hapus semua mask untuk kamera tertentu"""
+        with self._lock:
+            for key in [k for k in self._masks if k[0] == cctv_id]:
+                del self._masks[key]
+
+    def bytes_by_camera(self) -> Dict[str, int]:
+        """Memori mask yang di-cache per kamera"""
+        usage: Dict[str, int] = {}
+        with self._lock:
+            for key, mask in self._masks.items():
+                usage[key[0]] = usage.get(key[0], 0) + mask.mask.nbytes
+        return usage
+
+    def stats(self) -> Dict:
+        return {
+            'cached_masks': len(self._masks),
+            'crop_ratio': {f"{k[0]}@{k[1]}x{k[2]}": round(m.crop_ratio, 3) for k, m in self._masks.items()}
+        }
@@ -0,0 +1,258 @@
+# screenshot_store.py
+# Penyimpanan screenshot berbasis hash konten: direktori ter-shard, tulis batch asinkron,
+# eviction berdasarkan umur/total ukuran (LRU) dan index per kamera
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class ScreenshotStore:
+    """
+    Menyimpan JPEG screenshot dengan nama hash konten (sha256) di direktori ter-shard,
+    misal: ab/cd/abcd1234....jpg. Frame identik (stream beku) hanya disimpan sekali.
+    """
+
+    INDEX_FILE = 'index.jsonl'
+
+    def __init__(self, root: str, config: Dict, logger: Optional[logging.Logger] = None):
+        self.root = root
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+
+        # Index in-memory: entri per kamera terurut waktu + metadata file per digest
+        self.entries: Dict[str, List] = {}  # cctv_id -> [(timestamp, digest)]
+        self.files: Dict[str, Dict] = {}    # digest -> {'size', 'last_access', 'refs'}
+        self.total_bytes = 0
+        self.evicted_files = 0
+        self.dropped_writes = 0
+        self._lock = threading.RLock()
+
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+        self._queue = queue.Queue(maxsize=config['queue_size'])
+        self._running = True
+        self._writer = threading.Thread(target=self._writer_loop, name='screenshot-writer', daemon=True)
+        self._writer.start()
+
+    def relative_path(self, digest: str) -> str:
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.config['shard_depth'])]
+        return os.path.join(*shards, f"{digest}.jpg")
+
+    def absolute_path(self, digest: str) -> str:
+        return os.path.join(self.root, self.relative_path(digest))
+
+    def put(self, jpeg_bytes: bytes, cctv_id: str, timestamp: Optional[float] = None) -> str:
+        """
+        Jadwalkan penyimpanan screenshot (non-blocking). Mengembalikan digest konten.
+        """
+        timestamp = timestamp or time.time()
+        digest = hashlib.sha256(jpeg_bytes).hexdigest()
+        try:
+            self._queue.put_nowait((digest, jpeg_bytes, cctv_id, timestamp))
+        except queue.Full:
+            self.dropped_writes += 1
+            self.logger.warning(f"⚠️ Screenshot queue full, dropping screenshot for {cctv_id}",
+                                extra={'cctv_id': cctv_id, 'throttle': True})
+        return digest
+
+    def get_path(self, digest: str) -> Optional[str]:
+        """Path absolute file screenshot (memperbarui waktu akses untuk LRU)"""
+        with self._lock:
+            info = self.files.get(digest)
+            if info is None:
+                return None
+            info['last_access'] = time.time()
+        return self.absolute_path(digest)
+
+    def query(self, cctv_id: Optional[str] = None, start: Optional[float] = None,
+              end: Optional[float] = None, limit: int = 100) -> List[Dict]:
+        """
+        Cari screenshot berdasarkan kamera dan rentang waktu (terbaru lebih dulu)
+        """
+        start = start if start is not None else 0.0
+        end = end if end is not None else float('inf')
+        results = []
+        with self._lock:
+            cameras = [cctv_id] if cctv_id else list(self.entries.keys())
+            for camera in cameras:
+                items = self.entries.get(camera, [])
+                lo = bisect.bisect_left(items, (start, ''))
+                hi = bisect.bisect_right(items, (end, '~'))  # '~' > semua karakter hex digest
+                for timestamp, digest in items[lo:hi]:
+                    results.append({
+                        'cctv_id': camera,
+                        'timestamp': timestamp,
+                        'digest': digest,
+                        'path': self.relative_path(digest),
+                        'size': self.files.get(digest, {}).get('size', 0),
+                    })
+        results.sort(key=lambda r: r['timestamp'], reverse=True)
+        return results[:limit]
+
+    def _writer_loop(self):
+        """Tulis screenshot secara batch di luar thread deteksi"""
+        last_eviction = time.time()
+        while self._running or not self._queue.empty():
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.config['flush_interval']))
+                while len(batch) < self.config['batch_size']:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    self.logger.error(f"Error writing screenshot batch: {e}")
+
+            if time.time() - last_eviction >= self.config['eviction_interval'] or self._over_budget():
+                try:
+                    self.evict()
+                except Exception as e:
+                    self.logger.error(f"Error evicting screenshots: {e}")
+                last_eviction = time.time()
+
+    def _write_batch(self, batch: List):
+        index_lines = []
+        for digest, jpeg_bytes, cctv_id, timestamp in batch:
+            with self._lock:
+                exists = digest in self.files
+            if not exists:
+                path = self.absolute_path(digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(jpeg_bytes)
+                os.replace(tmp_path, path)
+
+            self._add_entry(digest, cctv_id, timestamp, len(jpeg_bytes))
+            index_lines.append(json.dumps({
+                'op': 'add', 'digest': digest, 'cctv_id': cctv_id,
+                'timestamp': timestamp, 'size': len(jpeg_bytes)
+            }))
+
+        self._append_index(index_lines)
+
+    def _add_entry(self, digest: str, cctv_id: str, timestamp: float, size: int):
+        with self._lock:
+            info = self.files.get(digest)
+            if info is None:
+                info = self.files[digest] = {'size': size, 'last_access': timestamp, 'refs': 0}
+                self.total_bytes += size
+            info['refs'] += 1
+            info['last_access'] = max(info['last_access'], timestamp)
+            bisect.insort(self.entries.setdefault(cctv_id, []), (timestamp, digest))
+
+    def _over_budget(self) -> bool:
+        return self.total_bytes > self.config['max_total_mb'] * 1024 * 1024
+
+    def evict(self):
+        """
+        Hapus screenshot yang melewati umur maksimum, lalu file yang paling lama
+        tidak diakses (LRU) sampai total ukuran di bawah batas
+        """
+        removed = set()
+        cutoff = time.time() - self.config['max_age_days'] * 86400
+        with self._lock:
+            for cctv_id, items in self.entries.items():
+                split = bisect.bisect_left(items, (cutoff, ''))
+                for _, digest in items[:split]:
+                    info = self.files.get(digest)
+                    if info is not None:
+                        info['refs'] -= 1
+                        if info['refs'] <= 0:
+                            removed.add(digest)
+                del items[:split]
+
+            for digest in removed:
+                self.total_bytes -= self.files.pop(digest)['size']
+
+            if self._over_budget():
+                target = self.config['max_total_mb'] * 1024 * 1024
+                for digest, info in sorted(self.files.items(), key=lambda kv: kv[1]['last_access']):
+                    if self.total_bytes <= target:
+                        break
+                    self.total_bytes -= info['size']
+                    removed.add(digest)
+                for digest in removed:
+                    self.files.pop(digest, None)
+                for cctv_id in list(self.entries.keys()):
+                    self.entries[cctv_id] = [e for e in self.entries[cctv_id] if e[1] not in removed]
+
+            self.entries = {k: v for k, v in self.entries.items() if v}
+
+        if not removed:
+            return
+
+        for digest in removed:
+            try:
+                os.remove(self.absolute_path(digest))
+            except FileNotFoundError:
+                pass
+        self.evicted_files += len(removed)
+        self._compact_index()
+        self.logger.info(f"🧹 Evicted {len(removed)} screenshot(s), store size {self.total_bytes / 1048576:.1f} MB")
+
+    def _append_index(self, lines: List[str]):
+        if not lines:
+            return
+        with self._lock:
+            with open(os.path.join(self.root, self.INDEX_FILE), 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+
+    def _compact_index(self):
+        """Tulis ulang index hanya dengan entri yang masih ada"""
+        index_path = os.path.join(self.root, self.INDEX_FILE)
+        with self._lock:
+            lines = []
+            for cctv_id, items in self.entries.items():
+                for timestamp, digest in items:
+                    lines.append(json.dumps({
+                        'op': 'add', 'digest': digest, 'cctv_id': cctv_id,
+                        'timestamp': timestamp, 'size': self.files[digest]['size']
+                    }))
+            tmp_path = f"{index_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + ('\n' if lines else ''))
+            os.replace(tmp_path, index_path)
+
+    def _load_index(self):
+        index_path = os.path.join(self.root, self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Baris terakhir bisa terpotong jika proses mati saat menulis
+                if record.get('op') == 'add':
+                    self._add_entry(record['digest'], record['cctv_id'], record['timestamp'], record['size'])
+        self.logger.info(f"📁 Screenshot index loaded: {len(self.files)} file(s), {self.total_bytes / 1048576:.1f} MB")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'files': len(self.files),
+                'entries': sum(len(items) for items in self.entries.values()),
+                'total_mb': round(self.total_bytes / 1048576, 2),
+                'max_total_mb': self.config['max_total_mb'],
+                'queue_depth': self._queue.qsize(),
+                'evicted_files': self.evicted_files,
+                'dropped_writes': self.dropped_writes,
+            }
+
+    def close(self):
+        """Flush antrean tulis yang tersisa"""
+        self._running = False
+        self._writer.join(timeout=5)
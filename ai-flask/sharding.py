@@ -0,0 +1,195 @@
+# sharding.py
+# Sharding kamera antar node detector dengan consistent hashing dan coordinator yang bisa diganti
+
+import abc
+import bisect
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+
+class ConsistentHashRing:
+    """
+    Ring consistent hashing dengan virtual node: saat node bergabung/mati,
+    hanya kamera milik node tersebut yang berpindah
+    """
+
+    def __init__(self, nodes: List[str], virtual_nodes: int):
+        self.nodes = sorted(nodes)
+        self._ring = []
+        for node in self.nodes:
+            for i in range(virtual_nodes):
+                self._ring.append((self._hash(f"{node}#{i}"), node))
+        self._ring.sort()
+        self._keys = [h for h, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int(hashlib.md5(value.encode('utf-8')).hexdigest()[:16], 16)
+
+    def get_node(self, key: str) -> Optional[str]:
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+class Coordinator(abc.ABC):
+    """
+    Interface coordinator untuk membership dan heartbeat node.
+    Implementasi lain (etcd, Redis, Consul) cukup mengimplementasikan tiga method ini.
+    """
+
+    @abc.abstractmethod
+    def heartbeat(self, node_id: str, address: str):
+        ...
+
+    @abc.abstractmethod
+    def members(self, timeout: float) -> Dict[str, str]:
+        """Node yang heartbeat-nya masih dalam batas timeout: {node_id: address}"""
+
+    @abc.abstractmethod
+    def leave(self, node_id: str):
+        ...
+
+
+class SQLiteCoordinator(Coordinator):
+    """
+    Coordinator lokal berbasis SQLite (untuk testing / beberapa node di satu mesin)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS nodes ('
+                'node_id TEXT PRIMARY KEY, address TEXT NOT NULL, last_seen REAL NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def heartbeat(self, node_id: str, address: str):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO nodes (node_id, address, last_seen) VALUES (?, ?, ?) '
+                'ON CONFLICT(node_id) DO UPDATE SET address = excluded.address, last_seen = excluded.last_seen',
+                (node_id, address, time.time())
+            )
+
+    def members(self, timeout: float) -> Dict[str, str]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT node_id, address FROM nodes WHERE last_seen >= ?', (time.time() - timeout,)
+            ).fetchall()
+        return dict(rows)
+
+    def leave(self, node_id: str):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM nodes WHERE node_id = ?', (node_id,))
+
+
+def create_coordinator(config: Dict) -> Coordinator:
+    """Buat coordinator sesuai SHARDING_CONFIG['coordinator']"""
+    if config['coordinator'] == 'sqlite':
+        return SQLiteCoordinator(config['sqlite_path'])
+    raise ValueError(f"Unknown coordinator: {config['coordinator']}")
+
+
+class ShardManager:
+    """
+    Menjaga membership node dan menentukan kamera mana yang dimiliki node ini
+    """
+
+    def __init__(self, config: Dict, coordinator: Coordinator, camera_ids: Callable[[], List[str]],
+                 logger: Optional[logging.Logger] = None):
+        self.config = config
+        self.node_id = config['node_id']
+        self.address = config['advertise_url']
+        self.coordinator = coordinator
+        self.camera_ids = camera_ids
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.members: Dict[str, str] = {}
+        self.ring = ConsistentHashRing([self.node_id], config['virtual_nodes'])
+        self.owned: Set[str] = set()
+        self.rebalances = 0
+        self._listeners: List[Callable[[Set[str], Set[str]], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_listener(self, listener: Callable[[Set[str], Set[str]], None]):
+        """listener(gained, lost) dipanggil setiap kali kepemilikan kamera berubah"""
+        self._listeners.append(listener)
+
+    def start(self):
+        self.refresh()
+        self._thread = threading.Thread(target=self._heartbeat_loop, name='shard-heartbeat', daemon=True)
+        self._thread.start()
+        self.logger.info(f"🧩 Shard node {self.node_id} joined cluster ({self.address})")
+
+    def stop(self):
+        self._stop.set()
+        try:
+            self.coordinator.leave(self.node_id)
+        except Exception as e:
+            self.logger.error(f"Error leaving cluster: {e}")
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.config['heartbeat_interval']):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.error(f"Error in shard heartbeat: {e}")
+
+    def refresh(self):
+        """Kirim heartbeat, baca membership, dan rebalance jika ada node bergabung/mati"""
+        self.coordinator.heartbeat(self.node_id, self.address)
+        members = self.coordinator.members(self.config['node_timeout'])
+        members.setdefault(self.node_id, self.address)
+
+        with self._lock:
+            if set(members) != set(self.members):
+                self.logger.info(f"🧩 Cluster membership changed: {sorted(members)}")
+                self.ring = ConsistentHashRing(list(members), self.config['virtual_nodes'])
+            self.members = members
+        self.recompute()
+
+    def recompute(self):
+        """Hitung ulang kamera milik node ini (dipanggil juga saat registry di-reload)"""
+        with self._lock:
+            owned = {cid for cid in self.camera_ids() if self.ring.get_node(cid) == self.node_id}
+            gained = owned - self.owned
+            lost = self.owned - owned
+            self.owned = owned
+            if gained or lost:
+                self.rebalances += 1
+
+        if gained or lost:
+            self.logger.info(f"🧩 Rebalanced: +{len(gained)} -{len(lost)} cameras, owning {len(owned)}")
+            for listener in list(self._listeners):
+                try:
+                    listener(gained, lost)
+                except Exception as e:
+                    self.logger.error(f"Error in shard listener: {e}")
+
+    def owns(self, cctv_id: str) -> bool:
+        return self.ring.get_node(cctv_id) == self.node_id
+
+    def owner_address(self, cctv_id: str) -> Optional[str]:
+        node = self.ring.get_node(cctv_id)
+        return self.members.get(node) if node else None
+
+    def get_status(self) -> Dict:
+        return {
+            'node_id': self.node_id,
+            'address': self.address,
+            'members': self.members,
+            'owned_cameras': sorted(self.owned),
+            'rebalances': self.rebalances,
+        }
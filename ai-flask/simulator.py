@@ -0,0 +1,289 @@
+# simulator.py
+# Kamera virtual (sim://) untuk uji skala/soak tanpa RTSP asli, plus stub API insiden Laravel
+
+import glob
+import gzip
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+from cctv_config import SIMULATOR_CONFIG
+
+SIM_SCHEME = 'sim://'
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov')
+
+logger = logging.getLogger(__name__)
+
+
+def parse_sim_url(url: str) -> Dict:
+    """
+    sim://<nama>?fps=15&width=1280&height=720&jitter=0.1&stall_prob=0.001&stall_seconds=8
+    &disconnect_prob=0.0005&open_fail_prob=0.02&source=videos/street.mp4&seed=7
+    Parameter yang tidak diisi memakai SIMULATOR_CONFIG['defaults'].
+    """
+    parsed = urlparse(url)
+    params = dict(SIMULATOR_CONFIG['defaults'])
+    for key, values in parse_qs(parsed.query).items():
+        default = params.get(key)
+        value = values[-1]
+        params[key] = type(default)(value) if isinstance(default, (int, float)) else value
+    params['name'] = parsed.netloc or parsed.path.strip('/')
+    return params
+
+
+class SimulatedCapture:
+    """
+    Pengganti cv2.VideoCapture dengan antarmuka yang dipakai detector
+    (isOpened, read, release). Frame berasal dari file video (diulang) atau
+    dibangkitkan secara sintetis; fps, jitter, stall dan disconnect bisa diatur.
+    """
+
+    def __init__(self, params: Dict):
+        self.params = params
+        self.width = int(params['width'])
+        self.height = int(params['height'])
+        self.fps = float(params['fps'])
+        self.random = random.Random(params.get('seed') or params['name'])
+        self.opened = True
+        self.disconnected = False
+        self.frames_served = 0
+        self._next_frame_at = time.time()
+        self._video = None
+        self._video_path = params.get('source') or None
+
+        if self._video_path:
+            self._video = cv2.VideoCapture(self._video_path)
+            if not self._video.isOpened():
+                logger.warning(f"⚠️ Simulator source not readable: {self._video_path}, using synthetic frames")
+                self._video = None
+
+        if self._video is None:
+            self._background = self._make_background()
+            self._objects = [
+                [self.random.uniform(0, self.width), self.random.uniform(self.height * 0.3, self.height * 0.9),
+                 self.random.uniform(-8, 8), self.random.uniform(-2, 2),
+                 tuple(self.random.randint(40, 255) for _ in range(3))]
+                for _ in range(int(params['objects']))
+            ]
+
+    def _make_background(self) -> np.ndarray:
+        # Gradien jalan sederhana: dihitung sekali, tiap frame hanya di-copy lalu objek digambar
+        column = np.linspace(40, 140, self.height, dtype=np.uint8)
+        background = np.repeat(column[:, np.newaxis], self.width, axis=1)
+        return cv2.cvtColor(background, cv2.COLOR_GRAY2BGR)
+
+    def isOpened(self) -> bool:
+        return self.opened
+
+    def release(self):
+        self.opened = False
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+
+    def get(self, prop_id: int) -> float:
+        return {
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_FRAME_WIDTH: float(self.width),
+            cv2.CAP_PROP_FRAME_HEIGHT: float(self.height),
+        }.get(prop_id, 0.0)
+
+    def read(self):
+        if not self.opened or self.disconnected:
+            return False, None
+
+        # Stall: stream diam selama stall_seconds lalu read gagal (seperti read timeout FFMPEG)
+        if self.random.random() < self.params['stall_prob']:
+            time.sleep(self.params['stall_seconds'])
+            return False, None
+        if self.random.random() < self.params['disconnect_prob']:
+            self.disconnected = True
+            return False, None
+
+        # Pacing sesuai fps dengan jitter relatif
+        interval = 1.0 / self.fps
+        self._next_frame_at += interval * (1 + self.random.uniform(-1, 1) * self.params['jitter'])
+        delay = self._next_frame_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -interval * 10:
+            self._next_frame_at = time.time()  # Pembaca tertinggal jauh: jangan kejar frame lama
+
+        frame = self._next_video_frame() if self._video is not None else self._next_synthetic_frame()
+        self.frames_served += 1
+        return True, frame
+
+    def _next_video_frame(self) -> np.ndarray:
+        ok, frame = self._video.read()
+        if not ok:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._video.read()
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        return frame
+
+    def _next_synthetic_frame(self) -> np.ndarray:
+        frame = self._background.copy()
+        box_w, box_h = self.width // 12, self.height // 10
+        for obj in self._objects:
+            obj[0] = (obj[0] + obj[2]) % self.width
+            obj[1] = min(max(obj[1] + obj[3], self.height * 0.3), self.height - box_h)
+            x, y = int(obj[0]), int(obj[1])
+            cv2.rectangle(frame, (x, y), (x + box_w, y + box_h), obj[4], -1)
+        cv2.putText(frame, f"{self.params['name']} #{self.frames_served}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        return frame
+
+
+def open_simulated(url: str) -> Optional[SimulatedCapture]:
+    """Dipanggil CameraOpener untuk URL sim://; None mensimulasikan gagal koneksi"""
+    params = parse_sim_url(url)
+    if random.random() < params['open_fail_prob']:
+        time.sleep(min(params['connect_delay'] * 5, 5))
+        return None
+    time.sleep(params['connect_delay'])
+    return SimulatedCapture(params)
+
+
+def build_fleet(count: int, prefix: str = 'SIM', **overrides) -> Dict[str, Dict]:
+    """
+    Konfigurasi N kamera virtual (format sama dengan registry). Jika video_dir berisi
+    file video, kamera dibagi rata ke file-file tersebut; selain itu frame sintetis.
+    """
+    videos = sorted(
+        path for path in glob.glob(os.path.join(SIMULATOR_CONFIG['video_dir'], '*'))
+        if path.lower().endswith(VIDEO_EXTENSIONS)
+    )
+    areas = SIMULATOR_CONFIG['areas']
+    cameras = {}
+    for i in range(count):
+        cctv_id = f"{prefix}-{i + 1:04d}"
+        params = dict(overrides)
+        if videos and 'source' not in params:
+            params['source'] = videos[i % len(videos)]
+        query = '&'.join(f"{key}={value}" for key, value in params.items())
+        cameras[cctv_id] = {
+            'name': f"Simulated Camera {i + 1}",
+            'url': f"{SIM_SCHEME}{cctv_id}" + (f"?{query}" if query else ''),
+            'location': {'lat': -7.57 + (i % 20) * 0.002, 'lng': 110.80 + (i // 20) * 0.002},
+            'status': 'active',
+            'priority': 'high' if i % 5 == 0 else 'medium',
+            'area': areas[i % len(areas)],
+        }
+    return cameras
+
+
+def register_fleet(cctv_config, count: int, **overrides) -> List[str]:
+    """Daftarkan kamera virtual ke registry (runtime, tidak ditulis ke file sumber)"""
+    cameras = build_fleet(count, **overrides)
+    cctv_config.registry.register(cameras)
+    return list(cameras)
+
+
+class LaravelStub:
+    """
+    Stub lokal untuk POST /api/incidents dan /api/incidents/batch (gzip).
+    Mencatat setiap insiden yang diterima beserta latensi dari detected_at.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 failure_rate: float = 0.0, response_delay: float = 0.0):
+        self.failure_rate = failure_rate
+        self.response_delay = response_delay
+        self.received: List[Dict] = []
+        self.requests = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                status, payload = stub._handle(self.path, json.loads(body or b'{}'))
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _accept(self, incident: Dict) -> int:
+        if random.random() < self.failure_rate:
+            with self._lock:
+                self.rejected += 1
+            return 500
+        received_at = time.time()
+        try:
+            latency = received_at - datetime.fromisoformat(incident['detected_at']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            latency = None
+        with self._lock:
+            self.received.append({
+                'cctv_id': incident.get('cctv_id'),
+                'type': incident.get('type'),
+                'received_at': received_at,
+                'latency': latency,
+            })
+        return 201
+
+    def _handle(self, path: str, payload: Dict):
+        with self._lock:
+            self.requests += 1
+        if self.response_delay:
+            time.sleep(self.response_delay)
+
+        if path.rstrip('/').endswith('/incidents/batch'):
+            results = [{'index': i, 'status': self._accept(item)} for i, item in enumerate(payload.get('incidents', []))]
+            return 207, {'results': results}
+        if path.rstrip('/').endswith('/incidents'):
+            status = self._accept(payload)
+            return status, {'message': 'ok' if status == 201 else 'error'}
+        return 404, {'message': 'not found'}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='laravel-stub', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self, since: float = 0.0) -> Dict:
+        with self._lock:
+            received = [r for r in self.received if r['received_at'] >= since]
+            rejected = self.rejected
+        latencies = [r['latency'] for r in received if r['latency'] is not None]
+        return {
+            'received': len(received),
+            'rejected': rejected,
+            'requests': self.requests,
+            'latency_ms_p50': round(float(np.percentile(latencies, 50)) * 1000, 1) if latencies else None,
+            'latency_ms_p95': round(float(np.percentile(latencies, 95)) * 1000, 1) if latencies else None,
+        }
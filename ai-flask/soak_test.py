@@ -0,0 +1,164 @@
+# soak_test.py
+# Soak test bertahap dengan kamera virtual: throughput, latency, pertumbuhan memori dan
+# insiden yang hilang untuk setiap jumlah kamera, untuk menemukan titik jenuh (knee)
+#
+# Penggunaan:
+#   python soak_test.py --steps 10,25,50,100,200 --step-seconds 300
+#   python soak_test.py --steps 5,10 --step-seconds 60 --fps 10 --width 640 --height 360
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from cctv_config import LARAVEL_API_CONFIG, SIMULATOR_CONFIG
+from memory_monitor import current_rss_bytes
+from simulator import LaravelStub, register_fleet
+
+# Step dianggap melewati knee jika fps per kamera turun di bawah fraksi ini dari step pertama
+# (loop deteksi punya jeda sendiri, jadi fps sumber bukan patokan yang adil)
+KNEE_FPS_RATIO = 0.8
+
+
+def _frames_read(detector, camera_ids: List[str]) -> int:
+    cameras = detector.stream_supervisor.get_health()['cameras']
+    return sum(cameras.get(cctv_id, {}).get('frames_read', 0) for cctv_id in camera_ids)
+
+
+def run_step(detector, stub: LaravelStub, count: int, args) -> Dict:
+    overrides = {'fps': args.fps, 'width': args.width, 'height': args.height}
+    camera_ids = register_fleet(detector.cctv_config, count, **overrides)
+
+    print(f"\n▶️  Step: {count} cameras ({args.step_seconds}s, warm-up {args.warmup}s)")
+    for cctv_id in camera_ids:
+        detector.start_detection(cctv_id)
+    time.sleep(args.warmup)
+
+    detector.stage_timings.reset()
+    detector.stage_timings.set_enabled(True)
+    started = time.time()
+    frames_before = _frames_read(detector, camera_ids)
+    raised_before = detector.incident_stats['raised']
+    rss_before = current_rss_bytes()
+    rss_peak = rss_before
+
+    while time.time() - started < args.step_seconds:
+        time.sleep(min(5, args.step_seconds))
+        rss_peak = max(rss_peak, current_rss_bytes())
+
+    elapsed = time.time() - started
+    frames = _frames_read(detector, camera_ids) - frames_before
+    raised = detector.incident_stats['raised'] - raised_before
+    timings = detector.stage_timings.get_stats()['cameras']
+    detector.stage_timings.set_enabled(False)
+    health = detector.stream_supervisor.get_health()['summary']
+
+    for cctv_id in camera_ids:
+        detector.stop_detection(cctv_id)
+
+    # Beri waktu batcher / retry mengirim sisa insiden sebelum menghitung yang hilang
+    time.sleep(args.drain_seconds)
+    delivered = stub.stats(since=started)
+
+    detect_counts = [stages['detect']['count'] for stages in timings.values() if 'detect' in stages]
+    detect_avg = [stages['detect']['avg_ms'] for stages in timings.values() if 'detect' in stages]
+    fps_per_camera = frames / elapsed / count if count else 0.0
+
+    return {
+        'cameras': count,
+        'seconds': round(elapsed, 1),
+        'frames_read': frames,
+        'fps_total': round(frames / elapsed, 1),
+        'fps_per_camera': round(fps_per_camera, 2),
+        'fps_target': args.fps,
+        'inferences_per_second': round(sum(detect_counts) / elapsed, 2),
+        'detect_ms_avg': round(sum(detect_avg) / len(detect_avg), 1) if detect_avg else None,
+        'incidents_raised': raised,
+        'incidents_received': delivered['received'],
+        'incidents_dropped': max(raised - delivered['received'], 0),
+        'incident_latency_ms_p50': delivered['latency_ms_p50'],
+        'incident_latency_ms_p95': delivered['latency_ms_p95'],
+        'rss_start_mb': round(rss_before / 1e6, 1),
+        'rss_peak_mb': round(rss_peak / 1e6, 1),
+        'rss_growth_mb': round((current_rss_bytes() - rss_before) / 1e6, 1),
+        'stream_states': health,
+    }
+
+
+def find_knee(steps: List[Dict]) -> Dict:
+    """Step pertama di mana fps per kamera jatuh di bawah KNEE_FPS_RATIO dari step terkecil"""
+    if not steps:
+        return {}
+    baseline = steps[0]['fps_per_camera']
+    for step in steps[1:]:
+        if step['fps_per_camera'] < baseline * KNEE_FPS_RATIO:
+            return {'cameras': step['cameras'], 'fps_per_camera': step['fps_per_camera'],
+                    'baseline_fps_per_camera': baseline}
+    return {}
+
+
+def print_step(step: Dict):
+    print(f"  📈 {step['fps_total']} fps total ({step['fps_per_camera']}/camera of {step['fps_target']}), "
+          f"{step['inferences_per_second']} inferences/s, detect {step['detect_ms_avg']} ms")
+    print(f"  🚨 incidents {step['incidents_raised']} raised / {step['incidents_received']} received "
+          f"({step['incidents_dropped']} dropped), p95 latency {step['incident_latency_ms_p95']} ms")
+    print(f"  💾 RSS {step['rss_start_mb']} → peak {step['rss_peak_mb']} MB ({step['rss_growth_mb']:+} MB)")
+
+
+def main():
+    defaults = SIMULATOR_CONFIG['defaults']
+    parser = argparse.ArgumentParser(description='Soak test the detector with virtual cameras')
+    parser.add_argument('--steps', default='10,25,50,100', help='Comma separated camera counts')
+    parser.add_argument('--step-seconds', type=float, default=300)
+    parser.add_argument('--warmup', type=float, default=30)
+    parser.add_argument('--drain-seconds', type=float, default=15)
+    parser.add_argument('--fps', type=float, default=defaults['fps'])
+    parser.add_argument('--width', type=int, default=defaults['width'])
+    parser.add_argument('--height', type=int, default=defaults['height'])
+    parser.add_argument('--stub-failure-rate', type=float, default=0.0,
+                        help='Fraction of incidents the Laravel stub rejects with 500')
+    parser.add_argument('--stub-delay', type=float, default=0.0, help='Laravel stub response delay (s)')
+    parser.add_argument('--output', default=SIMULATOR_CONFIG['soak_report_path'])
+    args = parser.parse_args()
+
+    # Stub harus jalan sebelum detector dibuat agar pengiriman insiden diarahkan ke sini
+    stub = LaravelStub(failure_rate=args.stub_failure_rate, response_delay=args.stub_delay)
+    stub.start()
+    LARAVEL_API_CONFIG['base_url'] = stub.base_url
+
+    from yolo_detect import get_detector
+    detector = get_detector()
+
+    steps = []
+    try:
+        for count in [int(c) for c in args.steps.split(',') if c.strip()]:
+            step = run_step(detector, stub, count, args)
+            print_step(step)
+            steps.append(step)
+    except KeyboardInterrupt:
+        print("\n⏹️  Soak test interrupted, writing partial report")
+    finally:
+        detector.cleanup()
+        stub.stop()
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'model_precision': detector.model_precision,
+        'settings': {k: v for k, v in vars(args).items() if k != 'output'},
+        'steps': steps,
+        'knee': find_knee(steps),
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    knee = report['knee']
+    if knee:
+        print(f"\n📉 Knee at {knee['cameras']} cameras ({knee['fps_per_camera']} fps/camera)")
+    else:
+        print("\n✅ No knee found within tested camera counts")
+    print(f"📝 Report saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# spatial.py
+# Index spasial lokasi kamera (grid) untuk query kamera terdekat, dan fusi insiden
+# dari kamera yang berdekatan agar satu kejadian tidak dilaporkan berkali-kali
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Jarak great-circle dalam meter"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def camera_location(camera: Dict) -> Optional[Tuple[float, float]]:
+    location = camera.get('location') or {}
+    try:
+        return float(location['lat']), float(location['lng'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class SpatialGrid:
+    """
+    Grid seragam berukuran cell_meters di atas lat/lng. Query radius hanya memeriksa
+    sel yang bersinggungan dengan lingkaran, lalu jarak pasti dihitung dengan haversine.
+    Ukuran sel bujur dihitung dari lintang rata-rata kamera (cukup akurat untuk satu kota).
+    """
+
+    def __init__(self, points: Dict[str, Tuple[float, float]], cell_meters: float):
+        self.points = points
+        self.cell_meters = cell_meters
+        mean_lat = sum(lat for lat, _ in points.values()) / len(points) if points else 0.0
+        self.cell_lat = cell_meters / METERS_PER_DEGREE_LAT
+        self.cell_lng = cell_meters / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(mean_lat)), 0.01))
+
+        self.cells: Dict[Tuple[int, int], List[str]] = {}
+        for key, (lat, lng) in points.items():
+            self.cells.setdefault(self._cell(lat, lng), []).append(key)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_lat)), int(math.floor(lng / self.cell_lng))
+
+    def nearby(self, lat: float, lng: float, radius_m: float) -> List[Tuple[str, float]]:
+        """(id, jarak meter) dalam radius, terdekat lebih dulu"""
+        row, col = self._cell(lat, lng)
+        # Lingkaran radius r menyentuh paling jauh ceil(r / sel) sel ke tiap arah
+        span_rows = int(math.ceil(radius_m / self.cell_meters))
+        span_cols = int(math.ceil(radius_m / (self.cell_lng * METERS_PER_DEGREE_LAT
+                                              * max(math.cos(math.radians(lat)), 0.01))))
+        results = []
+        for r in range(row - span_rows, row + span_rows + 1):
+            for c in range(col - span_cols, col + span_cols + 1):
+                for key in self.cells.get((r, c), ()):
+                    distance = haversine_m(lat, lng, *self.points[key])
+                    if distance <= radius_m:
+                        results.append((key, distance))
+        results.sort(key=lambda item: item[1])
+        return results
+
+
+class IncidentFuser:
+    """
+    Insiden bertipe sama dari kamera lain dalam radius_meters dan window_seconds dianggap
+    kejadian yang sama: insiden pertama tetap dikirim, berikutnya digabung ke grup
+    insiden pertama (tidak di-upload). Insiden berulang dari kamera yang sama tidak
+    digabung; itu sudah dibatasi rate limit per kamera.
+
+    neighbors(cctv_id, radius_m) -> {cctv_id: jarak meter}
+    """
+
+    def __init__(self, config: Dict, neighbors: Callable[[str, float], Dict[str, float]],
+                 logger: Optional[logging.Logger] = None):
+        self.config = config
+        self.neighbors = neighbors
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._groups: Dict[str, deque] = {}  # incident_type -> deque grup terbaru (urut waktu)
+        self._lock = threading.Lock()
+        self.primary_total = 0
+        self.fused_total = 0
+
+    def fuse(self, cctv_id: str, incident_type: str, confidence: float,
+             ts: Optional[float] = None) -> Optional[Dict]:
+        """
+        None jika insiden ini harus dikirim (menjadi primary grup baru), atau grup yang
+        menyerapnya jika merupakan duplikat dari kamera tetangga.
+        """
+        types = self.config['types']
+        if types is not None and incident_type not in types:
+            return None
+
+        ts = time.time() if ts is None else ts
+        window = self.config['window_seconds']
+        neighbors = self.neighbors(cctv_id, self.config['radius_meters'])
+
+        with self._lock:
+            groups = self._groups.setdefault(incident_type, deque())
+            while groups and ts - groups[0]['started'] > window:
+                groups.popleft()
+
+            for group in reversed(groups):
+                primary = group['primary']
+                if primary == cctv_id or primary not in neighbors:
+                    continue
+                group['cameras'][cctv_id] = max(group['cameras'].get(cctv_id, 0.0), confidence)
+                group['last_seen'] = ts
+                group['fused'] += 1
+                self.fused_total += 1
+                self.logger.info(
+                    f"🔗 Fused {incident_type} at {cctv_id} into incident from {primary} "
+                    f"({neighbors[primary]:.0f} m apart)",
+                    extra={'cctv_id': cctv_id, 'incident_type': incident_type, 'fused_into': primary}
+                )
+                return dict(group, cameras=dict(group['cameras']))
+
+            groups.append({
+                'type': incident_type,
+                'primary': cctv_id,
+                'started': ts,
+                'last_seen': ts,
+                'cameras': {cctv_id: confidence},
+                'fused': 0,
+            })
+            # Batasi grup aktif per tipe (kejadian serentak di banyak lokasi)
+            while len(groups) > self.config['max_groups_per_type']:
+                groups.popleft()
+            self.primary_total += 1
+        return None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            active = [
+                dict(group, cameras=dict(group['cameras']))
+                for groups in self._groups.values() for group in groups if group['fused']
+            ]
+        return {
+            'radius_meters': self.config['radius_meters'],
+            'window_seconds': self.config['window_seconds'],
+            'primary_incidents': self.primary_total,
+            'fused_incidents': self.fused_total,
+            'active_fused_groups': active,
+        }
@@ -0,0 +1,253 @@
+# stream_supervisor.py
+# Supervisor stream kamera: reconnect dengan exponential backoff + jitter dan circuit breaker
+
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# State kesehatan stream per kamera
+STATE_CONNECTING = 'connecting'      # Stream sedang dibuka (start masih pending)
+STATE_OPEN_FAILED = 'open_failed'    # Percobaan buka terakhir gagal
+STATE_HEALTHY = 'healthy'
+STATE_DEGRADED = 'degraded'          # Ada kegagalan baca, belum reconnect
+STATE_RECONNECTING = 'reconnecting'  # Sedang menunggu backoff / membuka ulang stream
+STATE_CIRCUIT_OPEN = 'circuit_open'  # Terlalu sering gagal, kamera di-evict sampai cooldown selesai
+STATE_STOPPED = 'stopped'
+
+# Aksi hasil plan_read_failure / plan_reconnect (mode non-blocking)
+ACTION_RETRY = 'retry'          # Coba baca lagi setelah jeda
+ACTION_RECONNECT = 'reconnect'  # Buka ulang stream setelah jeda backoff
+ACTION_EVICT = 'evict'          # Circuit open, hentikan kamera
+
+
+class StreamState:
+    """
+    Status kesehatan satu stream kamera
+    """
+
+    def __init__(self, cctv_id: str):
+        self.cctv_id = cctv_id
+        self.state = STATE_CONNECTING
+        self.consecutive_failures = 0
+        self.reconnect_attempts = 0
+        self.reconnects_total = 0
+        self.frames_read = 0
+        self.last_frame_time: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.circuit_opened_at: Optional[float] = None
+        self.state_since = time.time()
+        self.stop_event = threading.Event()
+
+    def to_dict(self) -> Dict:
+        return {
+            'state': self.state,
+            'state_since': self.state_since,
+            'consecutive_failures': self.consecutive_failures,
+            'reconnect_attempts': self.reconnect_attempts,
+            'reconnects_total': self.reconnects_total,
+            'frames_read': self.frames_read,
+            'last_frame_time': self.last_frame_time,
+            'last_error': self.last_error,
+            'circuit_opened_at': self.circuit_opened_at,
+        }
+
+
+class StreamSupervisor:
+    """
+    Mengawasi stream kamera: membuka ulang stream yang putus dengan backoff,
+    membuka circuit setelah kegagalan berulang, dan melaporkan kesehatan per kamera
+    """
+
+    def __init__(self, config: Dict, open_capture: Callable[[str], Optional[object]],
+                 logger: Optional[logging.Logger] = None):
+        self.config = config
+        self.open_capture = open_capture
+        self.logger = logger or logging.getLogger(__name__)
+        self.streams: Dict[str, StreamState] = {}
+        self._lock = threading.Lock()
+
+    def _get_state(self, cctv_id: str) -> StreamState:
+        with self._lock:
+            stream = self.streams.get(cctv_id)
+            if stream is None:
+                stream = self.streams[cctv_id] = StreamState(cctv_id)
+            return stream
+
+    def _transition(self, stream: StreamState, new_state: str, message: Optional[str] = None):
+        """Ubah state dan log hanya saat terjadi transisi (menghindari log spam)"""
+        if stream.state == new_state:
+            return
+        stream.state = new_state
+        stream.state_since = time.time()
+        if message:
+            if new_state in (STATE_HEALTHY, STATE_STOPPED):
+                self.logger.info(message)
+            else:
+                self.logger.warning(message)
+
+    def allow_start(self, cctv_id: str) -> bool:
+        """
+        Cek circuit breaker. Setelah cooldown, satu percobaan (half-open) diizinkan.
+        """
+        stream = self.streams.get(cctv_id)
+        if stream is None or stream.state != STATE_CIRCUIT_OPEN:
+            return True
+        return time.time() - stream.circuit_opened_at >= self.config['circuit_cooldown']
+
+    def is_circuit_open(self, cctv_id: str) -> bool:
+        stream = self.streams.get(cctv_id)
+        return stream is not None and stream.state == STATE_CIRCUIT_OPEN
+
+    def on_connecting(self, cctv_id: str):
+        """Dipanggil saat pembukaan stream dijadwalkan"""
+        stream = self._get_state(cctv_id)
+        stream.stop_event.clear()
+        if stream.state != STATE_CIRCUIT_OPEN:
+            self._transition(stream, STATE_CONNECTING)
+
+    def on_started(self, cctv_id: str):
+        """Dipanggil saat stream berhasil dibuka"""
+        stream = self._get_state(cctv_id)
+        stream.stop_event.clear()
+        stream.consecutive_failures = 0
+        stream.reconnect_attempts = 0
+        stream.circuit_opened_at = None
+        self._transition(stream, STATE_HEALTHY, f"✅ Stream {cctv_id} healthy")
+
+    def on_open_failed(self, cctv_id: str, error: str):
+        """Kegagalan membuka stream dihitung ke circuit breaker"""
+        stream = self._get_state(cctv_id)
+        stream.last_error = error
+        stream.reconnect_attempts += 1
+        if stream.state == STATE_CIRCUIT_OPEN or stream.reconnect_attempts >= self.config['max_reconnect_attempts']:
+            self._open_circuit(stream)
+        else:
+            self._transition(stream, STATE_OPEN_FAILED, f"❌ Cannot open camera {cctv_id}: {error}")
+
+    def on_frame(self, cctv_id: str):
+        """Dipanggil untuk setiap frame yang berhasil dibaca"""
+        stream = self._get_state(cctv_id)
+        stream.frames_read += 1
+        stream.last_frame_time = time.time()
+        if stream.consecutive_failures:
+            stream.consecutive_failures = 0
+            stream.reconnect_attempts = 0
+            self._transition(stream, STATE_HEALTHY, f"✅ Stream {cctv_id} recovered")
+
+    def on_read_failure(self, cctv_id: str, cap) -> Optional[object]:
+        """
+        Tangani kegagalan cap.read(). Mengembalikan capture yang bisa dipakai
+        (capture lama atau hasil reconnect), atau None jika stream harus di-evict.
+        """
+        stream = self._get_state(cctv_id)
+        action, delay = self.plan_read_failure(cctv_id)
+        if action == ACTION_RETRY:
+            return None if stream.stop_event.wait(delay) else cap
+
+        # Stream dianggap putus: lepas capture lama lalu buka ulang dengan backoff
+        if cap is not None:
+            cap.release()
+        while action == ACTION_RECONNECT:
+            if stream.stop_event.wait(delay):
+                return None
+            cap = self.open_capture(cctv_id)
+            if cap is not None:
+                self.on_reconnected(cctv_id)
+                return cap
+            stream.last_error = 'reopen failed'
+            action, delay = self.plan_reconnect(cctv_id)
+        return None
+
+    def plan_read_failure(self, cctv_id: str) -> Tuple[str, float]:
+        """
+        Versi non-blocking on_read_failure (untuk core asyncio): catat kegagalan dan
+        kembalikan (aksi, jeda) — retry baca, reconnect setelah jeda, atau evict
+        """
+        stream = self._get_state(cctv_id)
+        stream.consecutive_failures += 1
+        stream.last_error = 'read failed'
+
+        if stream.consecutive_failures < self.config['read_failure_threshold']:
+            self._transition(stream, STATE_DEGRADED, f"⚠️ Cannot read frame from {cctv_id}")
+            return ACTION_RETRY, self.config['read_retry_delay']
+
+        self._transition(stream, STATE_RECONNECTING, f"🔌 Stream {cctv_id} lost, reconnecting with backoff")
+        return self.plan_reconnect(cctv_id)
+
+    def plan_reconnect(self, cctv_id: str) -> Tuple[str, float]:
+        """Jadwal percobaan reconnect berikutnya, atau evict (circuit open) jika sudah habis"""
+        stream = self._get_state(cctv_id)
+        if stream.reconnect_attempts >= self.config['max_reconnect_attempts']:
+            self._open_circuit(stream)
+            return ACTION_EVICT, 0.0
+        delay = self._backoff_delay(stream.reconnect_attempts)
+        stream.reconnect_attempts += 1
+        return ACTION_RECONNECT, delay
+
+    def on_reconnected(self, cctv_id: str):
+        stream = self._get_state(cctv_id)
+        stream.reconnects_total += 1
+        stream.consecutive_failures = 0
+        self._transition(
+            stream, STATE_HEALTHY,
+            f"✅ Stream {cctv_id} reconnected after {stream.reconnect_attempts} attempt(s)"
+        )
+        stream.reconnect_attempts = 0
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff dengan jitter agar reconnect kamera tidak serempak"""
+        base = min(self.config['reconnect_base_delay'] * (2 ** attempt), self.config['reconnect_max_delay'])
+        jitter = self.config['reconnect_jitter']
+        return base * random.uniform(1 - jitter, 1 + jitter)
+
+    def _open_circuit(self, stream: StreamState):
+        stream.circuit_opened_at = time.time()
+        self._transition(
+            stream, STATE_CIRCUIT_OPEN,
+            f"⛔ Circuit open for {stream.cctv_id}: evicted for {self.config['circuit_cooldown']}s"
+        )
+
+    def stop(self, cctv_id: str):
+        """Batalkan backoff yang sedang berjalan dan tandai stream berhenti"""
+        stream = self.streams.get(cctv_id)
+        if stream is None:
+            return
+        stream.stop_event.set()
+        if stream.state != STATE_CIRCUIT_OPEN:
+            self._transition(stream, STATE_STOPPED)
+
+    def prune(self, keep) -> int:
+        """
+        Buang state stream yang sudah berhenti (atau circuit-nya sudah lewat cooldown)
+        untuk kamera yang tidak ada di `keep`
+        """
+        now = time.time()
+        with self._lock:
+            stale = [
+                cctv_id for cctv_id, stream in self.streams.items()
+                if cctv_id not in keep and (
+                    stream.state == STATE_STOPPED
+                    or (stream.state == STATE_CIRCUIT_OPEN
+                        and now - stream.circuit_opened_at >= self.config['circuit_cooldown'])
+                )
+            ]
+            for cctv_id in stale:
+                del self.streams[cctv_id]
+        return len(stale)
+
+    def get_state(self, cctv_id: str) -> Optional[Dict]:
+        stream = self.streams.get(cctv_id)
+        return stream.to_dict() if stream else None
+
+    def get_health(self) -> Dict:
+        with self._lock:
+            streams = dict(self.streams)
+        summary = {}
+        for stream in streams.values():
+            summary[stream.state] = summary.get(stream.state, 0) + 1
+        return {
+            'summary': summary,
+            'cameras': {cctv_id: stream.to_dict() for cctv_id, stream in streams.items()}
+        }
@@ -0,0 +1,5 @@
+# Modul ai-flask memakai import datar (from tracker import ...), jadi direktori induk masuk sys.path
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
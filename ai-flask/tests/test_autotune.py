@@ -0,0 +1,29 @@
+import json
+import os
+
+from autotune import load_tuning
+
+BEST = {'torch_threads': 2, 'opencv_threads': 1, 'infer_workers': 2, 'batch_size': 1}
+
+
+def write_report(tmp_path, content):
+    path = tmp_path / 'autotune.json'
+    path.write_text(content, encoding='utf-8')
+    return {'output_path': str(path)}
+
+
+def test_valid_report_is_loaded(tmp_path):
+    config = write_report(tmp_path, json.dumps({'cpu_count': os.cpu_count(), 'best': BEST}))
+    assert load_tuning(config) == BEST
+
+
+def test_corrupt_or_incomplete_report_is_ignored(tmp_path):
+    assert load_tuning(write_report(tmp_path, '{"cpu_count": ')) is None
+    assert load_tuning(write_report(tmp_path, json.dumps({'best': BEST}))) is None
+    assert load_tuning(write_report(tmp_path, json.dumps(
+        {'cpu_count': os.cpu_count(), 'best': {'torch_threads': 2}}))) is None
+
+
+def test_report_from_other_machine_is_ignored(tmp_path):
+    config = write_report(tmp_path, json.dumps({'cpu_count': (os.cpu_count() or 1) + 1, 'best': BEST}))
+    assert load_tuning(config) is None
@@ -0,0 +1,62 @@
+import numpy as np
+
+from cascade import ModelCascade
+
+CONFIG = {
+    'screener_confidence': 0.35,
+    'confirmer_confidence': 0.6,
+    'escalate_classes': ['car', 'fire'],
+    'escalate_always_classes': ['fire'],
+    'escalate_min_iou': 0.05,
+    'confirm_on': 'crop',
+    'crop_padding': 0.15,
+}
+
+
+def fake_predict(outputs):
+    """predict(model, frame, threshold) yang mengembalikan output tetap per model"""
+    def predict(model, frame, threshold):
+        return [dict(d) for d in outputs[model] if d['confidence'] >= threshold]
+    return predict
+
+
+def make_cascade(screener_out, confirmer_out):
+    return ModelCascade('screener', 'confirmer', CONFIG,
+                        fake_predict({'screener': screener_out, 'confirmer': confirmer_out}))
+
+
+FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def test_screener_boxes_are_never_incident_candidates():
+    cascade = make_cascade(
+        [{'class': 'fire', 'confidence': 0.4, 'bbox': [10, 10, 50, 50]}],
+        [],  # Confirmer menolak
+    )
+    detections = cascade.run(FRAME)
+    assert len(detections) == 1 and detections[0]['unconfirmed']
+    assert ModelCascade.incident_candidates(detections) == []
+    assert cascade.get_stats()['frames_escalated'] == 1
+    assert cascade.get_stats()['frames_confirmed'] == 0
+
+
+def test_confirmed_boxes_are_candidates_in_frame_coords():
+    cascade = make_cascade(
+        [{'class': 'fire', 'confidence': 0.4, 'bbox': [100, 100, 200, 200]}],
+        [{'class': 'fire', 'confidence': 0.9, 'bbox': [5, 5, 20, 20]}],
+    )
+    candidates = ModelCascade.incident_candidates(cascade.run(FRAME))
+    assert [d['stage'] for d in candidates] == ['confirmer']
+    # Crop dimulai di (100 - 15, 100 - 15)
+    assert candidates[0]['bbox'] == [90, 90, 105, 105]
+
+
+def test_non_overlapping_vehicles_are_not_escalated():
+    cascade = make_cascade(
+        [{'class': 'car', 'confidence': 0.5, 'bbox': [0, 0, 50, 50]},
+         {'class': 'car', 'confidence': 0.5, 'bbox': [300, 300, 350, 350]}],
+        [{'class': 'accident', 'confidence': 0.9, 'bbox': [0, 0, 10, 10]}],
+    )
+    detections = cascade.run(FRAME)
+    assert cascade.get_stats()['frames_escalated'] == 0
+    assert ModelCascade.incident_candidates(detections) == []
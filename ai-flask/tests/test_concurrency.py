@@ -0,0 +1,73 @@
+from cctv_config import CONCURRENCY_CONFIG
+from concurrency import HOLD, SCALE_DOWN, SCALE_UP, ConcurrencyTuner
+
+CONFIG = dict(CONCURRENCY_CONFIG, initial_cameras=8, min_cameras=2, max_cameras=9)
+
+
+class FixedCpu:
+    """Pengganti CpuSampler agar keputusan tidak tergantung beban mesin test"""
+    cores = 4
+
+    def __init__(self, utilisation):
+        self.utilisation = utilisation
+
+    def sample(self):
+        return self.utilisation
+
+
+def make_tuner(cpu=0.3, extra_lag=None):
+    changes = []
+    tuner = ConcurrencyTuner(CONFIG, lambda old, new: changes.append((old, new)), extra_lag=extra_lag)
+    tuner._cpu = FixedCpu(cpu)
+    return tuner, changes
+
+
+def feed(tuner, latency_ms, count=None, queue_lag_ms=0):
+    for _ in range(count or CONFIG['min_samples']):
+        tuner.observe_latency(latency_ms / 1000)
+        tuner.observe_queue_lag(queue_lag_ms / 1000)
+
+
+def test_scale_up_with_headroom_until_max():
+    tuner, changes = make_tuner()
+    feed(tuner, 100)
+    assert tuner.evaluate()['action'] == SCALE_UP
+    feed(tuner, 100)
+    decision = tuner.evaluate()
+    assert decision['action'] == HOLD and 'already at max' in decision['reason']
+    assert changes == [(8, 9)]
+
+
+def test_latency_slo_breach_scales_down_multiplicatively():
+    tuner, changes = make_tuner()
+    feed(tuner, CONFIG['latency_slo_ms'] * 2)
+    assert tuner.evaluate()['action'] == SCALE_DOWN
+    assert changes == [(8, 6)]
+
+
+def test_queue_lag_and_cpu_scale_down():
+    tuner, _ = make_tuner(extra_lag=lambda: CONFIG['queue_lag_slo_ms'] + 1)
+    feed(tuner, 100)
+    assert tuner.evaluate()['action'] == SCALE_DOWN
+
+    tuner, _ = make_tuner(cpu=CONFIG['cpu_high'] + 0.05)
+    feed(tuner, 100)
+    assert tuner.evaluate()['action'] == SCALE_DOWN
+
+
+def test_holds_without_enough_samples_or_headroom():
+    tuner, changes = make_tuner()
+    feed(tuner, 100, count=CONFIG['min_samples'] - 1)
+    assert tuner.evaluate()['action'] == HOLD
+
+    feed(tuner, CONFIG['latency_slo_ms'] * 0.9)  # Di bawah SLO tapi tanpa headroom
+    assert tuner.evaluate()['action'] == HOLD
+    assert changes == []
+
+
+def test_never_below_min_cameras():
+    tuner, _ = make_tuner()
+    for _ in range(10):
+        feed(tuner, CONFIG['latency_slo_ms'] * 2)
+        tuner.evaluate()
+    assert tuner.target == CONFIG['min_cameras']
@@ -0,0 +1,54 @@
+from cctv_config import CROWD_CONFIG
+from crowd import CrowdEstimator
+
+SHAPE = (400, 400, 3)  # Grid 4×4: sel 100×100 piksel
+
+
+def people(count, x=20, y=20, confidence=0.9):
+    """`count` orang dengan titik kaki di sel yang sama"""
+    return [{'class': 'person', 'confidence': confidence, 'bbox': [x, y, x + 10, y + 40]} for _ in range(count)]
+
+
+def dense_crowd():
+    return people(10) + people(10, x=220, y=220)  # 20 orang, sel terpadat 10
+
+
+def test_estimate_counts_people_per_cell_inside_area():
+    estimator = CrowdEstimator(CROWD_CONFIG)
+    detections = dense_crowd() + people(3, confidence=0.2) + [{'class': 'car', 'confidence': 0.9, 'bbox': [0, 0, 5, 5]}]
+    estimate = estimator.estimate(detections, SHAPE)
+    assert estimate['count'] == 20 and estimate['peak_cell'] == 10
+    assert estimate['grid'][0, 0] == 10 and estimate['grid'][2, 2] == 10
+
+    # Area separuh kiri atas: hanya kelompok pertama
+    assert estimator.estimate(detections, SHAPE, area=[0, 0, 0.5, 0.5])['count'] == 10
+
+
+def test_one_incident_per_sustained_episode():
+    estimator = CrowdEstimator(CROWD_CONFIG)
+    sustain = CROWD_CONFIG['sustain_seconds']
+
+    assert estimator.update('cam-1', dense_crowd(), SHAPE, now=0) is None
+    incident = estimator.update('cam-1', dense_crowd(), SHAPE, now=sustain)
+    assert incident['incident_type'] == 'crowd' and incident['people_count'] == 20
+    assert estimator.update('cam-1', dense_crowd(), SHAPE, now=sustain + 60) is None  # Episode yang sama
+
+
+def test_gap_resets_sustain_and_cooldown_blocks_new_episode():
+    estimator = CrowdEstimator(CROWD_CONFIG)
+    sustain, cooldown = CROWD_CONFIG['sustain_seconds'], CROWD_CONFIG['cooldown_seconds']
+
+    estimator.update('cam-1', dense_crowd(), SHAPE, now=0)
+    estimator.update('cam-1', people(2), SHAPE, now=sustain - 1)      # Kepadatan turun sebentar
+    assert estimator.update('cam-1', dense_crowd(), SHAPE, now=sustain) is None
+
+    assert estimator.update('cam-1', dense_crowd(), SHAPE, now=2 * sustain) is not None
+    estimator.update('cam-1', [], SHAPE, now=2 * sustain + 1)
+    # Episode baru sebelum cooldown habis tidak dinaikkan, setelahnya boleh
+    estimator.update('cam-1', dense_crowd(), SHAPE, now=3 * sustain)
+    assert estimator.update('cam-1', dense_crowd(), SHAPE, now=4 * sustain) is None
+    start = 2 * sustain + cooldown
+    estimator.update('cam-1', [], SHAPE, now=start)
+    estimator.update('cam-1', dense_crowd(), SHAPE, now=start + 1)
+    assert estimator.update('cam-1', dense_crowd(), SHAPE, now=start + 1 + sustain) is not None
+    assert estimator.incidents_raised == 2
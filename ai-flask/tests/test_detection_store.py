@@ -0,0 +1,62 @@
+import pytest
+
+from cctv_config import DETECTION_STORE_CONFIG
+from detection_store import DetectionStore, OTHER_CLASS
+
+CONFIG = dict(DETECTION_STORE_CONFIG, memory_budget_bytes=4 * 1024 * 1024, max_cameras=4, max_classes=4)
+
+
+def det(name, confidence=0.9):
+    return {'class': name, 'confidence': confidence, 'bbox': [0, 0, 10, 10]}
+
+
+def test_query_filters_and_orders_newest_first():
+    store = DetectionStore(CONFIG)
+    store.record('cam-1', [det('car', 0.9), det('person', 0.4)], ts=100.0)
+    store.record('cam-1', [det('car', 0.7)], ts=200.0)
+    store.record('cam-2', [det('car', 0.8)], ts=150.0)
+
+    result = store.query(classes=['car'], limit=2)
+    assert result['total'] == 3
+    assert [(d['cctv_id'], d['timestamp']) for d in result['detections']] == [('cam-1', 200.0), ('cam-2', 150.0)]
+
+    assert store.query(cctv_id='cam-1', min_confidence=0.5, start=150)['total'] == 1
+    assert store.query(classes=['fire'])['total'] == 0
+
+
+def test_rollup_merges_cameras_per_bucket():
+    store = DetectionStore(CONFIG)
+    store.record('cam-1', [det('car', 0.8), det('car', 0.6)], ts=60.0)
+    store.record('cam-2', [det('car', 1.0)], ts=90.0)
+    store.record('cam-2', [det('person', 0.5)], ts=130.0)
+
+    buckets = store.rollup(resolution='minute')
+    assert [b['start'] for b in buckets] == [60, 120]
+    assert buckets[0]['counts'] == {'car': 3}
+    assert buckets[0]['avg_confidence']['car'] == pytest.approx(0.8, abs=1e-4)
+    assert buckets[1]['counts'] == {'person': 1}
+
+    assert store.rollup(resolution='hour', classes=['person'])[0]['counts'] == {'person': 1}
+    with pytest.raises(ValueError):
+        store.rollup(resolution='day')
+
+
+def test_ring_overwrites_oldest_and_extra_classes_share_other():
+    store = DetectionStore(CONFIG)
+    for i in range(store.capacity + 5):
+        store.record('cam-1', [det('car')], ts=float(i))
+    assert store.query(cctv_id='cam-1', limit=1)['total'] == store.capacity
+    assert store.query(cctv_id='cam-1', end=4.0)['total'] == 0
+
+    for name in ('person', 'truck', 'bus', 'boat'):
+        store.record('cam-1', [det(name)], ts=1e6)
+    names = {d['class'] for d in store.query(start=1e6)['detections']}
+    assert names == {'person', 'truck', OTHER_CLASS}
+
+
+def test_least_recently_written_camera_is_evicted():
+    store = DetectionStore(CONFIG)
+    for i in range(CONFIG['max_cameras'] + 1):
+        store.record(f"cam-{i}", [det('car')], ts=float(i))
+    assert store.query(cctv_id='cam-0')['total'] == 0
+    assert store.evicted_cameras == 1
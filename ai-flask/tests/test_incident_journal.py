@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from cctv_config import INCIDENT_JOURNAL_CONFIG
+from incident_journal import IncidentJournal, SYNC_ABANDONED, SYNC_FAILED, SYNC_PENDING, SYNC_SYNCED
+
+CONFIG = dict(INCIDENT_JOURNAL_CONFIG, flush_interval=0.02, max_replay_attempts=2)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = IncidentJournal(str(tmp_path / 'incidents.db'), CONFIG)
+    yield journal
+    journal.close()
+
+
+def wait_for_state(journal, incident_id, state, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        rows = [r for r in journal.query(limit=100) if r['id'] == incident_id]
+        if rows and rows[0]['sync_state'] == state:
+            return rows[0]
+        time.sleep(0.01)
+    raise AssertionError(f"{incident_id} never reached {state}")
+
+
+def test_sync_state_transitions(journal):
+    ok = journal.record('cam-1', 'fire', 0.9, time.time() - 600)
+    failing = journal.record('cam-1', 'accident', 0.8, time.time() - 600)
+    wait_for_state(journal, ok, SYNC_PENDING)
+
+    journal.mark_sync(ok, True)
+    journal.mark_sync(failing, False, 'HTTP 500')
+    assert wait_for_state(journal, ok, SYNC_SYNCED)['synced_at'] is not None
+    row = wait_for_state(journal, failing, SYNC_FAILED)
+    assert row['sync_attempts'] == 1 and row['last_error'] == 'HTTP 500'
+
+    # Percobaan ke-max_replay_attempts yang gagal membuat insiden ditinggalkan
+    journal.mark_sync(failing, False)
+    wait_for_state(journal, failing, SYNC_ABANDONED)
+    assert journal.unsynced(time.time(), 10) == []
+
+
+def test_live_delivery_in_flight_is_not_replayed(journal):
+    in_flight = journal.record('cam-1', 'fire', 0.9, time.time() - 600)
+    lost = journal.record('cam-2', 'fire', 0.9, time.time() - 600)
+    journal.mark_sync(lost, False)
+    wait_for_state(journal, in_flight, SYNC_PENDING)
+    wait_for_state(journal, lost, SYNC_FAILED)
+
+    assert [r['id'] for r in journal.unsynced(time.time(), 10)] == [lost]
+
+    # Callback pengiriman yang tidak pernah datang: setelah delivery_timeout boleh di-replay
+    journal._delivering[in_flight] -= CONFIG['delivery_timeout'] + 1
+    assert {r['id'] for r in journal.unsynced(time.time(), 10)} == {in_flight, lost}
@@ -0,0 +1,66 @@
+import gzip
+import json
+
+from incident_sender import IncidentBatcher
+
+CONFIG = {'window_seconds': 0.0, 'max_batch_size': 20, 'max_batch_bytes': 1 << 20, 'compression_level': 1}
+API_CONFIG = {'retry_attempts': 2, 'retry_delay': 0.0, 'timeout': 1}
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        if self._data is None:
+            raise ValueError('not JSON')
+        return self._data
+
+
+class FakeSession:
+    """Tolak batch lebih dari `max_items` dengan 413 (tanpa JSON), tolak insiden bertanda 'bad'"""
+
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self.sizes = []
+
+    def post(self, url, data, headers, timeout):
+        incidents = json.loads(gzip.decompress(data))['incidents']
+        self.sizes.append(len(incidents))
+        if len(incidents) > self.max_items:
+            return FakeResponse(413)
+        return FakeResponse(200, {'results': [
+            {'index': n, 'status': 422, 'error': 'invalid'} if p.get('bad') else {'index': n, 'status': 201}
+            for n, p in enumerate(incidents)
+        ]})
+
+
+def send(session, payloads):
+    batcher = IncidentBatcher('http://laravel/batch', CONFIG, API_CONFIG)
+    batcher._running = False  # Worker berhenti sendiri; batch dikirim langsung di bawah
+    batcher.session = session
+    outcome = {}
+    batch = [(p, lambda ok, n=n: outcome.__setitem__(n, ok)) for n, p in enumerate(payloads)]
+    batcher._send_batch(batch)
+    return [outcome[n] for n in range(len(payloads))], batcher
+
+
+def test_413_splits_batch_until_accepted():
+    session = FakeSession(max_items=2)
+    results, batcher = send(session, [{'id': n} for n in range(5)])
+    assert results == [True] * 5
+    assert session.sizes == [5, 2, 3, 1, 2]  # 5 → 2 + 3, lalu 3 → 1 + 2
+    assert batcher.get_stats()['incidents_failed'] == 0
+
+
+def test_only_items_with_own_status_fail():
+    session = FakeSession(max_items=1)
+    results, _ = send(session, [{'id': 0}, {'id': 1, 'bad': True}, {'id': 2}])
+    assert results == [True, False, True]
+
+
+def test_single_incident_rejected_whole_is_failed():
+    session = FakeSession(max_items=0)  # Bahkan satu insiden terlalu besar
+    results, _ = send(session, [{'id': 0}, {'id': 1}])
+    assert results == [False, False]
@@ -0,0 +1,38 @@
+import logging
+
+from logging_setup import RateLimitFilter
+
+
+def record(lineno=10, cctv_id=None, throttle=True, level=logging.INFO, created=0.0):
+    rec = logging.LogRecord('yolo_detect', level, 'yolo_detect.py', lineno, 'msg', (), None)
+    rec.created = created
+    if cctv_id is not None:
+        rec.cctv_id = cctv_id
+    if throttle:
+        rec.throttle = True
+    return rec
+
+
+def test_unmarked_records_are_never_throttled():
+    limiter = RateLimitFilter(window_seconds=10, burst=2, max_level=logging.WARNING)
+    assert all(limiter.filter(record(throttle=False)) for _ in range(20))  # Insiden / lifecycle
+    assert limiter.suppressed_total == 0
+
+
+def test_budget_is_per_camera():
+    limiter = RateLimitFilter(window_seconds=10, burst=2, max_level=logging.WARNING)
+    cam_a = [limiter.filter(record(cctv_id='cam-a')) for _ in range(4)]
+    cam_b = [limiter.filter(record(cctv_id='cam-b')) for _ in range(2)]
+    assert cam_a == [True, True, False, False]
+    assert cam_b == [True, True]  # cam-a yang ramai tidak menghabiskan kuota cam-b
+
+
+def test_suppressed_count_reported_after_window():
+    limiter = RateLimitFilter(window_seconds=10, burst=1, max_level=logging.WARNING)
+    limiter.filter(record())
+    limiter.filter(record())
+    assert not limiter.filter(record(level=logging.WARNING))
+    assert limiter.filter(record(level=logging.ERROR))  # Di atas max_level selalu lolos
+
+    later = record(created=11.0)
+    assert limiter.filter(later) and later.suppressed == 2
@@ -0,0 +1,37 @@
+from cctv_config import MODEL_REGISTRY_CONFIG
+from model_registry import DEFAULT_MODEL, ModelRegistry, ModelScheduler
+
+
+def make_scheduler(costs, budget_ms=250):
+    config = dict(MODEL_REGISTRY_CONFIG, budget_ms=budget_ms)
+    registry = ModelRegistry(config, loader=lambda path: object())
+    registry.cost_ms.update(costs)
+    return registry, ModelScheduler(registry)
+
+
+def test_new_camera_runs_every_model_then_follows_intervals():
+    _, scheduler = make_scheduler({DEFAULT_MODEL: 10, 'fire': 10, 'flood': 10})
+    assert scheduler.select('cam-1', 100.0) == [DEFAULT_MODEL, 'fire', 'flood']
+    assert scheduler.select('cam-1', 101.0) == [DEFAULT_MODEL]
+    assert scheduler.select('cam-1', 105.0) == [DEFAULT_MODEL, 'fire']
+
+
+def test_default_model_is_never_pushed_out_by_starving_model():
+    registry, scheduler = make_scheduler({DEFAULT_MODEL: 200, 'fire': 100, 'flood': 100})
+    scheduler.select('cam-1', 0.0)
+    deferred = registry.deferred['flood']
+
+    # Flood sudah kelaparan (lebih dari satu interval penuh) tetapi default tetap pertama
+    assert scheduler.select('cam-1', 130.0) == [DEFAULT_MODEL]
+    assert registry.deferred['flood'] == deferred + 1
+
+
+def test_default_model_runs_even_when_over_budget():
+    registry, scheduler = make_scheduler({DEFAULT_MODEL: 400, 'fire': 10, 'flood': 10})
+    assert scheduler.select('cam-1', 0.0) == [DEFAULT_MODEL]
+    assert registry.deferred['fire'] == 1 and registry.deferred['flood'] == 1
+
+
+def test_camera_override_disables_model():
+    _, scheduler = make_scheduler({})
+    assert scheduler.select('cam-1', 0.0, overrides={'flood': None}) == [DEFAULT_MODEL, 'fire']
@@ -0,0 +1,36 @@
+from pipeline import KeyedFrameQueue
+
+
+def test_drop_oldest_per_camera():
+    q = KeyedFrameQueue(max_per_key=2)
+    for i in range(5):
+        q.put('cam-a', i)
+    q.put('cam-b', 'b0')
+
+    assert q.dropped == 3 and q.enqueued == 6
+    assert q.depth() == 3
+    assert q.get(timeout=0.1) == ('cam-a', 3)  # Frame 0-2 sudah dibuang
+
+
+def test_camera_is_never_processed_in_parallel():
+    q = KeyedFrameQueue(max_per_key=4)
+    q.put('cam-a', 1)
+    q.put('cam-a', 2)
+    q.put('cam-b', 1)
+
+    assert q.get(timeout=0.1) == ('cam-a', 1)
+    # cam-a masih in-flight: worker lain mendapat cam-b, lalu tidak ada yang siap
+    assert q.get(timeout=0.1) == ('cam-b', 1)
+    assert q.get(timeout=0.05) is None
+
+    q.done('cam-a')
+    assert q.get(timeout=0.1) == ('cam-a', 2)
+
+
+def test_discard_drops_queued_frames():
+    q = KeyedFrameQueue(max_per_key=4)
+    q.put('cam-a', 1)
+    q.put('cam-a', 2)
+    assert q.discard('cam-a') == 2
+    assert q.depth() == 0
+    assert q.get(timeout=0.05) is None
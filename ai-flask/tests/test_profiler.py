@@ -0,0 +1,24 @@
+import threading
+
+from profiler import camera_scope, dump_stacks
+
+
+def test_shared_thread_is_attributed_to_scoped_camera():
+    entered, release = threading.Event(), threading.Event()
+
+    def work():
+        with camera_scope('cam-7'):
+            entered.set()
+            release.wait(2)
+
+    worker = threading.Thread(target=work, name='pipeline-infer-0')
+    worker.start()
+    entered.wait(2)
+    try:
+        by_thread = {item['thread']: item['cctv_id'] for item in dump_stacks()}
+        assert by_thread['pipeline-infer-0'] == 'cam-7'
+    finally:
+        release.set()
+        worker.join()
+
+    assert {item['thread']: item['cctv_id'] for item in dump_stacks()}.get('pipeline-infer-0') is None
@@ -0,0 +1,47 @@
+import numpy as np
+
+from roi import ROIMask, ROIMaskCache
+
+WIDTH, HEIGHT = 640, 480
+RIGHT_HALF = [[0.5, 0.0], [1.0, 0.0], [1.0, 1.0], [0.5, 1.0]]
+
+
+def box(x1, y1, x2, y2, name='car'):
+    return {'class': name, 'confidence': 0.9, 'bbox': [x1, y1, x2, y2]}
+
+
+def test_filter_uses_bottom_center_anchor():
+    mask = ROIMask(RIGHT_HALF, WIDTH, HEIGHT)
+    inside = box(400, 100, 500, 200)
+    straddling = box(200, 100, 360, 200)   # Tengah bawah di x=280, di luar poligon
+    outside = box(10, 10, 100, 100)
+    assert mask.filter_detections([inside, straddling, outside]) == [inside]
+
+
+def test_center_anchor():
+    mask = ROIMask([[0.0, 0.5], [1.0, 0.5], [1.0, 1.0], [0.0, 1.0]], WIDTH, HEIGHT)
+    tall = box(100, 100, 140, 300)         # Tengah di y=200 (luar), bawah di y=299 (dalam)
+    assert mask.filter_detections([tall]) == [tall]
+    assert mask.filter_detections([tall], anchor='center') == []
+
+
+def test_crop_and_back_to_frame_coords():
+    mask = ROIMask(RIGHT_HALF, WIDTH, HEIGHT)
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    crop = mask.crop(frame)
+    assert crop.shape[:2] == (HEIGHT, WIDTH - mask.crop_box[0])
+    assert 0.49 < mask.crop_ratio < 0.51
+
+    detections = mask.to_frame_coords([box(0, 0, 10, 10)])
+    assert detections[0]['bbox'] == [mask.crop_box[0], 0, mask.crop_box[0] + 10, 10]
+
+
+def test_cache_reuses_mask_until_polygon_or_camera_changes():
+    cache = ROIMaskCache()
+    first = cache.get('cam-1', RIGHT_HALF, WIDTH, HEIGHT)
+    assert cache.get('cam-1', RIGHT_HALF, WIDTH, HEIGHT) is first
+    assert cache.get('cam-1', RIGHT_HALF, 320, 240) is not first
+    assert cache.get('cam-1', [[0, 0], [1, 0], [1, 1]], WIDTH, HEIGHT) is not first
+
+    cache.invalidate('cam-1')
+    assert cache.bytes_by_camera() == {}
@@ -0,0 +1,52 @@
+import random
+
+from cctv_config import FUSION_CONFIG
+from spatial import METERS_PER_DEGREE_LAT, IncidentFuser, SpatialGrid, haversine_m
+
+ORIGIN = (-7.56, 110.82)  # Surakarta
+
+
+def offset(north_m, east_m=0.0):
+    lat, lng = ORIGIN
+    return lat + north_m / METERS_PER_DEGREE_LAT, lng + east_m / (METERS_PER_DEGREE_LAT * 0.9913)
+
+
+def test_nearby_matches_brute_force():
+    rng = random.Random(7)
+    points = {f"cam-{i}": offset(rng.uniform(-5000, 5000), rng.uniform(-5000, 5000)) for i in range(300)}
+    grid = SpatialGrid(points, cell_meters=500)
+
+    for radius in (200, 750, 2500):
+        expected = sorted(key for key, (lat, lng) in points.items() if haversine_m(*ORIGIN, lat, lng) <= radius)
+        found = grid.nearby(*ORIGIN, radius)
+        assert sorted(key for key, _ in found) == expected
+        assert [d for _, d in found] == sorted(d for _, d in found)
+
+
+def make_fuser(**overrides):
+    points = {'a': offset(0), 'b': offset(300), 'far': offset(5000)}
+    grid = SpatialGrid(points, cell_meters=500)
+    neighbors = lambda cctv_id, radius: dict(grid.nearby(*points[cctv_id], radius))
+    return IncidentFuser(dict(FUSION_CONFIG, **overrides), neighbors)
+
+
+def test_neighbor_duplicate_is_fused_into_primary():
+    fuser = make_fuser()
+    assert fuser.fuse('a', 'fire', 0.7, ts=0) is None
+    group = fuser.fuse('b', 'fire', 0.9, ts=10)
+    assert group['primary'] == 'a' and group['cameras'] == {'a': 0.7, 'b': 0.9}
+
+    # Kamera jauh, tipe berbeda, dan kamera yang sama memulai grup sendiri
+    assert fuser.fuse('far', 'fire', 0.9, ts=11) is None
+    assert fuser.fuse('b', 'accident', 0.9, ts=12) is None
+    assert fuser.fuse('a', 'fire', 0.8, ts=13) is None
+    assert fuser.get_stats()['fused_incidents'] == 1
+
+
+def test_window_expiry_and_type_filter():
+    fuser = make_fuser(types=['fire'])
+    fuser.fuse('a', 'fire', 0.7, ts=0)
+    assert fuser.fuse('b', 'fire', 0.7, ts=FUSION_CONFIG['window_seconds'] + 1) is None
+
+    fuser.fuse('a', 'accident', 0.7, ts=100)
+    assert fuser.fuse('b', 'accident', 0.7, ts=101) is None  # Tipe tidak difusi
@@ -0,0 +1,292 @@
+# tracker.py
+# Multi-object tracker ringan (SORT-style, CPU-only) untuk pipeline detect-then-track
+
+import itertools
+import sys
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Kelas kendaraan yang dianalisis oleh aturan insiden berbasis track
+VEHICLE_CLASSES = ('car', 'truck', 'bus', 'motorcycle')
+
+# Ukuran satu entri speed_history: tuple (timestamp, speed) berisi dua float
+SPEED_SAMPLE_BYTES = sys.getsizeof((0.0, 0.0)) + 2 * sys.getsizeof(0.0)
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Hitung matriks IoU antara dua kumpulan bbox [x1, y1, x2, y2] (vectorized)
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = inter_w * inter_h
+
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - intersection
+
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0).astype(np.float32)
+
+
+class Track:
+    """
+    Satu objek yang dilacak dengan motion model kecepatan konstan
+    """
+
+    def __init__(self, track_id: int, bbox: List[float], class_name: str,
+                 confidence: float, timestamp: float, history_seconds: float):
+        self.track_id = track_id
+        self.class_name = class_name
+        self.confidence = confidence
+        self.bbox = np.asarray(bbox, dtype=np.float32)
+        self.measured_bbox = self.bbox.copy()
+        self.velocity = np.zeros(4, dtype=np.float32)  # piksel/detik untuk x1, y1, x2, y2
+
+        self.hits = 1
+        self.time_since_update = 0  # Jumlah keyframe berturut-turut tanpa deteksi yang cocok
+        self.first_seen = timestamp
+        self.last_update = timestamp
+        self.last_predict = timestamp
+
+        # Riwayat kecepatan (timestamp, kecepatan ternormalisasi) untuk aturan temporal
+        self.history_seconds = history_seconds
+        self.speed_history = deque()
+        self.has_moved = False  # Track baru berkecepatan nol; jam diam baru berjalan setelah terlihat melaju
+        self.stationary_since: Optional[float] = None
+        self.fired_rules = set()  # Aturan yang sudah memicu insiden untuk track ini
+
+    @property
+    def center(self) -> np.ndarray:
+        return np.array([(self.bbox[0] + self.bbox[2]) / 2, (self.bbox[1] + self.bbox[3]) / 2])
+
+    @property
+    def speed(self) -> float:
+        """Kecepatan dalam satuan tinggi-bbox per detik (tidak tergantung resolusi)"""
+        height = max(float(self.measured_bbox[3] - self.measured_bbox[1]), 1.0)
+        vx = (self.velocity[0] + self.velocity[2]) / 2
+        vy = (self.velocity[1] + self.velocity[3]) / 2
+        return float(np.hypot(vx, vy)) / height
+
+    def predict(self, timestamp: float):
+        """Propagasi bbox dengan motion model (tanpa inferensi)"""
+        dt = timestamp - self.last_predict
+        if dt > 0:
+            self.bbox = self.bbox + self.velocity * dt
+            self.last_predict = timestamp
+
+    def update(self, bbox: List[float], confidence: float, timestamp: float, smoothing: float):
+        """Koreksi track dengan deteksi baru dari keyframe"""
+        bbox = np.asarray(bbox, dtype=np.float32)
+        dt = timestamp - self.last_update
+        if dt > 0:
+            measured_velocity = (bbox - self.measured_bbox) / dt
+            self.velocity = smoothing * measured_velocity + (1 - smoothing) * self.velocity
+
+        self.bbox = bbox
+        self.measured_bbox = bbox.copy()
+        self.confidence = confidence
+        self.hits += 1
+        self.time_since_update = 0
+        self.last_update = timestamp
+        self.last_predict = timestamp
+
+        self.speed_history.append((timestamp, self.speed))
+        while self.speed_history and timestamp - self.speed_history[0][0] > self.history_seconds:
+            self.speed_history.popleft()
+
+    def to_dict(self) -> Dict:
+        return {
+            'track_id': self.track_id,
+            'class': self.class_name,
+            'confidence': self.confidence,
+            'bbox': [int(v) for v in self.bbox],
+            'speed': round(self.speed, 3),
+            'hits': self.hits,
+            'age_seconds': round(self.last_predict - self.first_seen, 2),
+        }
+
+
+class MultiObjectTracker:
+    """
+    Tracker per kamera: asosiasi IoU greedy pada keyframe,
+    prediksi kecepatan konstan di antara keyframe
+    """
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self.tracks: List[Track] = []
+        self._ids = itertools.count(1)
+        self._overlaps: Dict[Tuple[int, int], float] = {}  # (track_id, track_id) -> awal tumpang tindih
+        self.last_keyframe: Optional[float] = None
+
+    def keyframe_due(self, timestamp: float, interval: float) -> bool:
+        """
+        Keyframe ditentukan dari waktu sejak deteksi penuh terakhir, bukan nomor frame,
+        sehingga cadence deteksi tidak tergantung FPS stream atau frame yang dibuang
+        """
+        if self.last_keyframe is not None and timestamp - self.last_keyframe < interval:
+            return False
+        self.last_keyframe = timestamp
+        return True
+
+    def predict(self, timestamp: float):
+        """Propagasi semua track tanpa menjalankan model"""
+        for track in self.tracks:
+            track.predict(timestamp)
+
+    def update(self, detections: List[Dict], timestamp: float) -> List[Track]:
+        """
+        Update tracker dengan hasil deteksi penuh dari keyframe
+        """
+        for track in self.tracks:
+            track.predict(timestamp)
+
+        det_boxes = np.array([d['bbox'] for d in detections], dtype=np.float32).reshape(-1, 4)
+        track_boxes = np.array([t.bbox for t in self.tracks], dtype=np.float32).reshape(-1, 4)
+        ious = iou_matrix(track_boxes, det_boxes)
+
+        # Cegah asosiasi lintas kelas
+        for ti, track in enumerate(self.tracks):
+            for di, det in enumerate(detections):
+                if det['class'] != track.class_name:
+                    ious[ti, di] = 0.0
+
+        matched_tracks = set()
+        matched_dets = set()
+        if ious.size:
+            # Greedy matching dari IoU tertinggi (cukup untuk jumlah objek per kamera)
+            order = np.dstack(np.unravel_index(np.argsort(-ious, axis=None), ious.shape))[0]
+            for ti, di in order:
+                if ious[ti, di] < self.config['iou_threshold']:
+                    break
+                if ti in matched_tracks or di in matched_dets:
+                    continue
+                det = detections[di]
+                self.tracks[ti].update(det['bbox'], det['confidence'], timestamp,
+                                       self.config['velocity_smoothing'])
+                matched_tracks.add(ti)
+                matched_dets.add(di)
+
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.time_since_update += 1
+
+        for di, det in enumerate(detections):
+            if di not in matched_dets:
+                self.tracks.append(Track(
+                    next(self._ids), det['bbox'], det['class'], det['confidence'],
+                    timestamp, self.config['history_seconds']
+                ))
+
+        # Buang track yang sudah terlalu lama tidak terdeteksi
+        max_age = self.config['max_age']
+        self.tracks = [t for t in self.tracks if t.time_since_update <= max_age]
+
+        return self.confirmed_tracks()
+
+    def memory_bytes(self) -> int:
+        """Perkiraan memori yang dipegang tracker (array bbox + riwayat kecepatan)"""
+        total = sys.getsizeof(self.tracks)
+        for track in self.tracks:
+            total += (track.bbox.nbytes + track.measured_bbox.nbytes + track.velocity.nbytes
+                      + sys.getsizeof(track.speed_history) + len(track.speed_history) * SPEED_SAMPLE_BYTES)
+        return total
+
+    def confirmed_tracks(self) -> List[Track]:
+        """Track yang sudah cukup stabil untuk dianalisis"""
+        return [t for t in self.tracks if t.hits >= self.config['min_hits']]
+
+    def evaluate_rules(self, timestamp: float, lane_mask=None) -> List[Dict]:
+        """
+        Evaluasi aturan insiden berbasis track:
+        - sudden_stop: kendaraan yang berhenti mendadak
+        - vehicle_overlap: dua kendaraan bertumpukan, salah satunya berhenti, selama overlap_min_seconds
+        - stationary_vehicle: kendaraan yang tadinya melaju lalu diam terlalu lama di dalam lajur
+
+        lane_mask: ROIMask lajur/ROI kamera. Tanpa mask, stationary_vehicle tidak dievaluasi
+        karena kendaraan parkir di luar jalan tidak bisa dibedakan dari kendaraan mogok.
+        """
+        events = []
+        vehicles = [t for t in self.confirmed_tracks()
+                    if t.class_name in VEHICLE_CLASSES and t.time_since_update == 0]
+
+        stopped_speed = self.config['stopped_speed']
+        for track in vehicles:
+            speed = track.speed
+            if speed >= self.config['moving_speed']:
+                track.has_moved = True
+
+            if speed <= stopped_speed and track.has_moved:
+                if track.stationary_since is None:
+                    track.stationary_since = timestamp
+            else:
+                track.stationary_since = None
+
+            if 'sudden_stop' not in track.fired_rules and speed <= stopped_speed:
+                recent = [s for t, s in track.speed_history
+                          if timestamp - t <= self.config['sudden_stop_window']]
+                if recent and max(recent) >= self.config['sudden_stop_min_speed']:
+                    track.fired_rules.add('sudden_stop')
+                    events.append(self._event('sudden_stop', [track]))
+
+            if ('stationary_vehicle' not in track.fired_rules and track.stationary_since is not None
+                    and timestamp - track.stationary_since >= self.config['stationary_seconds']
+                    and lane_mask is not None and self._in_lane(track, lane_mask)):
+                track.fired_rules.add('stationary_vehicle')
+                events.append(self._event('stationary_vehicle', [track]))
+
+        overlapping = set()
+        if len(vehicles) > 1:
+            boxes = np.array([t.bbox for t in vehicles], dtype=np.float32)
+            ious = np.triu(iou_matrix(boxes, boxes), k=1)
+            for i, j in zip(*np.nonzero(ious >= self.config['overlap_iou'])):
+                a, b = vehicles[i], vehicles[j]
+                # Kendaraan yang sama-sama melaju biasanya hanya oklusi perspektif,
+                # dua kendaraan yang tidak pernah melaju biasanya parkir berdempetan
+                if min(a.speed, b.speed) > stopped_speed or not (a.has_moved or b.has_moved):
+                    continue
+                pair = (min(a.track_id, b.track_id), max(a.track_id, b.track_id))
+                overlapping.add(pair)
+                since = self._overlaps.setdefault(pair, timestamp)
+
+                # Antrean stop-and-go hanya berdempetan sesaat; tabrakan bertahan
+                rule_key = f"vehicle_overlap:{pair[0]}:{pair[1]}"
+                if rule_key in a.fired_rules or timestamp - since < self.config['overlap_min_seconds']:
+                    continue
+                a.fired_rules.add(rule_key)
+                b.fired_rules.add(rule_key)
+                events.append(self._event('vehicle_overlap', [a, b]))
+
+        # Pasangan yang sudah berpisah (atau track-nya hilang) memulai dwell dari nol lagi
+        self._overlaps = {pair: since for pair, since in self._overlaps.items() if pair in overlapping}
+
+        return events
+
+    def _in_lane(self, track: Track, lane_mask) -> bool:
+        """Titik jangkar bbox (default: tengah bawah, titik kontak dengan jalan) ada di dalam lajur"""
+        x1, y1, x2, y2 = track.bbox
+        anchor_y = (y1 + y2) / 2 if self.config['lane_anchor'] == 'center' else y2 - 1
+        return lane_mask.contains((x1 + x2) / 2, anchor_y)
+
+    def _event(self, rule: str, tracks: List[Track]) -> Dict:
+        return {
+            'rule': rule,
+            'incident_type': self.config['rule_incident_types'][rule],
+            'confidence': float(min(t.confidence for t in tracks)),
+            'track_ids': [t.track_id for t in tracks],
+            'class': tracks[0].class_name,
+            'bbox': [int(v) for v in tracks[0].bbox],
+        }
+
+    def reset(self):
+        self.tracks = []
+        self._overlaps = {}
+        self.last_keyframe = None
@@ -1,21 +1,50 @@
 # yolo_detect.py
 # Logic deteksi menggunakan YOLOv8
 
+import asyncio
 import cv2
 import numpy as np
 import base64
 import logging
 import time
 import threading
+import concurrent.futures
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 from ultralytics import YOLO
-from PIL import Image
-import io
+import os
 import requests
 import json
 
-from cctv_config import CCTVConfig, DETECTION_CONFIG, LARAVEL_API_CONFIG, SCREENSHOT_PATH
+from cctv_config import (
+    get_cctv_config, DETECTION_CONFIG, LARAVEL_API_CONFIG, SCREENSHOT_PATH, TRACKER_CONFIG, CASCADE_CONFIG,
+    STREAM_CONFIG, CAMERA_OPEN_CONFIG, PYAV_DECODER_CONFIG, SCREENSHOT_STORE_CONFIG, CLIP_CONFIG, CLIP_PATH,
+    SHARDING_CONFIG, INCIDENT_BATCH_CONFIG, MEMORY_CONFIG, PIPELINE_CONFIG, ASYNC_CORE_CONFIG,
+    DETECTION_STORE_CONFIG, INCIDENT_JOURNAL_PATH, INCIDENT_JOURNAL_CONFIG,
+    FUSION_CONFIG, CROWD_CONFIG, CONCURRENCY_CONFIG, MODEL_REGISTRY_CONFIG, AUTOTUNE_CONFIG
+)
+from tracker import MultiObjectTracker, VEHICLE_CLASSES
+from roi import ROIMaskCache
+from cascade import ModelCascade
+from stream_supervisor import StreamSupervisor, ACTION_RETRY, ACTION_RECONNECT
+from camera_opener import CameraOpener
+from screenshot_store import ScreenshotStore
+from clip_buffer import ClipBufferManager
+from sharding import ShardManager, create_coordinator
+from incident_sender import IncidentBatcher
+from quantize import base_model_path, quantized_model_path
+from logging_setup import setup_logging, get_logging_stats
+from profiler import StageTimings, DETECTION_THREAD_PREFIX, camera_scoped
+from memory_monitor import MemoryMonitor
+from pipeline import DetectionPipeline
+from async_core import AsyncCore, CaptureLease
+from detection_store import DetectionStore
+from incident_journal import IncidentJournal, JournalReplayer
+from spatial import IncidentFuser
+from crowd import CrowdEstimator
+from concurrency import ConcurrencyTuner
+from autotune import load_tuning, apply_thread_settings, core_pinner
+from model_registry import ModelRegistry, ModelScheduler, SharedFrame, DEFAULT_MODEL
 
 class YOLODetector:
     """
@@ -24,25 +53,132 @@ class YOLODetector:
     
     def __init__(self):
         self.model = None
-        self.cctv_config = CCTVConfig()
+        self.cascade = None  # ModelCascade jika mode cascade aktif
+        self.model_registry = None  # Model khusus tambahan (fire, flood, ...) jika ada yang ter-load
+        self.model_scheduler = None
+        self.model_precision = 'fp32'
+        self.cctv_config = get_cctv_config()
         self.active_streams = {}  # Dict untuk menyimpan stream yang aktif
         self.detection_counters = {}  # Counter untuk membatasi deteksi spam
+        self.incident_stats = {'raised': 0, 'fused': 0, 'rate_limited': 0, 'delivered': 0, 'failed': 0}
         self.running_detections = {}  # Status running untuk setiap kamera
         self.auto_rotation_thread = None
         self.auto_rotation_running = False
+        self._rotation_stop = threading.Event()  # Membangunkan jeda rotasi saat rotasi dihentikan
+        self._rotation_timer = None
+        self._rotation_index = 0
+        self._rotation_failover = []  # Kamera hasil failover sharding, diambil rotasi lebih dulu
         self.current_rotation_cameras = []
+        self._rotation_lock = threading.Lock()  # Rotasi dan resize dari tuner tidak boleh bersamaan
+        self.trackers = {}  # MultiObjectTracker per kamera
+        self.roi_masks = ROIMaskCache()
+        self.crowd_estimator = CrowdEstimator(CROWD_CONFIG) if CROWD_CONFIG['enabled'] else None
+        self.stage_timings = StageTimings()
+        self.frame_bytes = {}  # Ukuran frame terakhir per kamera (akuntansi memori)
+        self.pending_starts = {}  # Future pembukaan kamera yang belum selesai
+        self.capture_sources = {}  # (url, decoder, opsi) yang dipakai saat kamera dibuka
+        self._start_lock = threading.Lock()
         
         # Setup logging
-        logging.basicConfig(
-            level=getattr(logging, 'INFO'),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('detection_system.log'),
-                logging.StreamHandler()
-            ]
-        )
+        setup_logging()
         self.logger = logging.getLogger(__name__)
         
+        # Thread torch/OpenCV dan jumlah worker inferensi dari `python autotune.py` (jika ada)
+        self.tuning = load_tuning() if AUTOTUNE_CONFIG['apply_on_startup'] else None
+        infer_initializer = None
+        if self.tuning:
+            apply_thread_settings(self.tuning)
+            if AUTOTUNE_CONFIG['pin_cores']:
+                infer_initializer = core_pinner(self.tuning)
+            self.logger.info(f"🎛️ Applied autotuned settings: {self.tuning}")
+        
+        self.camera_opener = CameraOpener(CAMERA_OPEN_CONFIG, PYAV_DECODER_CONFIG)
+        self.stream_supervisor = StreamSupervisor(STREAM_CONFIG, self._open_capture)
+        self.cctv_config.registry.add_listener(self._on_registry_reload)
+        self.screenshot_store = ScreenshotStore(SCREENSHOT_PATH, SCREENSHOT_STORE_CONFIG)
+        self.clip_buffers = ClipBufferManager(CLIP_PATH, CLIP_CONFIG) if CLIP_CONFIG['enabled'] else None
+        
+        # Akuntansi memori per kamera + pruning state kamera yang sudah tidak aktif
+        self.memory_monitor = MemoryMonitor(MEMORY_CONFIG)
+        self.memory_monitor.add_source('frame', lambda: dict(self.frame_bytes))
+        self.memory_monitor.add_source('tracker', lambda: {
+            cctv_id: tracker.memory_bytes() for cctv_id, tracker in list(self.trackers.items())
+        })
+        self.memory_monitor.add_source('roi_mask', self.roi_masks.bytes_by_camera)
+        
+        # Riwayat deteksi per kamera untuk /detections (anggaran memori tetap)
+        self.detection_store = DetectionStore(DETECTION_STORE_CONFIG) if DETECTION_STORE_CONFIG['enabled'] else None
+        if self.detection_store:
+            self.memory_monitor.add_source('detection_store', self.detection_store.bytes_by_camera)
+        if self.clip_buffers:
+            self.memory_monitor.add_source('clip_buffer', lambda: self.clip_buffers.get_stats()['per_camera_bytes'])
+        self.memory_monitor.add_pruner(self.prune_inactive_state)
+        self.memory_monitor.start()
+        
+        # Pipeline bertahap: thread kamera hanya decode, infer/encode/deliver oleh worker bersama
+        self.pipeline = None
+        if PIPELINE_CONFIG['enabled']:
+            pipeline_config = PIPELINE_CONFIG
+            if self.tuning:
+                pipeline_config = {**PIPELINE_CONFIG, 'infer_workers': self.tuning['infer_workers']}
+            self.pipeline = DetectionPipeline(
+                pipeline_config, self._pipeline_infer, self._encode_incident, self._deliver_incident,
+                infer_initializer=infer_initializer
+            )
+            self.pipeline.start()
+        
+        # Core asyncio: task per kamera + timer wheel, bukan thread + sleep per kamera
+        self.core = None
+        if ASYNC_CORE_CONFIG['enabled']:
+            core_config = ASYNC_CORE_CONFIG
+            if self.tuning and not self.pipeline:
+                # Tanpa pipeline inferensi berjalan di executor infer core
+                core_config = {**ASYNC_CORE_CONFIG, 'infer_workers': self.tuning['infer_workers']}
+            self.core = AsyncCore(core_config, infer_initializer=None if self.pipeline else infer_initializer)
+            self.core.start()
+        
+        # Jumlah kamera per rotasi mengikuti headroom terukur, bukan angka tetap
+        self.concurrency = None
+        if CONCURRENCY_CONFIG['enabled']:
+            self.concurrency = ConcurrencyTuner(
+                CONCURRENCY_CONFIG, self._resize_rotation,
+                extra_lag=(lambda: self.core.loop_lag_ms) if self.core else None
+            )
+            self.concurrency.start()
+        
+        self.incident_batcher = None
+        if INCIDENT_BATCH_CONFIG['enabled']:
+            self.incident_batcher = IncidentBatcher(
+                LARAVEL_API_CONFIG['base_url'] + LARAVEL_API_CONFIG['batch_endpoint'],
+                INCIDENT_BATCH_CONFIG, LARAVEL_API_CONFIG, self._post_incident
+            )
+        
+        # Fusi lintas kamera: kejadian yang sama dari kamera tetangga hanya di-upload sekali
+        self.incident_fuser = None
+        if FUSION_CONFIG['enabled']:
+            self.incident_fuser = IncidentFuser(FUSION_CONFIG, self.cctv_config.registry.neighbors)
+        
+        # Jurnal lokal semua insiden; yang gagal terkirim di-replay setelah Laravel pulih
+        self.incident_journal = None
+        self.journal_replayer = None
+        if INCIDENT_JOURNAL_CONFIG['enabled']:
+            self.incident_journal = IncidentJournal(INCIDENT_JOURNAL_PATH, INCIDENT_JOURNAL_CONFIG)
+            self.journal_replayer = JournalReplayer(
+                self.incident_journal, INCIDENT_JOURNAL_CONFIG, self._replay_payload, self._send_incident
+            )
+        
+        # Sharding: node ini hanya memonitor kamera yang dimilikinya di hash ring
+        self.shard_manager = None
+        if SHARDING_CONFIG['enabled']:
+            self.shard_manager = ShardManager(
+                SHARDING_CONFIG, create_coordinator(SHARDING_CONFIG),
+                self.cctv_config.get_active_cameras
+            )
+            self.shard_manager.start()
+            # Listener dipasang setelah kepemilikan awal: mode manual tetap menunggu start operator,
+            # hanya kamera yang berpindah kemudian (node lain mati/keluar) yang diambil alih
+            self.shard_manager.add_listener(self._on_shard_rebalance)
+        
         # Load YOLO model
         self.load_model()
     
@@ -50,7 +186,9 @@ class YOLODetector:
         """Load YOLOv8 model"""
         try:
             model_path = DETECTION_CONFIG['model_path']
-            if model_path and model_path != 'accident.pt':
+            if self._load_quantized_model(DETECTION_CONFIG['precision']):
+                self.logger.info(f"✅ {self.model_precision.upper()} model loaded successfully")
+            elif model_path and model_path != 'accident.pt':
                 self.model = YOLO(model_path)
                 self.logger.info(f"✅ Model loaded successfully: {model_path}")
             else:
@@ -60,55 +198,250 @@ class YOLODetector:
         except Exception as e:
             self.logger.error(f"❌ Error loading model: {e}")
             # Fallback ke model pre-trained
+            self.model_precision = 'fp32'
             try:
                 self.model = YOLO('yolov8n.pt')
                 self.logger.info("✅ Fallback to YOLOv8n pre-trained model")
             except Exception as fallback_error:
                 self.logger.error(f"❌ Failed to load fallback model: {fallback_error}")
                 self.model = None
+        
+        if CASCADE_CONFIG['enabled']:
+            self.load_cascade()
+        
+        if MODEL_REGISTRY_CONFIG['enabled']:
+            self.load_model_registry()
     
-    def detect_objects(self, frame: np.ndarray) -> List[Dict]:
+    def _load_quantized_model(self, precision: str) -> bool:
         """
-        Deteksi objek dalam frame
+        Load model INT8/FP16 hasil `python quantize.py`; jika belum dibuat, tetap FP32
+        """
+        if precision == 'fp32':
+            return False
+        
+        quantized_path = quantized_model_path(base_model_path(), precision)
+        if not os.path.exists(quantized_path):
+            self.logger.warning(
+                f"⚠️ {precision.upper()} model not found ({quantized_path}), "
+                f"run `python quantize.py --precision {precision}`; using FP32"
+            )
+            return False
+        
+        self.model = YOLO(quantized_path, task='detect')
+        self.model_precision = precision
+        return True
+    
+    def load_cascade(self):
+        """Load model screener dan confirmer untuk mode cascade"""
+        confirmer_path = CASCADE_CONFIG['confirmer_model_path']
+        if not os.path.exists(confirmer_path):
+            self.logger.warning(f"⚠️ Cascade disabled: confirmer model not found ({confirmer_path})")
+            return
+        
+        try:
+            screener = YOLO(CASCADE_CONFIG['screener_model_path'])
+            confirmer = YOLO(confirmer_path)
+            self.model = screener
+            self.cascade = ModelCascade(screener, confirmer, CASCADE_CONFIG, self._predict)
+            self.logger.info(f"✅ Cascade loaded: {CASCADE_CONFIG['screener_model_path']} → {confirmer_path}")
+        except Exception as e:
+            self.logger.error(f"❌ Error loading cascade models: {e}")
+            self.cascade = None
+    
+    def load_model_registry(self):
+        """Load model khusus dari MODEL_REGISTRY_CONFIG; tanpa model tambahan scheduler tidak dipakai"""
+        registry = ModelRegistry(MODEL_REGISTRY_CONFIG, self._load_registry_model)
+        if len(registry.models) == 0:
+            self.logger.info("ℹ️ No specialised models found, running the default model only")
+            return
+        self.model_registry = registry
+        self.model_scheduler = ModelScheduler(registry)
+    
+    @staticmethod
+    def _load_registry_model(path: str):
+        # Cek dulu agar ultralytics tidak mencoba mengunduh nama file yang tidak dikenal
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        return YOLO(path, task='detect')
+    
+    def _run_scheduled_models(self, frame: np.ndarray, cctv_id: Optional[str]) -> List[Dict]:
+        """
+        Jalankan model yang dipilih scheduler untuk tick ini pada satu SharedFrame
+        """
+        registry = self.model_registry
+        overrides = self.cctv_config.get_camera_config(cctv_id).get('model_intervals') if cctv_id else None
+        names = self.model_scheduler.select(cctv_id, time.time(), overrides)
+        shared = SharedFrame(frame, MODEL_REGISTRY_CONFIG['imgsz'])
+        
+        detections = []
+        for name in names:
+            spec = registry.specs[name]
+            started = time.perf_counter()
+            if name == DEFAULT_MODEL and self.cascade is not None:
+                # Cascade memotong crop kandidat dari frame asli
+                found = self.cascade.run(frame)
+            else:
+                model = self.model if name == DEFAULT_MODEL else registry.models[name]
+                confidence = spec['confidence'] or DETECTION_CONFIG['confidence_threshold']
+                found = shared.to_frame_coords(self._predict(model, shared.tensor(), confidence))
+            registry.record_run(name, time.perf_counter() - started)
+            
+            if spec['classes']:
+                found = [d for d in found if d['class'] in spec['classes']]
+            for detection in found:
+                detection['model'] = name
+            detections.extend(found)
+        return detections
+    
+    def _run_model(self, frame: np.ndarray, cctv_id: Optional[str] = None) -> List[Dict]:
+        """
+        Jalankan model pada frame dan kembalikan semua box di atas confidence threshold.
+        Jika kamera punya ROI, inferensi hanya pada crop ROI dan box di luar poligon dibuang.
         """
         if self.model is None:
             return []
         
+        roi_mask = None
+        if cctv_id and DETECTION_CONFIG['roi_enabled']:
+            polygon = self.cctv_config.get_camera_roi(cctv_id)
+            if polygon:
+                height, width = frame.shape[:2]
+                roi_mask = self.roi_masks.get(cctv_id, polygon, width, height)
+                frame = roi_mask.crop(frame)
+        
         try:
-            results = self.model(frame, verbose=False)
-            detections = []
+            started = time.perf_counter()
+            if self.model_scheduler is not None:
+                detections = self._run_scheduled_models(frame, cctv_id)
+            elif self.cascade is not None:
+                detections = self.cascade.run(frame)
+            else:
+                detections = self._predict(self.model, frame, DETECTION_CONFIG['confidence_threshold'])
+            if self.concurrency:
+                self.concurrency.observe_latency(time.perf_counter() - started)
             
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Mendapatkan confidence dan class
-                        conf = float(box.conf.cpu().numpy()[0])
-                        cls_id = int(box.cls.cpu().numpy()[0])
-                        class_name = self.model.names[cls_id]
-                        
-                        # Filter berdasarkan confidence threshold
-                        if conf >= DETECTION_CONFIG['confidence_threshold']:
-                            # Mendapatkan koordinat bounding box
-                            x1, y1, x2, y2 = box.xyxy.cpu().numpy()[0]
-                            
-                            detection = {
-                                'class': class_name,
-                                'confidence': conf,
-                                'bbox': [int(x1), int(y1), int(x2), int(y2)]
-                            }
-                            
-                            # Klasifikasi incident type berdasarkan detected class
-                            incident_type = self._classify_incident_type(class_name, conf)
-                            if incident_type:
-                                detection['incident_type'] = incident_type
-                                detections.append(detection)
+            if roi_mask is not None:
+                detections = roi_mask.filter_detections(
+                    roi_mask.to_frame_coords(detections), DETECTION_CONFIG['roi_anchor']
+                )
+            
+            if cctv_id and self.detection_store:
+                self.detection_store.record(cctv_id, detections)
             
             return detections
         except Exception as e:
             self.logger.error(f"Error in object detection: {e}")
             return []
     
+    def _predict(self, model, frame: np.ndarray, confidence_threshold: float) -> List[Dict]:
+        """
+        Satu pemanggilan model, hasil difilter berdasarkan confidence threshold
+        """
+        results = model(frame, verbose=False)
+        detections = []
+        
+        for result in results:
+            boxes = result.boxes
+            if boxes is not None:
+                for box in boxes:
+                    # Mendapatkan confidence dan class
+                    conf = float(box.conf.cpu().numpy()[0])
+                    cls_id = int(box.cls.cpu().numpy()[0])
+                    class_name = model.names[cls_id]
+                    
+                    # Filter berdasarkan confidence threshold
+                    if conf >= confidence_threshold:
+                        # Mendapatkan koordinat bounding box
+                        x1, y1, x2, y2 = box.xyxy.cpu().numpy()[0]
+                        
+                        detections.append({
+                            'class': class_name,
+                            'confidence': conf,
+                            'bbox': [int(x1), int(y1), int(x2), int(y2)]
+                        })
+        
+        return detections
+    
+    def detect_objects(self, frame: np.ndarray, cctv_id: Optional[str] = None) -> List[Dict]:
+        """
+        Deteksi objek dalam frame
+        """
+        detections = []
+        raw_detections = self._run_model(frame, cctv_id)
+        for detection in ModelCascade.incident_candidates(raw_detections):
+            # Klasifikasi incident type berdasarkan detected class
+            incident_type = self._classify_incident_type(detection['class'], detection['confidence'])
+            if incident_type:
+                detection['incident_type'] = incident_type
+                detections.append(detection)
+        
+        crowd = self._estimate_crowd(cctv_id, raw_detections, frame.shape, time.time())
+        if crowd:
+            detections.append(crowd)
+        
+        return detections
+    
+    def _estimate_crowd(self, cctv_id: Optional[str], raw_detections: List[Dict],
+                        frame_shape: Tuple[int, ...], current_time: float) -> Optional[Dict]:
+        """
+        Satu detection 'crowd' jika kepadatan orang bertahan di atas threshold (None jika tidak)
+        """
+        if not self.crowd_estimator or not cctv_id:
+            return None
+        area = self.cctv_config.get_camera_config(cctv_id).get('crowd_area') or CROWD_CONFIG['area']
+        crowd = self.crowd_estimator.update(cctv_id, raw_detections, frame_shape, current_time, area)
+        if crowd:
+            self.logger.info(
+                f"👥 Crowd at {cctv_id}: {crowd['people_count']} people, "
+                f"{crowd['peak_cell_count']} in densest cell for {CROWD_CONFIG['sustain_seconds']}s+"
+            )
+        return crowd
+    
+    def track_objects(self, cctv_id: str, frame: np.ndarray, frame_count: int, current_time: float) -> List[Dict]:
+        """
+        Detect-then-track: deteksi penuh hanya pada keyframe (setiap keyframe_interval detik),
+        prediksi motion model di antaranya. Insiden kendaraan diturunkan dari aturan temporal
+        pada track, ditambah klasifikasi per deteksi jika classify_vehicles aktif.
+        """
+        tracker = self.trackers.get(cctv_id)
+        if tracker is None:
+            tracker = self.trackers[cctv_id] = MultiObjectTracker(TRACKER_CONFIG)
+        
+        interval = TRACKER_CONFIG['keyframe_interval'] or DETECTION_CONFIG['detection_interval']
+        if not tracker.keyframe_due(current_time, interval):
+            tracker.predict(current_time)
+            return []
+        
+        raw_detections = self._run_model(frame, cctv_id)
+        tracker.update([d for d in raw_detections if d['class'] in VEHICLE_CLASSES], current_time)
+        
+        lane_mask = None
+        lane = self.cctv_config.get_camera_lane(cctv_id)
+        if lane:
+            height, width = frame.shape[:2]
+            lane_mask = self.roi_masks.get(cctv_id, lane, width, height)
+        
+        incidents = []
+        for event in tracker.evaluate_rules(current_time, lane_mask):
+            self.logger.info(f"🚗 Track rule '{event['rule']}' at {cctv_id}: tracks {event['track_ids']}")
+            incidents.append(event)
+        
+        # Deteksi keyframe diklasifikasi seperti detect_objects (fire, flood, crowd, model custom);
+        # kendaraan dilewati jika insidennya hanya diambil dari aturan track
+        for detection in ModelCascade.incident_candidates(raw_detections):
+            if detection['class'] in VEHICLE_CLASSES and not TRACKER_CONFIG['classify_vehicles']:
+                continue
+            incident_type = self._classify_incident_type(detection['class'], detection['confidence'])
+            if incident_type:
+                detection['incident_type'] = incident_type
+                incidents.append(detection)
+        
+        crowd = self._estimate_crowd(cctv_id, raw_detections, frame.shape, current_time)
+        if crowd:
+            incidents.append(crowd)
+        
+        return incidents
+    
     def _classify_incident_type(self, class_name: str, confidence: float) -> Optional[str]:
         """
         Klasifikasi tipe incident berdasarkan detected class
@@ -126,8 +459,8 @@ class YOLODetector:
             'crash': 'accident',
             'collision': 'accident',
             
-            # Deteksi kerumunan
-            'person': 'crowd' if confidence > 0.7 else None,
+            # Deteksi kerumunan (per orang hanya jika CrowdEstimator nonaktif)
+            'person': 'crowd' if confidence > 0.7 and not self.crowd_estimator else None,
             'crowd': 'crowd',
             
             # Situasi darurat lainnya
@@ -147,75 +480,107 @@ class YOLODetector:
         """
         Capture screenshot dan konversi ke base64
         """
+        return self._capture_screenshot(frame, cctv_id)[0]
+    
+    def _capture_screenshot(self, frame: np.ndarray, cctv_id: str) -> Tuple[str, Optional[str]]:
+        """
+        Screenshot sebagai (base64, path relatif di screenshot store)
+        """
         try:
-            # Convert frame ke PIL Image
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            pil_image = Image.fromarray(rgb_frame)
+            # Encode JPEG sekali, dipakai untuk file dan base64
+            ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, DETECTION_CONFIG['screenshot_quality']])
+            if not ok:
+                raise ValueError("JPEG encoding failed")
+            jpeg_bytes = buffer.tobytes()
             
-            # Save screenshot to file
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{cctv_id}_{timestamp}.jpg"
-            filepath = os.path.join(SCREENSHOT_PATH, filename)
-            pil_image.save(filepath, quality=DETECTION_CONFIG['screenshot_quality'])
+            # Simpan ke screenshot store (tulis asinkron, nama berdasarkan hash konten)
+            digest = self.screenshot_store.put(jpeg_bytes, cctv_id)
+            img_base64 = base64.b64encode(jpeg_bytes).decode('utf-8')
             
-            # Convert to base64
-            buffer = io.BytesIO()
-            pil_image.save(buffer, format='JPEG', quality=DETECTION_CONFIG['screenshot_quality'])
-            img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            self.logger.info(f"📸 Screenshot captured: {filename}")
-            return img_base64
+            self.logger.info(f"📸 Screenshot captured: {cctv_id} {digest[:12]}",
+                             extra={'cctv_id': cctv_id, 'throttle': True})
+            return img_base64, self.screenshot_store.relative_path(digest)
         except Exception as e:
             self.logger.error(f"Error capturing screenshot: {e}")
-            return ""
+            return "", None
+    
+    def _build_incident_payload(self, cctv_id: str, incident_type: str, image_base64: str,
+                                confidence: Optional[float], detected_at: float,
+                                metadata: Optional[Dict] = None) -> Dict:
+        """
+        detected_at adalah waktu frame insiden (bukan waktu encode/kirim), confidence dari deteksi
+        """
+        data = {
+            'cctv_id': cctv_id,
+            'type': incident_type,
+            'image_base64': image_base64,
+            'detected_at': datetime.fromtimestamp(detected_at).isoformat(),
+            'confidence': confidence,
+        }
+        if metadata:
+            data.update(metadata)
+        return data
     
-    def send_to_laravel(self, cctv_id: str, incident_type: str, image_base64: str) -> bool:
+    def send_to_laravel(self, cctv_id: str, incident_type: str, image_base64: str,
+                        metadata: Optional[Dict] = None, confidence: Optional[float] = None,
+                        detected_at: Optional[float] = None) -> bool:
         """
-        Kirim data deteksi ke API Laravel
+        Kirim data deteksi ke API Laravel (tanpa detected_at dipakai waktu sekarang)
         """
         try:
-            url = LARAVEL_API_CONFIG['base_url'] + LARAVEL_API_CONFIG['incidents_endpoint']
-            
-            data = {
-                'cctv_id': cctv_id,
-                'type': incident_type,
-                'image_base64': image_base64,
-                'detected_at': datetime.now().isoformat(),
-                'confidence': 0.85  # Could be passed from detection
-            }
-            
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-            
-            # Retry mechanism
-            for attempt in range(LARAVEL_API_CONFIG['retry_attempts']):
-                try:
-                    response = requests.post(
-                        url, 
-                        json=data, 
-                        headers=headers,
-                        timeout=LARAVEL_API_CONFIG['timeout']
-                    )
-                    
-                    if response.status_code in [200, 201]:
-                        self.logger.info(f"✅ Incident sent to Laravel: {cctv_id} - {incident_type}")
-                        return True
-                    else:
-                        self.logger.warning(f"⚠️ Laravel API response: {response.status_code} - {response.text}")
-                        
-                except requests.exceptions.RequestException as e:
-                    self.logger.error(f"❌ Request error (attempt {attempt + 1}): {e}")
-                    
-                if attempt < LARAVEL_API_CONFIG['retry_attempts'] - 1:
-                    time.sleep(LARAVEL_API_CONFIG['retry_delay'])
-            
-            return False
+            return self._post_incident(self._build_incident_payload(
+                cctv_id, incident_type, image_base64, confidence, detected_at or time.time(), metadata
+            ))
         except Exception as e:
             self.logger.error(f"Error sending to Laravel: {e}")
             return False
     
+    def _post_incident(self, data: Dict) -> bool:
+        """
+        Kirim satu insiden (juga dipakai batcher jika endpoint batch tidak tersedia)
+        """
+        url = LARAVEL_API_CONFIG['base_url'] + LARAVEL_API_CONFIG['incidents_endpoint']
+        
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+        
+        # Retry mechanism
+        for attempt in range(LARAVEL_API_CONFIG['retry_attempts']):
+            try:
+                response = requests.post(
+                    url, 
+                    json=data, 
+                    headers=headers,
+                    timeout=LARAVEL_API_CONFIG['timeout']
+                )
+                
+                if response.status_code in [200, 201]:
+                    self.logger.info(f"✅ Incident sent to Laravel: {data['cctv_id']} - {data['type']}",
+                                     extra={'cctv_id': data['cctv_id'], 'throttle': True})
+                    return True
+                else:
+                    self.logger.warning(f"⚠️ Laravel API response: {response.status_code} - {response.text}",
+                                        extra={'cctv_id': data['cctv_id'], 'throttle': True})
+                    
+            except requests.exceptions.RequestException as e:
+                self.logger.error(f"❌ Request error (attempt {attempt + 1}): {e}")
+                
+            if attempt < LARAVEL_API_CONFIG['retry_attempts'] - 1:
+                time.sleep(LARAVEL_API_CONFIG['retry_delay'])
+        
+        return False
+    
+    def _on_incident_delivered(self, cctv_id: str, success: bool, journal_id: Optional[str] = None):
+        if journal_id and self.incident_journal:
+            self.incident_journal.mark_sync(journal_id, success)
+        self.incident_stats['delivered' if success else 'failed'] += 1
+        # Slot rate limit sudah dipakai saat insiden diterima; kembalikan jika gagal terkirim
+        counter = self.detection_counters.get(cctv_id)
+        if not success and counter and counter['count'] > 0:
+            counter['count'] -= 1
+    
     def _should_detect(self, cctv_id: str) -> bool:
         """
         Cek apakah boleh melakukan deteksi (untuk menghindari spam)
@@ -243,7 +608,8 @@ class YOLODetector:
     
     def start_detection(self, cctv_id: str) -> bool:
         """
-        Mulai deteksi untuk kamera tertentu
+        Mulai deteksi untuk kamera tertentu.
+        Pembukaan stream berjalan di background; True berarti start diterima (state 'pending').
         """
         if cctv_id in self.running_detections and self.running_detections[cctv_id]:
             self.logger.warning(f"⚠️ Detection already running for {cctv_id}")
@@ -253,42 +619,138 @@ class YOLODetector:
             self.logger.error(f"❌ Camera {cctv_id} is not active")
             return False
         
+        if self.shard_manager and not self.shard_manager.owns(cctv_id):
+            self.logger.warning(f"⚠️ Camera {cctv_id} is owned by another node")
+            return False
+        
+        if not self.stream_supervisor.allow_start(cctv_id):
+            self.logger.debug(f"Circuit open for {cctv_id}, skipping start")
+            return False
+        
         try:
-            camera_url = self.cctv_config.get_camera_url(cctv_id)
-            cap = cv2.VideoCapture(camera_url)
-            
-            if not cap.isOpened():
-                self.logger.error(f"❌ Cannot open camera {cctv_id}: {camera_url}")
-                return False
-            
-            self.active_streams[cctv_id] = cap
-            self.running_detections[cctv_id] = True
-            
-            # Start detection thread
-            detection_thread = threading.Thread(
-                target=self._detection_loop,
-                args=(cctv_id,),
-                daemon=True
-            )
-            detection_thread.start()
+            with self._start_lock:
+                if cctv_id in self.pending_starts:
+                    self.logger.warning(f"⚠️ Camera {cctv_id} is already being opened")
+                    return False
+                
+                camera_url, decoder, decoder_options = self._capture_source(cctv_id)
+                self.capture_sources[cctv_id] = (camera_url, decoder, decoder_options)
+                self.stream_supervisor.on_connecting(cctv_id)
+                self.pending_starts[cctv_id] = self.camera_opener.open_async(
+                    cctv_id, camera_url, self._on_camera_opened, decoder, decoder_options
+                )
             
-            self.logger.info(f"🎥 Started detection for {cctv_id}")
+            self.logger.info(f"⏳ Opening camera {cctv_id}")
             return True
             
         except Exception as e:
             self.logger.error(f"Error starting detection for {cctv_id}: {e}")
             return False
     
+    def _on_camera_opened(self, cctv_id: str, cap):
+        """
+        Callback dari CameraOpener: jalankan loop deteksi jika stream berhasil dibuka
+        """
+        with self._start_lock:
+            pending = self.pending_starts.pop(cctv_id, None)
+        
+        # Start dibatalkan (stop_detection) selama kamera sedang dibuka
+        if pending is None:
+            if cap is not None:
+                cap.release()
+            return
+        
+        if cap is None:
+            self.stream_supervisor.on_open_failed(cctv_id, 'open failed or timed out')
+            return
+        
+        self.stream_supervisor.on_started(cctv_id)
+        self.active_streams[cctv_id] = cap
+        self.running_detections[cctv_id] = True
+        
+        if self.core:
+            lease = CaptureLease(cap)
+            self.core.start_camera(cctv_id, self._camera_task, cctv_id, lease, on_done=lease.release)
+            self.logger.info(f"🎥 Started detection for {cctv_id}")
+            return
+        
+        # Start detection thread
+        detection_thread = threading.Thread(
+            target=self._detection_loop,
+            args=(cctv_id,),
+            name=f"{DETECTION_THREAD_PREFIX}{cctv_id}",
+            daemon=True
+        )
+        detection_thread.start()
+        
+        self.logger.info(f"🎥 Started detection for {cctv_id}")
+    
+    def _capture_source(self, cctv_id: str) -> Tuple[str, str, Optional[Dict]]:
+        """
+        URL, backend decoder ('opencv' | 'pyav') dan opsi decoder kamera
+        """
+        camera = self.cctv_config.get_camera_config(cctv_id)
+        decoder = camera.get('decoder') or CAMERA_OPEN_CONFIG['default_decoder']
+        return camera.get('url', ''), decoder, camera.get('decoder_options')
+    
+    def _open_capture(self, cctv_id: str):
+        """
+        Buka capture untuk kamera (blocking, dengan timeout), None jika gagal
+        """
+        return self.camera_opener.open(*self._capture_source(cctv_id))
+    
+    def get_detection_state(self, cctv_id: str, wait: float = 0) -> Dict:
+        """
+        State start/deteksi kamera. Jika wait > 0, tunggu hingga pembukaan selesai (long-poll).
+        """
+        pending = self.pending_starts.get(cctv_id)
+        if pending is not None and wait > 0:
+            concurrent.futures.wait([pending], timeout=wait)
+        
+        if cctv_id in self.pending_starts:
+            state = 'pending'
+        elif self.running_detections.get(cctv_id, False):
+            state = 'running'
+        else:
+            health = self.stream_supervisor.get_state(cctv_id)
+            state = health['state'] if health else 'stopped'
+        
+        return {
+            'cctv_id': cctv_id,
+            'state': state,
+            'health': self.stream_supervisor.get_state(cctv_id)
+        }
+    
     def stop_detection(self, cctv_id: str) -> bool:
         """
         Hentikan deteksi untuk kamera tertentu
         """
         try:
-            self.running_detections[cctv_id] = False
+            with self._start_lock:
+                self.pending_starts.pop(cctv_id, None)
+            
+            # Entri dihapus (bukan di-set False) agar dict tidak tumbuh terus selama rotasi
+            self.running_detections.pop(cctv_id, None)
+            self.frame_bytes.pop(cctv_id, None)
+            self.capture_sources.pop(cctv_id, None)
+            self.stream_supervisor.stop(cctv_id)
+            
+            cap = self.active_streams.pop(cctv_id, None)
+            if self.core:
+                # Task kamera dibatalkan seketika; capture dilepas setelah read yang sedang berjalan selesai
+                self.core.cancel_camera(cctv_id)
+            elif cap is not None:
+                cap.release()
             
-            if cctv_id in self.active_streams:
-                self.active_streams[cctv_id].release()
-                del self.active_streams[cctv_id]
+            self.trackers.pop(cctv_id, None)
+            if self.crowd_estimator:
+                self.crowd_estimator.discard(cctv_id)
+            if self.model_scheduler:
+                self.model_scheduler.discard(cctv_id)
+            if self.pipeline:
+                self.pipeline.discard(cctv_id)
+            if self.clip_buffers:
+                self.clip_buffers.discard(cctv_id)
             
             self.logger.info(f"🛑 Stopped detection for {cctv_id}")
             return True
@@ -299,7 +761,7 @@ class YOLODetector:
     
     def _detection_loop(self, cctv_id: str):
         """
-        Main detection loop untuk satu kamera
+        Main detection loop untuk satu kamera (mode thread per kamera)
         """
         cap = self.active_streams.get(cctv_id)
         if not cap:
@@ -312,39 +774,26 @@ class YOLODetector:
         
         while self.running_detections.get(cctv_id, False):
             try:
+                # Timing per tahap hanya jika diaktifkan lewat endpoint admin
+                stage_start = time.perf_counter() if self.stage_timings.enabled else None
+                
                 ret, frame = cap.read()
+                if stage_start is not None:
+                    stage_start = self._record_stage(cctv_id, 'read', stage_start)
                 if not ret:
-                    self.logger.warning(f"⚠️ Cannot read frame from {cctv_id}")
-                    time.sleep(1)
+                    # Supervisor menangani retry, reconnect dengan backoff, dan circuit breaker
+                    cap = self.stream_supervisor.on_read_failure(cctv_id, cap)
+                    if cap is None:
+                        break
+                    if self.running_detections.get(cctv_id, False):
+                        self.active_streams[cctv_id] = cap
                     continue
                 
                 frame_count += 1
-                current_time = time.time()
-                
-                # Deteksi setiap N frame atau setelah interval tertentu
-                if (current_time - last_detection_time) >= DETECTION_CONFIG['detection_interval']:
-                    if self._should_detect(cctv_id):
-                        detections = self.detect_objects(frame)
-                        
-                        for detection in detections:
-                            if 'incident_type' in detection:
-                                incident_type = detection['incident_type']
-                                confidence = detection['confidence']
-                                
-                                self.logger.info(f"🚨 DETECTED: {incident_type} at {cctv_id} (confidence: {confidence:.2f})")
-                                
-                                # Capture screenshot
-                                screenshot_base64 = self.capture_screenshot(frame, cctv_id)
-                                
-                                # Send to Laravel
-                                success = self.send_to_laravel(cctv_id, incident_type, screenshot_base64)
-                                
-                                if success:
-                                    # Update counter
-                                    if cctv_id in self.detection_counters:
-                                        self.detection_counters[cctv_id]['count'] += 1
-                    
-                    last_detection_time = current_time
+                last_detection_time = self._process_frame(
+                    cctv_id, frame, frame_count, last_detection_time, stage_start,
+                    getattr(cap, 'last_frame_time', None)
+                )
                 
                 # Small delay untuk mengurangi beban CPU
                 time.sleep(0.1)
@@ -356,8 +805,266 @@ class YOLODetector:
         # Cleanup
         if cap:
             cap.release()
+        self._on_loop_ended(cctv_id)
+    
+    async def _camera_task(self, cctv_id: str, lease: CaptureLease):
+        """
+        Detection loop untuk satu kamera (mode asyncio). Read, reconnect dan inferensi
+        berjalan di executor; jeda antar frame dan backoff memakai timer wheel sehingga
+        task bisa dibatalkan seketika di titik await mana pun.
+        """
+        core = self.core
+        # Tanpa pipeline inferensi terjadi di _process_frame, jadi jalankan di executor infer
+        process_executor = core.decode_executor if self.pipeline else core.infer_executor
+        frame_count = 0
+        last_detection_time = 0
+        
+        self.logger.info(f"🔍 Detection task started for {cctv_id}")
+        
+        while self.running_detections.get(cctv_id, False):
+            try:
+                stage_start = time.perf_counter() if self.stage_timings.enabled else None
+                
+                ret, frame = await lease.call(core.decode_executor, lease.cap.read)
+                if stage_start is not None:
+                    stage_start = self._record_stage(cctv_id, 'read', stage_start)
+                if not ret:
+                    if not await self._recover_stream(cctv_id, lease):
+                        break
+                    continue
+                
+                frame_count += 1
+                last_detection_time = await lease.call(
+                    process_executor, self._process_frame,
+                    cctv_id, frame, frame_count, last_detection_time, stage_start,
+                    getattr(lease.cap, 'last_frame_time', None)
+                )
+                await core.sleep(ASYNC_CORE_CONFIG['frame_interval'])
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error in detection task for {cctv_id}: {e}")
+                await core.sleep(1)
+        
+        self._on_loop_ended(cctv_id)
+    
+    async def _recover_stream(self, cctv_id: str, lease: CaptureLease) -> bool:
+        """
+        Versi non-blocking on_read_failure: jeda retry/backoff lewat timer wheel,
+        pembukaan ulang di executor decode. False jika kamera harus di-evict.
+        """
+        action, delay = self.stream_supervisor.plan_read_failure(cctv_id)
+        if action == ACTION_RETRY:
+            await self.core.sleep(delay)
+            return True
+        
+        # Stream dianggap putus: lepas capture lama lalu buka ulang dengan backoff
+        lease.release()
+        while action == ACTION_RECONNECT:
+            await self.core.sleep(delay)
+            cap = await lease.call(self.core.decode_executor, self._open_capture, cctv_id, opens=True)
+            if cap is not None:
+                lease.cap = cap
+                self.stream_supervisor.on_reconnected(cctv_id)
+                if self.running_detections.get(cctv_id, False):
+                    self.active_streams[cctv_id] = cap
+                return True
+            action, delay = self.stream_supervisor.plan_reconnect(cctv_id)
+        return False
+    
+    @camera_scoped
+    def _process_frame(self, cctv_id: str, frame: np.ndarray, frame_count: int,
+                       last_detection_time: float, stage_start: Optional[float],
+                       captured_at: Optional[float] = None) -> float:
+        """
+        Proses satu frame yang berhasil dibaca; mengembalikan last_detection_time baru.
+        stage_start None berarti timing per tahap sedang nonaktif. captured_at adalah waktu
+        frame dari PTS stream (decoder PyAV); tanpa itu dipakai waktu frame selesai dibaca.
+        """
+        timing = stage_start is not None
+        self.stream_supervisor.on_frame(cctv_id)
+        self.frame_bytes[cctv_id] = frame.nbytes
+        current_time = captured_at or time.time()
+        
+        if self.clip_buffers:
+            self.clip_buffers.push(cctv_id, frame, current_time)
+            if timing:
+                stage_start = self._record_stage(cctv_id, 'clip_buffer', stage_start)
+        
+        detections = None
+        if self.pipeline:
+            # Tracker butuh setiap frame (keyframe dipilih di tahap infer); mode interval
+            # hanya mengirim frame yang perlu dideteksi
+            if TRACKER_CONFIG['enabled']:
+                self.pipeline.submit_frame(cctv_id, (frame, frame_count, current_time))
+            elif (current_time - last_detection_time) >= DETECTION_CONFIG['detection_interval']:
+                if self._should_detect(cctv_id):
+                    self.pipeline.submit_frame(cctv_id, (frame, frame_count, current_time))
+                last_detection_time = current_time
+        
+        elif TRACKER_CONFIG['enabled']:
+            detections = self.track_objects(cctv_id, frame, frame_count, current_time)
+        
+        # Deteksi setiap N frame atau setelah interval tertentu
+        elif (current_time - last_detection_time) >= DETECTION_CONFIG['detection_interval']:
+            if self._should_detect(cctv_id):
+                detections = self.detect_objects(frame, cctv_id)
+            
+            last_detection_time = current_time
+        
+        if detections is not None:
+            if timing:
+                stage_start = self._record_stage(cctv_id, 'detect', stage_start)
+            self._handle_incidents(cctv_id, frame, detections, current_time)
+            if timing:
+                self._record_stage(cctv_id, 'incidents', stage_start)
+        
+        return last_detection_time
+    
+    def _on_loop_ended(self, cctv_id: str):
+        # Kamera mati (circuit open): lepas semua resource agar tidak memakan thread/socket
+        if self.stream_supervisor.is_circuit_open(cctv_id):
+            self.running_detections.pop(cctv_id, None)
+            self.active_streams.pop(cctv_id, None)
+            self.trackers.pop(cctv_id, None)
+            self.frame_bytes.pop(cctv_id, None)
         self.logger.info(f"🔚 Detection loop ended for {cctv_id}")
     
+    def _record_stage(self, cctv_id: str, stage: str, stage_start: float) -> float:
+        now = time.perf_counter()
+        self.stage_timings.record(cctv_id, stage, now - stage_start)
+        return now
+    
+    def _handle_incidents(self, cctv_id: str, frame: np.ndarray, detections: List[Dict], event_time: float):
+        """
+        Screenshot dan kirim setiap insiden yang terdeteksi ke Laravel
+        """
+        for detection in self._admit_incidents(cctv_id, detections, event_time):
+            self._deliver_incident(self._encode_incident((cctv_id, frame, detection, event_time)))
+    
+    def _admit_incidents(self, cctv_id: str, detections: List[Dict], event_time: float) -> List[Dict]:
+        """
+        Insiden yang bukan duplikat dari kamera tetangga dan lolos rate limit per kamera.
+        Fusi dicek lebih dulu (pada waktu frame) agar duplikat tidak memakai slot rate limit;
+        slot hanya dipakai oleh insiden yang benar-benar diterima.
+        """
+        admitted = []
+        for detection in detections:
+            if 'incident_type' not in detection:
+                continue
+            
+            incident_type = detection['incident_type']
+            confidence = detection['confidence']
+            if self.incident_fuser and self.incident_fuser.fuse(cctv_id, incident_type, confidence, ts=event_time):
+                self.incident_stats['fused'] += 1
+                continue
+            
+            if not self._should_detect(cctv_id):
+                self.incident_stats['rate_limited'] += 1
+                continue
+            self.detection_counters[cctv_id]['count'] += 1
+            self.incident_stats['raised'] += 1
+            
+            self.logger.info(
+                f"🚨 DETECTED: {incident_type} at {cctv_id} (confidence: {confidence:.2f})",
+                extra={'cctv_id': cctv_id, 'incident_type': incident_type, 'confidence': round(confidence, 3)}
+            )
+            admitted.append(detection)
+        return admitted
+    
+    def _encode_incident(self, incident: Tuple) -> Tuple[Optional[str], Dict]:
+        """
+        Screenshot (JPEG + store) dan klip untuk satu insiden, lalu catat di jurnal lokal.
+        Hasilnya (id jurnal, payload Laravel).
+        """
+        cctv_id, frame, detection, event_time = incident
+        
+        # Capture screenshot
+        screenshot_base64, screenshot_path = self._capture_screenshot(frame, cctv_id)
+        
+        metadata = {}
+        if 'people_count' in detection:
+            metadata['people_count'] = detection['people_count']
+            metadata['peak_cell_count'] = detection['peak_cell_count']
+        if self.clip_buffers:
+            # Klip pra/pasca insiden dirakit di background, path-nya dilampirkan sekarang
+            clip_name = self.clip_buffers.request_clip(cctv_id, event_time)
+            if clip_name:
+                metadata['clip_path'] = f"clips/{clip_name}"
+        
+        journal_id = None
+        if self.incident_journal:
+            journal_id = self.incident_journal.record(
+                cctv_id, detection['incident_type'], detection['confidence'], event_time,
+                screenshot=screenshot_path, clip_path=metadata.get('clip_path'),
+                metadata={k: v for k, v in detection.items() if k not in ('incident_type', 'confidence')}
+            )
+            # Kunci idempotensi: Laravel mengabaikan kiriman ulang (replay) dengan journal_id yang sama
+            metadata['journal_id'] = journal_id
+        
+        payload = self._build_incident_payload(
+            cctv_id, detection['incident_type'], screenshot_base64, detection['confidence'], event_time, metadata
+        )
+        return journal_id, payload
+    
+    def _deliver_incident(self, encoded: Tuple[Optional[str], Dict]):
+        journal_id, payload = encoded
+        cctv_id = payload['cctv_id']
+        self._send_incident(payload, lambda ok: self._on_incident_delivered(cctv_id, ok, journal_id))
+    
+    def _send_incident(self, payload: Dict, callback):
+        """
+        Kirim satu payload; callback(success) dipanggil setelah hasilnya diketahui
+        """
+        if self.incident_batcher:
+            # Dikirim bersama insiden lain dalam satu request gzip
+            self.incident_batcher.submit(payload, callback)
+        else:
+            callback(self._post_incident(payload))
+    
+    def _replay_payload(self, row: Dict) -> Optional[Dict]:
+        """
+        Bangun ulang payload Laravel dari catatan jurnal (screenshot dibaca dari store)
+        """
+        if not row['screenshot']:
+            return None
+        path = os.path.join(self.screenshot_store.root, row['screenshot'])
+        try:
+            with open(path, 'rb') as f:
+                image_base64 = base64.b64encode(f.read()).decode('utf-8')
+        except OSError:
+            return None  # Screenshot sudah terhapus oleh retensi store
+        
+        metadata = {'journal_id': row['id']}
+        if row['clip_path']:
+            metadata['clip_path'] = row['clip_path']
+        return self._build_incident_payload(
+            row['cctv_id'], row['type'], image_base64, row['confidence'], row['detected_at'], metadata
+        )
+    
+    @camera_scoped
+    def _pipeline_infer(self, cctv_id: str, frame_item: Tuple) -> List[Tuple]:
+        """
+        Tahap infer pipeline: deteksi/tracking lalu insiden yang lolos rate limit.
+        Keyframe tracker diputuskan di sini dari waktu frame, jadi frame yang dibuang
+        drop-oldest tidak pernah menghilangkan deteksi: frame berikutnya menjadi keyframe.
+        """
+        frame, frame_count, current_time = frame_item
+        if self.concurrency:
+            self.concurrency.observe_queue_lag(time.time() - current_time)
+        stage_start = time.perf_counter() if self.stage_timings.enabled else None
+        if TRACKER_CONFIG['enabled']:
+            detections = self.track_objects(cctv_id, frame, frame_count, current_time)
+        else:
+            detections = self.detect_objects(frame, cctv_id)
+        if stage_start is not None:
+            stage_start = self._record_stage(cctv_id, 'detect', stage_start)
+        admitted = self._admit_incidents(cctv_id, detections, current_time)
+        if stage_start is not None:
+            self._record_stage(cctv_id, 'incidents', stage_start)
+        return [(cctv_id, frame, detection, current_time) for detection in admitted]
+    
     def start_auto_rotation(self) -> bool:
         """
         Mulai sistem rotasi otomatis kamera
@@ -367,13 +1074,21 @@ class YOLODetector:
             return False
         
         self.auto_rotation_running = True
+        self._rotation_stop.clear()
+        self._rotation_index = 0
+        self.logger.info(f"🔄 Auto rotation started with {len(self.get_assigned_cameras())} cameras")
+        
+        if self.core:
+            # Rotasi dijadwalkan sebagai timer; langkah rotasi (blocking ringan) di executor decode
+            self._schedule_rotation(0)
+            return True
+        
         self.auto_rotation_thread = threading.Thread(
             target=self._auto_rotation_loop,
+            name='auto-rotation',
             daemon=True
         )
         self.auto_rotation_thread.start()
-        
-        self.logger.info("🔄 Auto rotation started")
         return True
     
     def stop_auto_rotation(self) -> bool:
@@ -381,59 +1096,207 @@ class YOLODetector:
         Hentikan sistem rotasi otomatis
         """
         self.auto_rotation_running = False
+        self._rotation_stop.set()
+        if self._rotation_timer is not None:
+            self._rotation_timer.cancel()
+            self._rotation_timer = None
         
         # Stop semua kamera yang sedang dimonitor
-        for cctv_id in self.current_rotation_cameras:
-            self.stop_detection(cctv_id)
-        
-        self.current_rotation_cameras = []
+        with self._rotation_lock:
+            for cctv_id in self.current_rotation_cameras:
+                self.stop_detection(cctv_id)
+            self.current_rotation_cameras = []
         self.logger.info("🔄 Auto rotation stopped")
         return True
     
     def _auto_rotation_loop(self):
         """
-        Loop untuk rotasi otomatis kamera
+        Loop untuk rotasi otomatis kamera (mode thread); jeda bisa diinterupsi stop_auto_rotation
         """
-        active_cameras = self.cctv_config.get_active_cameras()
-        camera_index = 0
-        
-        self.logger.info(f"🔄 Auto rotation loop started with {len(active_cameras)} cameras")
-        
         while self.auto_rotation_running:
             try:
-                # Stop kamera sebelumnya
-                for cctv_id in self.current_rotation_cameras:
-                    self.stop_detection(cctv_id)
-                
-                # Pilih kamera berikutnya
-                cameras_per_rotation = DETECTION_CONFIG['cameras_per_rotation']
-                self.current_rotation_cameras = []
-                
-                for i in range(cameras_per_rotation):
-                    if camera_index < len(active_cameras):
-                        camera_id = active_cameras[camera_index]
-                        self.current_rotation_cameras.append(camera_id)
-                        camera_index += 1
-                    else:
-                        # Reset ke awal jika sudah mencapai akhir
-                        camera_index = 0
-                        if active_cameras:
-                            camera_id = active_cameras[camera_index]
-                            self.current_rotation_cameras.append(camera_id)
-                            camera_index += 1
-                
-                # Start deteksi untuk kamera terpilih
-                for cctv_id in self.current_rotation_cameras:
-                    self.start_detection(cctv_id)
-                
-                self.logger.info(f"🔄 Rotation: monitoring {self.current_rotation_cameras}")
+                self._rotate_cameras()
                 
                 # Tunggu sesuai interval
-                time.sleep(DETECTION_CONFIG['auto_rotation_interval'])
+                if self._rotation_stop.wait(DETECTION_CONFIG['auto_rotation_interval']):
+                    break
                 
             except Exception as e:
                 self.logger.error(f"Error in auto rotation loop: {e}")
-                time.sleep(10)  # Wait before retry
+                if self._rotation_stop.wait(10):  # Wait before retry
+                    break
+    
+    def _schedule_rotation(self, delay: float):
+        self._rotation_timer = self.core.call_later(
+            delay, lambda: self.core.decode_executor.submit(self._rotation_step)
+        )
+    
+    def _rotation_step(self):
+        """
+        Satu langkah rotasi (mode asyncio), lalu jadwalkan langkah berikutnya di timer wheel
+        """
+        if not self.auto_rotation_running:
+            return
+        delay = DETECTION_CONFIG['auto_rotation_interval']
+        try:
+            self._rotate_cameras()
+        except Exception as e:
+            self.logger.error(f"Error in auto rotation: {e}")
+            delay = 10  # Wait before retry
+        if self.auto_rotation_running:
+            self._schedule_rotation(delay)
+    
+    @property
+    def cameras_per_rotation(self) -> int:
+        return self.concurrency.target if self.concurrency else DETECTION_CONFIG['cameras_per_rotation']
+    
+    def _next_rotation_cameras(self, count: int, exclude: List[str]) -> List[str]:
+        """
+        Ambil hingga `count` kamera berikutnya dari urutan rotasi (melingkar), lewati `exclude`
+        """
+        # Ambil ulang daftar kamera aktif (registry bisa di-reload saat runtime)
+        active_cameras = [cctv_id for cctv_id in self.get_assigned_cameras() if cctv_id not in exclude]
+        if not active_cameras:
+            return []
+        
+        # Kamera hasil failover didahulukan agar tidak menunggu satu putaran rotasi penuh
+        selected = [cctv_id for cctv_id in self._rotation_failover if cctv_id in active_cameras][:count]
+        self._rotation_failover = [cctv_id for cctv_id in self._rotation_failover
+                                   if cctv_id in active_cameras and cctv_id not in selected]
+        remaining = [cctv_id for cctv_id in active_cameras if cctv_id not in selected]
+        if not remaining:
+            return selected
+        
+        camera_index = self._rotation_index % len(remaining)
+        for _ in range(min(count - len(selected), len(remaining))):
+            selected.append(remaining[camera_index])
+            # Reset ke awal jika sudah mencapai akhir
+            camera_index = (camera_index + 1) % len(remaining)
+        self._rotation_index = camera_index
+        return selected
+    
+    def _rotate_cameras(self):
+        """
+        Hentikan kamera rotasi sebelumnya lalu mulai kelompok kamera berikutnya
+        """
+        with self._rotation_lock:
+            # Stop kamera sebelumnya
+            for cctv_id in self.current_rotation_cameras:
+                self.stop_detection(cctv_id)
+            
+            # Pilih kamera berikutnya
+            self.current_rotation_cameras = self._next_rotation_cameras(self.cameras_per_rotation, [])
+            
+            # Start deteksi untuk kamera terpilih
+            for cctv_id in self.current_rotation_cameras:
+                self.start_detection(cctv_id)
+        
+        self.logger.info(f"🔄 Rotation: monitoring {self.current_rotation_cameras}")
+    
+    def _resize_rotation(self, old: int, new: int):
+        """
+        Terapkan target baru dari ConcurrencyTuner ke kelompok rotasi yang sedang berjalan
+        tanpa menunggu rotasi berikutnya
+        """
+        if not self.auto_rotation_running:
+            return
+        with self._rotation_lock:
+            current = self.current_rotation_cameras
+            if new < len(current):
+                # Kamera yang paling akhir ditambahkan dihentikan lebih dulu
+                for cctv_id in current[new:]:
+                    self.stop_detection(cctv_id)
+                self.current_rotation_cameras = current[:new]
+            elif new > len(current):
+                added = self._next_rotation_cameras(new - len(current), current)
+                for cctv_id in added:
+                    self.start_detection(cctv_id)
+                self.current_rotation_cameras = current + added
+        self.logger.info(f"🔄 Rotation resized to {len(self.current_rotation_cameras)}: {self.current_rotation_cameras}")
+    
+    def get_assigned_cameras(self) -> List[str]:
+        """
+        Kamera aktif yang menjadi tanggung jawab node ini (semua kamera jika sharding nonaktif)
+        """
+        active_cameras = self.cctv_config.get_active_cameras()
+        if self.shard_manager:
+            return [cctv_id for cctv_id in active_cameras if self.shard_manager.owns(cctv_id)]
+        return active_cameras
+    
+    def _on_shard_rebalance(self, gained, lost):
+        """
+        Listener sharding: hentikan kamera yang berpindah ke node lain dan ambil alih kamera
+        yang didapat (rotasi: masuk antrean failover, mode manual: langsung dimulai)
+        """
+        for cctv_id in lost:
+            if self.running_detections.get(cctv_id) or cctv_id in self.pending_starts:
+                self.logger.info(f"🧩 {cctv_id} moved to another node, stopping detection")
+                self.stop_detection(cctv_id)
+        
+        if self.auto_rotation_running:
+            with self._rotation_lock:
+                self._rotation_failover = [cctv_id for cctv_id in self._rotation_failover if cctv_id not in lost]
+                self._rotation_failover.extend(sorted(set(gained) - set(self._rotation_failover)))
+            return
+        
+        for cctv_id in sorted(gained):
+            if not self.running_detections.get(cctv_id) and cctv_id not in self.pending_starts:
+                self.logger.info(f"🧩 {cctv_id} taken over from another node, starting detection")
+                self.start_detection(cctv_id)
+    
+    def _on_registry_reload(self, added, removed, changed):
+        """
+        Listener registry: stream yang tidak berubah tetap berjalan, kamera yang
+        dihapus atau dinonaktifkan dihentikan, dan kamera yang URL (termasuk kredensial),
+        decoder atau opsi decoder-nya berubah di-restart dengan pengaturan baru
+        """
+        for cctv_id in removed | changed:
+            if cctv_id not in self.running_detections and cctv_id not in self.pending_starts:
+                continue
+            if cctv_id in removed or not self.cctv_config.is_camera_active(cctv_id):
+                self.logger.info(f"🔁 {cctv_id} removed or deactivated in registry, stopping detection")
+                self.stop_detection(cctv_id)
+            else:
+                self.roi_masks.invalidate(cctv_id)
+                if self.capture_sources.get(cctv_id) != self._capture_source(cctv_id):
+                    self.logger.info(f"🔁 {cctv_id} capture settings changed in registry, restarting detection")
+                    self.stop_detection(cctv_id)
+                    self.start_detection(cctv_id)
+        
+        if self.shard_manager:
+            self.shard_manager.recompute()
+    
+    def prune_inactive_state(self) -> int:
+        """
+        Buang state per kamera yang tidak lagi berjalan (dipanggil periodik oleh MemoryMonitor).
+        Counter rate-limit baru dibuang setelah window-nya habis agar limit tidak bisa dilewati.
+        """
+        active = {cctv_id for cctv_id, running in list(self.running_detections.items()) if running}
+        active |= set(self.pending_starts)
+        now = datetime.now()
+        pruned = 0
+        
+        for cctv_id in [c for c in list(self.running_detections) if c not in active]:
+            self.running_detections.pop(cctv_id, None)
+            pruned += 1
+        for cctv_id, counter in list(self.detection_counters.items()):
+            if cctv_id not in active and now >= counter['reset_time']:
+                self.detection_counters.pop(cctv_id, None)
+                pruned += 1
+        for state in (self.trackers, self.frame_bytes, self.capture_sources):
+            for cctv_id in [c for c in list(state) if c not in active]:
+                state.pop(cctv_id, None)
+                pruned += 1
+        for cctv_id in set(self.roi_masks.bytes_by_camera()) - active:
+            self.roi_masks.invalidate(cctv_id)
+            pruned += 1
+        
+        if self.crowd_estimator:
+            pruned += self.crowd_estimator.prune(active)
+        if self.model_scheduler:
+            pruned += self.model_scheduler.prune(active)
+        
+        return pruned + self.stream_supervisor.prune(active)
     
     def get_status(self) -> Dict:
         """
@@ -441,11 +1304,39 @@ class YOLODetector:
         """
         return {
             'model_loaded': self.model is not None,
+            'model_precision': self.model_precision,
+            'autotune': self.tuning or {'applied': False},
             'active_detections': list(self.running_detections.keys()),
             'auto_rotation_running': self.auto_rotation_running,
             'current_rotation_cameras': self.current_rotation_cameras,
+            'cameras_per_rotation': self.cameras_per_rotation,
             'total_cameras': len(self.cctv_config.get_active_cameras()),
-            'detection_counters': self.detection_counters
+            'sharding': self.shard_manager.get_status() if self.shard_manager else {'enabled': False},
+            'detection_counters': self.detection_counters,
+            'incidents': self.incident_stats,
+            'roi': self.roi_masks.stats(),
+            'detection_store': self.detection_store.get_stats() if self.detection_store else {'enabled': False},
+            'stream_health': self.stream_supervisor.get_health()['summary'],
+            'screenshots': self.screenshot_store.get_stats(),
+            'clip_buffer': self.clip_buffers.get_stats() if self.clip_buffers else {'enabled': False},
+            'logging': get_logging_stats(),
+            'memory': self.memory_monitor.get_summary(),
+            'pipeline': self.pipeline.get_stats() if self.pipeline else {'enabled': False},
+            'core': self.core.get_stats() if self.core else {'mode': 'threads', 'threads': threading.active_count()},
+            'incident_delivery': self.incident_batcher.get_stats() if self.incident_batcher else {'batching': False},
+            'crowd': self.crowd_estimator.get_stats() if self.crowd_estimator else {'enabled': False},
+            'concurrency': self.concurrency.get_stats() if self.concurrency else {'enabled': False},
+            'fusion': self.incident_fuser.get_stats() if self.incident_fuser else {'enabled': False},
+            'incident_journal': {
+                **self.incident_journal.get_stats(),
+                'replay': self.journal_replayer.get_stats(),
+            } if self.incident_journal else {'enabled': False},
+            'cascade': self.cascade.get_stats() if self.cascade else {'enabled': False},
+            'models': self.model_registry.get_stats() if self.model_registry else {'enabled': False},
+            'tracking': {
+                'enabled': TRACKER_CONFIG['enabled'],
+                'tracks': {cctv_id: len(tracker.confirmed_tracks()) for cctv_id, tracker in self.trackers.items()}
+            }
         }
     
     def cleanup(self):
@@ -455,8 +1346,8 @@ class YOLODetector:
         # Stop auto rotation
         self.stop_auto_rotation()
         
-        # Stop all detections
-        for cctv_id in list(self.running_detections.keys()):
+        # Stop all detections (termasuk kamera yang masih dibuka)
+        for cctv_id in list(self.running_detections.keys()) + list(self.pending_starts.keys()):
             self.stop_detection(cctv_id)
         
         # Close all streams
@@ -465,6 +1356,27 @@ class YOLODetector:
         
         self.active_streams.clear()
         self.running_detections.clear()
+        self.trackers.clear()
+        self.camera_opener.shutdown()
+        if self.concurrency:
+            self.concurrency.stop()
+        if self.core:
+            self.core.stop()
+        if self.pipeline:
+            self.pipeline.stop()
+        self.memory_monitor.stop()
+        if self.shard_manager:
+            self.shard_manager.stop()
+        self.screenshot_store.close()
+        if self.clip_buffers:
+            self.clip_buffers.close()
+        if self.journal_replayer:
+            self.journal_replayer.stop()
+        if self.incident_batcher:
+            self.incident_batcher.close()
+        # Ditutup setelah batcher agar hasil pengiriman terakhir tetap tercatat
+        if self.incident_journal:
+            self.incident_journal.close()
         
         self.logger.info("🧹 Cleanup completed")
 
@@ -6,6 +6,7 @@
 use App\Models\Incident;
 use Illuminate\Http\Request;
 use Illuminate\Support\Facades\Storage;
+use Illuminate\Support\Facades\Validator;
 use Illuminate\Support\Str;
 use App\Jobs\SendWablasNotification; // 1. Import Job untuk Wablas
 
@@ -28,8 +29,104 @@ public function store(Request $request)
             'cctv_id' => 'required|string|max:255',
             'type' => 'required|string|in:accident,crowd',
             'image_base64' => 'required|string',
+            'journal_id' => 'nullable|string|max:64',
         ]);
 
+        // Kiriman ulang (replay jurnal detector) untuk insiden yang sudah tersimpan
+        $existing = $this->findByJournalId($validated['journal_id'] ?? null);
+        if ($existing) {
+            return response()->json([
+                'message' => 'Incident already reported.',
+                'data' => $existing,
+            ], 200);
+        }
+
+        // 2-5. Simpan gambar, buat insiden, dan kirim notifikasi
+        $incident = $this->createIncident($validated);
+
+        // 6. Beri respon sukses dalam format JSON
+        return response()->json([
+            'message' => 'Incident reported successfully.',
+            'data' => $incident,
+        ], 201); // 201 artinya 'Created'
+    }
+
+    /**
+     * Menyimpan beberapa insiden sekaligus dari AI (body JSON boleh dikompresi gzip).
+     * Setiap insiden divalidasi sendiri sehingga satu insiden yang gagal tidak
+     * membatalkan insiden lain dalam batch.
+     */
+    public function storeBatch(Request $request)
+    {
+        $raw = $request->getContent();
+        if (strtolower((string) $request->header('Content-Encoding')) === 'gzip') {
+            $raw = gzdecode($raw);
+            if ($raw === false) {
+                return response()->json(['message' => 'Invalid gzip body.'], 400);
+            }
+        }
+
+        $payload = json_decode($raw, true);
+        if (!is_array($payload) || !isset($payload['incidents']) || !is_array($payload['incidents'])) {
+            return response()->json(['message' => 'Body must contain an "incidents" array.'], 422);
+        }
+
+        $results = [];
+        foreach (array_values($payload['incidents']) as $index => $item) {
+            $validator = Validator::make(is_array($item) ? $item : [], [
+                'cctv_id' => 'required|string|max:255',
+                'type' => 'required|string|in:accident,crowd',
+                'image_base64' => 'required|string',
+                'journal_id' => 'nullable|string|max:64',
+            ]);
+
+            if ($validator->fails()) {
+                $results[] = [
+                    'index' => $index,
+                    'status' => 422,
+                    'error' => $validator->errors()->first(),
+                ];
+                continue;
+            }
+
+            $validated = $validator->validated();
+            $existing = $this->findByJournalId($validated['journal_id'] ?? null);
+            if ($existing) {
+                // Sudah tersimpan dari kiriman sebelumnya: dianggap sukses agar jurnal ditandai synced
+                $results[] = ['index' => $index, 'status' => 200, 'id' => $existing->id];
+                continue;
+            }
+
+            try {
+                $incident = $this->createIncident($validated);
+                $results[] = ['index' => $index, 'status' => 201, 'id' => $incident->id];
+            } catch (\Throwable $e) {
+                report($e);
+                $results[] = ['index' => $index, 'status' => 500, 'error' => 'Failed to store incident.'];
+            }
+        }
+
+        $created = count(array_filter($results, fn ($r) => $r['status'] === 201));
+
+        return response()->json([
+            'message' => "{$created} of " . count($results) . ' incidents reported.',
+            'results' => $results,
+        ], 207); // 207 'Multi-Status': hasil per insiden ada di 'results'
+    }
+
+    /**
+     * Insiden yang sudah tersimpan dengan journal_id yang sama (null jika tidak ada / tanpa journal_id).
+     */
+    private function findByJournalId(?string $journalId): ?Incident
+    {
+        return $journalId ? Incident::where('journal_id', $journalId)->first() : null;
+    }
+
+    /**
+     * Simpan screenshot dan data insiden, lalu kirim notifikasi jika perlu.
+     */
+    private function createIncident(array $validated): Incident
+    {
         // 2. Decode gambar dari Base64 dan siapkan path penyimpanan
         $image_parts = explode(";base64,", $validated['image_base64']);
         $image_type_aux = explode("image/", $image_parts[0]);
@@ -48,6 +145,7 @@ public function store(Request $request)
             'cctv_id' => $validated['cctv_id'],
             'type' => $validated['type'],
             'image_path' => $filepath, // Simpan path-nya ke database
+            'journal_id' => $validated['journal_id'] ?? null,
         ]);
 
         // 5. (PERUBAHAN) Jika tipe insiden adalah 'accident', panggil job untuk WhatsApp
@@ -55,10 +153,6 @@ public function store(Request $request)
             SendWablasNotification::dispatch($incident);
         }
 
-        // 6. Beri respon sukses dalam format JSON
-        return response()->json([
-            'message' => 'Incident reported successfully.',
-            'data' => $incident,
-        ], 201); // 201 artinya 'Created'
+        return $incident;
     }
 }
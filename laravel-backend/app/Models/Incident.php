@@ -18,5 +18,6 @@ class Incident extends Model
         'cctv_id',
         'type',
         'image_path',
+        'journal_id',
     ];
 }
@@ -0,0 +1,30 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        Schema::table('incidents', function (Blueprint $table) {
+            // Id jurnal lokal detector; kunci idempotensi agar replay tidak membuat insiden ganda
+            $table->string('journal_id', 64)->nullable()->unique()->after('image_path');
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::table('incidents', function (Blueprint $table) {
+            $table->dropUnique(['journal_id']);
+            $table->dropColumn('journal_id');
+        });
+    }
+};
@@ -8,6 +8,7 @@
 // Python script dan halaman dashboard bisa mengakses ini.
 Route::get('/incidents', [IncidentController::class, 'index']);
 Route::post('/incidents', [IncidentController::class, 'store']);
+Route::post('/incidents/batch', [IncidentController::class, 'storeBatch']);
 
 
 // Rute yang hanya bisa diakses oleh pengguna yang sudah login